@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Benchmarks of the paraxial, aberration and PSF calculations
+
+.. codeauthor: Michael J. Hayford
+"""
+import numpy as np
+
+from rayoptics.parax.firstorder import (compute_first_order,
+                                        compute_first_order_many)
+from rayoptics.parax.thirdorder import calc_third_order, compute_third_order
+from rayoptics.raytr import analyses
+from rayoptics.raytr.spotstats import SpotStatistics
+from rayoptics.raytr.zernike import ZernikeBasis
+
+from .common import trace_models, open_test_model, shared_test_model
+
+
+class ParaxialAnalyses:
+    """ first and third order calculations """
+    params = trace_models
+    param_names = ['model']
+
+    def setup(self, model):
+        self.opm = shared_test_model(model)
+        self.stop = self.opm.seq_model.stop_surface
+        self.wvl = self.opm.optical_spec.spectral_region.central_wvl
+
+    def time_compute_first_order(self, model):
+        compute_first_order(self.opm, self.stop, self.wvl)
+
+    def time_compute_third_order(self, model):
+        compute_third_order(self.opm)
+
+    def time_calc_third_order(self, model):
+        calc_third_order(self.opm)
+
+
+class ParaxialSweep:
+    """ first order data of a thickness sweep of the double Gauss """
+    params = [10, 1000]
+    param_names = ['num_variants']
+
+    def setup(self, num_variants):
+        self.opm = shared_test_model('codev/tests/ag_dblgauss.seq')
+        thi = np.array([g.thi for g in self.opm.seq_model.gaps])
+        self.thi = np.tile(thi, (num_variants, 1))
+        self.thi[:, 5] *= np.linspace(0.8, 1.2, num_variants)
+
+    def time_compute_first_order_many(self, num_variants):
+        compute_first_order_many(self.opm, thi=self.thi)
+
+
+class ModelUpdate:
+    """ update a model after a change """
+    params = trace_models
+    param_names = ['model']
+
+    def setup(self, model):
+        self.opm = open_test_model(model)
+
+    def time_update_model(self, model):
+        self.opm.update_model()
+
+
+class PSF:
+    """ FFT PSF of a traced wavefront """
+    params = [[32, 64], [256, 512]]
+    param_names = ['num_rays', 'maxdim']
+
+    def setup(self, num_rays, maxdim):
+        opm = shared_test_model('codev/tests/ag_dblgauss.seq')
+        self.wavefront = analyses.RayGrid(opm, f=1, num_rays=num_rays).grid[2]
+
+    def time_calc_psf(self, num_rays, maxdim):
+        analyses.calc_psf(self.wavefront, num_rays, maxdim)
+
+    def peakmem_calc_psf(self, num_rays, maxdim):
+        analyses.calc_psf(self.wavefront, num_rays, maxdim)
+
+
+class SpotStats:
+    """ polychromatic spot statistics and encircled energy through focus """
+    params = [1, 41]
+    param_names = ['num_focus']
+
+    def setup(self, num_focus):
+        opm = shared_test_model('codev/tests/ag_dblgauss.seq')
+        self.spot = SpotStatistics.from_model(opm, fi=1)
+        self.foc = np.linspace(-0.1, 0.1, num_focus)
+        self.radii = np.linspace(0., 0.05, 51)
+
+    def time_stats(self, num_focus):
+        self.spot.stats(self.foc)
+
+    def time_encircled_energy(self, num_focus):
+        self.spot.encircled_energy(self.radii, foc=self.foc)
+
+
+class ZernikeFit:
+    """ Zernike fits of a wavefront through focus, with and without the
+    cached basis matrix """
+    params = [[32, 64], [37, 66]]
+    param_names = ['num_rays', 'num_terms']
+
+    def setup(self, num_rays, num_terms):
+        opm = shared_test_model('codev/tests/ag_dblgauss.seq')
+        osp = opm.optical_spec
+        fld, wvl, foc = osp.lookup_fld_wvl_focus(1)
+        grid_pkg = analyses.trace_wavefront(opm, fld, wvl, 0.,
+                                            num_rays=num_rays)
+        self.wavefronts = [analyses.focus_wavefront(opm, grid_pkg,
+                                                    fld, wvl, foc)
+                           for foc in np.linspace(-0.1, 0.1, 11)]
+        self.basis = ZernikeBasis(num_terms)
+        self.basis.fit(self.wavefronts[0])
+
+    def time_fit_cached(self, num_rays, num_terms):
+        for wavefront in self.wavefronts:
+            self.basis.fit(wavefront)
+
+    def time_fit_many(self, num_rays, num_terms):
+        self.basis.fit_many(self.wavefronts)
+
+    def time_fit_uncached(self, num_rays, num_terms):
+        for wavefront in self.wavefronts:
+            ZernikeBasis(num_terms).fit(wavefront)
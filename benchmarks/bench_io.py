@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Benchmarks of importing rayoptics and reading lens files
+
+.. codeauthor: Michael J. Hayford
+"""
+from rayoptics.gui.appcmds import open_model
+
+from .common import root_pth
+
+
+class Import:
+    """ import time of the headless and the full environment entry points """
+    params = ['rayoptics.gui.appcmds',
+              'rayoptics.raytr.analyses',
+              'rayoptics.environment']
+    param_names = ['module']
+
+    def timeraw_import(self, module):
+        return 'import ' + module
+
+
+class OpenModel:
+    """ open .roa, .seq and .zmx files """
+    params = ['models/Sasian Triplet.roa',
+              'optical/tests/cell_phone_camera.roa',
+              'codev/tests/ag_dblgauss.seq',
+              'codev/tests/rc_f16.seq',
+              'zemax/tests/354710-C-Zemax(ZMX).zmx']
+    param_names = ['filename']
+
+    def time_open_model(self, filename):
+        open_model(root_pth/filename)
+
+    def peakmem_open_model(self, filename):
+        open_model(root_pth/filename)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Benchmarks of the optimizer and tolerance analysis
+
+.. codeauthor: Michael J. Hayford
+"""
+from rayoptics.optimize.optimizer import (Variable, Optimizer,
+                                          FirstOrderOperand, RMSSpotOperand)
+from rayoptics.optimize.tolerance import Tolerance, MonteCarlo
+
+from .common import open_test_model
+
+
+class DampedLeastSquares:
+    """ a few damped least squares iterations on the double Gauss """
+    params = [1, 2]
+    param_names = ['max_workers']
+
+    def setup(self, max_workers):
+        self.opm = open_test_model('codev/tests/ag_dblgauss.seq')
+        sm = self.opm.seq_model
+        self.variables = [Variable('cv', i) for i in range(1, len(sm.ifcs)-1)
+                          if i != sm.stop_surface]
+        self.variables.append(Variable('thi', len(sm.gaps)-1))
+        num_flds = len(self.opm.optical_spec.field_of_view.fields)
+        self.operands = ([FirstOrderOperand('efl', target=100.)] +
+                         [RMSSpotOperand(fi) for fi in range(num_flds)])
+
+    def time_optimize(self, max_workers):
+        Optimizer(self.opm, self.variables, self.operands,
+                  max_workers=max_workers).optimize(max_iter=2)
+
+
+class MonteCarloTolerancing:
+    """ Monte Carlo trials of the double Gauss, with a focus compensator """
+    params = [1, 2]
+    param_names = ['max_workers']
+
+    def setup(self, max_workers):
+        self.opm = open_test_model('codev/tests/ag_dblgauss.seq')
+        sm = self.opm.seq_model
+        self.tolerances = ([Tolerance(Variable('thi', i), 0.05)
+                            for i in range(1, len(sm.gaps)-1)] +
+                           [Tolerance(Variable('dec', 2, index=1), 0.02),
+                            Tolerance(Variable('n', 1), 0.001, 'normal')])
+        self.metrics = {'spot': RMSSpotOperand(0)}
+
+    def time_run(self, max_workers):
+        MonteCarlo(self.opm, self.tolerances, self.metrics,
+                   compensators=[Variable('thi', -1)],
+                   max_workers=max_workers).run(8, batch_size=4)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Benchmarks of real ray tracing and chief ray aiming
+
+.. codeauthor: Michael J. Hayford
+"""
+import numpy as np
+
+import rayoptics.raytr.raytrace as rt
+from rayoptics.elem.surface import Circular
+from rayoptics.raytr import analyses
+from rayoptics.raytr import sampler
+from rayoptics.raytr import trace
+
+from .common import (trace_models, open_test_model, shared_test_model,
+                     trace_args)
+
+
+class SingleRay:
+    """ trace a single ray with the scalar ray trace """
+    params = trace_models
+    param_names = ['model']
+
+    def setup(self, model):
+        self.trace_args = trace_args(shared_test_model(model))
+
+    def time_trace(self, model):
+        rt.trace(*self.trace_args)
+
+
+class PupilSampling:
+    """ generate disk sampled pupil grids, one sample or one array at a time
+    """
+    params = [64, 256]
+    param_names = ['num_rays']
+
+    def setup(self, num_rays):
+        self.grid_def = [np.array([-1., -1.]), np.array([1., 1.]), num_rays]
+
+    def time_csd_grid_ray_generator(self, num_rays):
+        np.array(list(sampler.csd_grid_ray_generator(self.grid_def)))
+
+    def time_csd_grid_samples(self, num_rays):
+        sampler.csd_grid_samples(self.grid_def)
+
+
+class RayGrid:
+    """ trace and refocus square grids of rays """
+    params = [trace_models, [11, 32, 64]]
+    param_names = ['model', 'num_rays']
+
+    def setup(self, model, num_rays):
+        self.opm = shared_test_model(model)
+        osp = self.opm.optical_spec
+        self.fld, self.wvl, self.foc = osp.lookup_fld_wvl_focus(1)
+        self.grid_def = [np.array([-1., -1.]), np.array([1., 1.]), num_rays]
+        self.ray_grid = analyses.RayGrid(self.opm, f=1, num_rays=num_rays)
+
+    def time_trace_ray_grid(self, model, num_rays):
+        analyses.trace_ray_grid(self.opm, self.grid_def,
+                                self.fld, self.wvl, self.foc)
+
+    def peakmem_trace_ray_grid(self, model, num_rays):
+        analyses.trace_ray_grid(self.opm, self.grid_def,
+                                self.fld, self.wvl, self.foc)
+
+    def time_wavefront(self, model, num_rays):
+        self.ray_grid.update_data()
+
+    def time_refocus(self, model, num_rays):
+        self.ray_grid.foc += 0.001
+        self.ray_grid.update_data(build='update')
+
+
+class ApertureClipping:
+    """ trace a grid of rays with and without clipping by clear apertures """
+    params = [[False, True], [64]]
+    param_names = ['clip_apertures', 'num_rays']
+
+    def setup(self, clip_apertures, num_rays):
+        self.opm = open_test_model('codev/tests/ag_dblgauss.seq')
+        for ifc in self.opm.seq_model.ifcs[1:-1]:
+            ifc.clear_apertures.append(Circular(radius=0.9*ifc.max_aperture))
+        osp = self.opm.optical_spec
+        self.fld, self.wvl, self.foc = osp.lookup_fld_wvl_focus(2)
+        self.pupil = sampler.grid_samples([np.array([-1., -1.]),
+                                           np.array([1., 1.]), num_rays])
+
+    def time_trace_bundle(self, clip_apertures, num_rays):
+        trace.trace_bundle(self.opm, self.pupil, self.fld, self.wvl,
+                           clip_apertures=clip_apertures)
+
+
+class Aiming:
+    """ aim chief rays at the center of the stop """
+    params = trace_models
+    param_names = ['model']
+
+    def setup(self, model):
+        self.opm = open_test_model(model)
+        osp = self.opm.optical_spec
+        self.stop = self.opm.seq_model.stop_surface
+        self.flds = osp.field_of_view.fields
+        self.wvl = osp.spectral_region.central_wvl
+
+    def time_iterate_ray(self, model):
+        for fld in self.flds:
+            trace.iterate_ray(self.opm, self.stop, np.array([0., 0.]),
+                              fld, self.wvl)
+
+    def time_iterate_rays(self, model):
+        trace.iterate_rays(self.opm, self.stop,
+                           np.zeros((len(self.flds), 2)), self.flds, self.wvl)
+
+    def time_aim_chief_rays(self, model):
+        self.opm.optical_spec.ray_cache.invalidate()
+        trace.aim_chief_rays(self.opm, self.flds, self.wvl)
+
+
+class RayStream:
+    """ trace 10^5 rays in three wavelengths into an image histogram """
+    params = [['codev/tests/ag_dblgauss.seq'], [1024, 16384]]
+    param_names = ['model', 'chunk_size']
+
+    def setup(self, model, chunk_size):
+        self.opm = shared_test_model(model)
+        sm, pt0, dir0, wvl = trace_args(self.opm, pupil=(0., 0.))
+        rng = np.random.default_rng(0)
+        dirs = dir0 + rng.uniform(-0.05, 0.05, (100000, 3))
+        self.dirs = dirs/np.linalg.norm(dirs, axis=1)[:, np.newaxis]
+        self.pts = np.broadcast_to(pt0, self.dirs.shape)
+        self.wvls = np.array(sm.wvlns)[rng.integers(len(sm.wvlns),
+                                                     size=len(self.dirs))]
+
+    def time_trace_ray_stream(self, model, chunk_size):
+        hist = np.zeros((64, 64))
+
+        def histogram(chunk):
+            ok = chunk.status == 0
+            pts = chunk.pt[ok, -1]
+            hist[:] += np.histogram2d(pts[:, 0], pts[:, 1], bins=64,
+                                      range=[[-30, 30], [-30, 30]])[0]
+
+        for _ in analyses.trace_ray_stream(self.opm,
+                                           (self.pts, self.dirs, self.wvls),
+                                           chunk_size=chunk_size,
+                                           output_filter=histogram):
+            pass
+
+    def peakmem_trace_ray_stream(self, model, chunk_size):
+        self.time_trace_ray_stream(model, chunk_size)
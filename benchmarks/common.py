@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Shared setup for the benchmark suite
+
+.. codeauthor: Michael J. Hayford
+"""
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.util.misc_math import normalize
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+trace_models = ['codev/tests/singlet.seq',
+                'codev/tests/ag_dblgauss.seq',
+                'models/Sasian Triplet.roa',
+                'optical/tests/cell_phone_camera.roa']
+
+
+def open_test_model(filename):
+    """ open a new copy of the model **filename** in the rayoptics tree """
+    return open_model(root_pth/filename)
+
+
+@lru_cache(maxsize=None)
+def shared_test_model(filename):
+    """ returns a cached copy of **filename**, for read-only benchmarks """
+    return open_test_model(filename)
+
+
+def trace_args(opm, pupil=(0.5, 0.5), fi=0):
+    """ returns (seq_model, pt0, dir0, wvl) for a ray at **pupil** """
+    sm = opm.seq_model
+    osp = opm.optical_spec
+    fld, wvl, foc = osp.lookup_fld_wvl_focus(fi)
+    vig_pupil = fld.apply_vignetting(list(pupil))
+    fod = osp.parax_data.fod
+    eprad = fod.enp_radius
+    aim_pt = np.array([0., 0.]) if fld.aim_pt is None else fld.aim_pt
+    pt1 = np.array([eprad*vig_pupil[0] + aim_pt[0],
+                    eprad*vig_pupil[1] + aim_pt[1],
+                    fod.obj_dist+fod.enp_dist])
+    pt0 = osp.obj_coords(fld)
+    dir0 = normalize(pt1 - pt0)
+    return sm, pt0, dir0, wvl
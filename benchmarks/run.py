@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Offline runner for the benchmark suite
+
+The benchmarks follow the `asv <https://asv.readthedocs.io>`_ conventions:
+classes in the ``bench_*`` modules with ``time_*``, ``peakmem_*`` and
+``timeraw_*`` methods, a ``setup`` method and optional
+``params``/``param_names``. They can be run with asv, or without any extra
+dependencies by this module::
+
+    python -m benchmarks.run [-k PATTERN] [--save FILE] [--compare FILE]
+
+Every benchmark reports the best wall time per call and the peak memory
+allocated during a single call, as measured by :mod:`tracemalloc`. A
+``timeraw_*`` method returns a string of code that is timed in a fresh
+interpreter, e.g. to measure import times; no peak memory is reported for
+them. With
+``--compare``, results that are slower or use more memory than the
+baseline by more than ``--factor`` are reported as regressions and the
+exit status is 1, as it is if a benchmark fails.
+
+.. codeauthor: Michael J. Hayford
+"""
+import argparse
+import fnmatch
+import importlib
+import inspect
+import itertools
+import json
+import pkgutil
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+BENCHMARK_PREFIXES = ('time_', 'peakmem_', 'timeraw_')
+
+_timeraw_wrapper = """
+import sys, time
+code = compile(sys.argv[1], '<timeraw>', 'exec')
+t0 = time.perf_counter()
+exec(code, {'__name__': '__main__'})
+print(time.perf_counter() - t0)
+"""
+
+
+def param_combinations(cls):
+    """ returns the list of argument tuples for the benchmark class cls """
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    param_names = getattr(cls, 'param_names', [])
+    if len(param_names) > 1:
+        return list(itertools.product(*params))
+    return [(p,) for p in params]
+
+
+def discover(pattern=None):
+    """ returns a list of (name, cls, method_name, args) benchmarks """
+    pkg_dir = Path(__file__).resolve().parent
+    benchmarks = []
+    for mod_info in pkgutil.iter_modules([str(pkg_dir)]):
+        if not mod_info.name.startswith('bench_'):
+            continue
+        module = importlib.import_module(__package__ + '.' + mod_info.name)
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            methods = [m for m in dir(cls) if m.startswith(BENCHMARK_PREFIXES)]
+            for method, args in itertools.product(methods,
+                                                  param_combinations(cls)):
+                name = '{}.{}.{}'.format(mod_info.name, cls_name, method)
+                if args:
+                    name += '({})'.format(', '.join(repr(a) for a in args))
+                if pattern is None or fnmatch.fnmatch(name, '*'+pattern+'*'):
+                    benchmarks.append((name, cls, method, args))
+    return benchmarks
+
+
+def run_raw(code):
+    """ returns the seconds taken to execute **code** in a new interpreter """
+    proc = subprocess.run([sys.executable, '-c', _timeraw_wrapper, code],
+                          stdout=subprocess.PIPE, check=True,
+                          universal_newlines=True)
+    return float(proc.stdout.split()[-1])
+
+
+def run_benchmark(cls, method, args, repeat=5, quick=False):
+    """ run a single benchmark and return a dict of the results
+
+    Returns:
+        dict with **time** (best seconds per call, None for peakmem
+        benchmarks), **times** and **peakmem** (bytes, None for timeraw
+        benchmarks)
+    """
+    bench = cls()
+    if hasattr(bench, 'setup'):
+        bench.setup(*args)
+    fct = getattr(bench, method)
+
+    result = {'time': None, 'times': []}
+    if method.startswith('timeraw_'):
+        code = fct(*args)
+        times = [run_raw(code) for i in range(1 if quick else repeat)]
+        result['time'] = min(times)
+        result['times'] = times
+        result['peakmem'] = None
+        if hasattr(bench, 'teardown'):
+            bench.teardown(*args)
+        return result
+
+    if method.startswith('time_'):
+        timer = timeit.Timer(lambda: fct(*args))
+        if quick:
+            number, repeat = 1, 1
+        else:
+            number, _ = timer.autorange()
+        times = [t/number for t in timer.repeat(repeat=repeat, number=number)]
+        result['time'] = min(times)
+        result['times'] = times
+
+    tracemalloc.start()
+    try:
+        fct(*args)
+        result['peakmem'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    if hasattr(bench, 'teardown'):
+        bench.teardown(*args)
+    return result
+
+
+def format_time(t):
+    if t is None:
+        return '-'
+    for unit, scale in (('s', 1.), ('ms', 1e-3), ('us', 1e-6)):
+        if t >= scale:
+            return '{:.3g} {}'.format(t/scale, unit)
+    return '{:.3g} ns'.format(t/1e-9)
+
+
+def format_mem(m):
+    if m is None:
+        return '-'
+    for unit, scale in (('MiB', 2**20), ('KiB', 2**10)):
+        if m >= scale:
+            return '{:.3g} {}'.format(m/scale, unit)
+    return '{} B'.format(m)
+
+
+def compare(results, baseline, factor):
+    """ returns a list of (name, quantity, ratio) regressions vs baseline """
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for quantity in ('time', 'peakmem'):
+            if res.get(quantity) is None or not base.get(quantity):
+                continue
+            ratio = res[quantity]/base[quantity]
+            if ratio > factor:
+                regressions.append((name, quantity, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='pattern', default=None,
+                        help='run only the benchmarks matching PATTERN')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true',
+                        help='call each benchmark once, for a smoke test')
+    parser.add_argument('--save', help='save the results to a json file')
+    parser.add_argument('--compare', help='json file of baseline results')
+    parser.add_argument('--factor', type=float, default=1.5,
+                        help='ratio to the baseline flagged as a regression')
+    opts = parser.parse_args(argv)
+
+    results = {}
+    failed = False
+    for name, cls, method, args in discover(opts.pattern):
+        try:
+            res = run_benchmark(cls, method, args, repeat=opts.repeat,
+                                quick=opts.quick)
+        except NotImplementedError:
+            # asv convention for a skipped benchmark
+            continue
+        except Exception as exc:
+            print('{:<72s} FAILED: {!r}'.format(name, exc), flush=True)
+            failed = True
+            continue
+        results[name] = res
+        print('{:<72s} {:>10s} {:>10s}'.format(name, format_time(res['time']),
+                                               format_mem(res['peakmem'])),
+              flush=True)
+
+    if opts.save:
+        with open(opts.save, mode='w') as f:
+            json.dump(results, f, indent=1)
+
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, opts.factor)
+        for name, quantity, ratio in regressions:
+            print('REGRESSION {} {}: {:.2f}x baseline'.format(name, quantity,
+                                                              ratio))
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -26,13 +26,6 @@
     and other miscellaneous calculations.
 """
 
-import pkg_resources
-
-try:
-    __version__ = pkg_resources.get_distribution(__name__).version
-except:
-    __version__ = 'unknown'
-
 from ._version import get_versions
 __version__ = get_versions()['version']
 del get_versions
@@ -25,7 +25,6 @@ from rayoptics.seq.medium import (Air, Glass, InterpolatedGlass, Medium,
 from rayoptics.raytr.opticalspec import Field
 from rayoptics.util.misc_math import isanumber
 
-from opticalglass import glassfactory as gfact
 from opticalglass import glasserror
 from opticalglass import util
 
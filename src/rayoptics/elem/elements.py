@@ -21,11 +21,9 @@ from rayoptics.elem.surface import Surface
 from rayoptics.seq.gap import Gap
 from rayoptics.seq.medium import Glass, glass_decode
 
-import rayoptics.gui.appcmds as cmds
 from rayoptics.gui.actions import (Action, AttrAction, SagAction, BendAction,
                                    ReplaceGlassAction)
 
-import opticalglass.glasspolygons as gp
 
 GraphicsHandle = namedtuple('GraphicsHandle', ['polydata', 'tfrm', 'polytype'])
 GraphicsHandle.polydata.__doc__ = "poly data in local coordinates"
@@ -121,6 +119,7 @@ def create_air_gap(t=0., ref_ifc=None):
 
 
 def create_from_file(filename, **kwargs):
+    import rayoptics.gui.appcmds as cmds
     opm = cmds.open_model(filename)
     sm = opm.seq_model
     osp = opm.optical_spec
@@ -270,6 +269,7 @@ class Element():
             return (255, 255, 255, 64)  # white
         else:
             # set element color based on V-number
+            import opticalglass.glasspolygons as gp
             indx, vnbr = glass_decode(gc)
             dsg, rgb = gp.find_glass_designation(indx, vnbr)
             if rgb is None:
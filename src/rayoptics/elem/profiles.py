@@ -13,6 +13,7 @@ from scipy import optimize
 
 from rayoptics.util.misc_math import normalize
 from rayoptics.raytr.traceerror import TraceError, TraceMissedSurfaceError
+from rayoptics.raytr import tracestats
 
 
 def resize_list(lst, new_length, null_item=None):
@@ -82,6 +83,15 @@ class SurfaceProfile:
         """Apply *scale_factor* to the profile definition. """
         pass
 
+    def aspheric_4th_order_term(self):
+        """Returns the 4th order sag coefficient in excess of the sphere.
+
+        This is the term *G* of the aspheric third order aberration
+        contributions; it is 0 for profiles without a rotationally symmetric
+        4th order deformation.
+        """
+        return 0.
+
     def intersect(self, p0, d, eps, z_dir):
         ''' Intersect a profile, starting from an arbitrary point.
 
@@ -99,6 +109,72 @@ class SurfaceProfile:
         '''
         return self.intersect_spencer(p0, d, eps, z_dir)
 
+    def f_many(self, ps):
+        """Returns the profile surface function at the (N, 3) points *ps*.
+
+        The base implementation calls :meth:`f` for each point. Points
+        outside the domain of the profile return NaN.
+        """
+        f = np.full(len(ps), np.nan)
+        for i, p in enumerate(ps):
+            try:
+                f[i] = self.f(p)
+            except TraceMissedSurfaceError:
+                pass
+        return f
+
+    def df_many(self, ps):
+        """Returns the profile gradients at the (N, 3) points *ps*.
+
+        The base implementation calls :meth:`df` for each point. Points
+        outside the domain of the profile return NaN.
+        """
+        df = np.full((len(ps), 3), np.nan)
+        for i, p in enumerate(ps):
+            try:
+                df[i] = self.df(p)
+            except TraceMissedSurfaceError:
+                pass
+        return df
+
+    def normal_many(self, ps):
+        """Returns the unit normals of the profile at the (N, 3) points *ps*. """
+        df = self.df_many(ps)
+        return df/np.linalg.norm(df, axis=1)[:, np.newaxis]
+
+    def sag_many(self, x, y):
+        """Returns the sagitta of the surface at the arrays *x*, *y*.
+
+        The base implementation calls :meth:`sag` for each point. Points
+        outside the domain of the profile return NaN.
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        z = np.full(x.shape, np.nan)
+        for i in np.ndindex(x.shape):
+            try:
+                z[i] = self.sag(x[i], y[i])
+            except TraceMissedSurfaceError:
+                pass
+        return z
+
+    def intersect_many(self, p0s, ds, eps, z_dir):
+        ''' Intersect an array of rays with the profile.
+
+        Args:
+            p0s: (N, 3) array of start points in the profile's coordinate system
+            ds: (N, 3) array of direction cosines in the profile's coordinate
+                system
+            eps: numeric tolerance for convergence of any iterative procedure
+            z_dir: +1 if propagation positive direction, -1 if otherwise
+
+        Returns:
+            tuple: (N,) array of distances to the intersection points *s1*,
+            (N, 3) array of intersection points *p*. Rays that miss the
+            profile have a distance of NaN.
+        '''
+        return self.intersect_spencer_many(p0s, ds, eps, z_dir)
+
     def intersect_welford(self, p, d, eps, z_dir):
         ''' Intersect a profile, starting from an arbitrary point.
 
@@ -172,6 +248,52 @@ class SurfaceProfile:
             s1 = s2
             iter += 1
         # print('intersect iter =', iter)
+        if tracestats.current is not None:
+            tracestats.record_iterations(iter, 1000)
+        return s1, p
+
+    def intersect_spencer_many(self, p0s, ds, eps, z_dir):
+        ''' Array counterpart to :meth:`intersect_spencer`.
+
+        Each ray is iterated until it converges; subsequent Newton steps are
+        only evaluated for the unconverged subset of rays.
+
+        Args:
+            p0s: (N, 3) array of start points in the profile's coordinate system
+            ds: (N, 3) array of direction cosines in the profile's coordinate
+                system
+            eps: numeric tolerance for convergence of any iterative procedure
+            z_dir: +1 if propagation positive direction, -1 if otherwise
+
+        Returns:
+            tuple: (N,) array of distances to the intersection points *s1*,
+            (N, 3) array of intersection points *p*. Rays that miss the
+            profile have a distance of NaN.
+        '''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s1 = (-self.f_many(p0s) /
+                  np.einsum('ij,ij->i', ds, self.df_many(p0s)))
+            p = np.array(p0s, dtype=float)
+            active = np.flatnonzero(np.abs(s1) > eps)
+            stats = tracestats.current
+            if stats is not None:
+                num_iter = np.zeros(len(s1), dtype=int)
+            iter = 0
+            while len(active) > 0 and iter < 1000:
+                s_a = s1[active]
+                p_a = p0s[active] + s_a[:, np.newaxis]*ds[active]
+                s2 = s_a - (self.f_many(p_a) /
+                            np.einsum('ij,ij->i', ds[active],
+                                      self.df_many(p_a)))
+                p[active] = p_a
+                s1[active] = s2
+                if stats is not None:
+                    num_iter[active] += 1
+                active = active[np.abs(s2 - s_a) > eps]
+                iter += 1
+        if stats is not None:
+            tracestats.record_iterations(num_iter[~np.isnan(s1)], 1000)
+        p[np.isnan(s1)] = np.nan
         return s1, p
 
     def intersect_scipy(self, p0, d, eps, z_dir):
@@ -296,9 +418,29 @@ class Spherical(SurfaceProfile):
         p1 = p + s*d
         return s, p1
 
+    def intersect_many(self, p0s, ds, eps, z_dir):
+        ''' Intersection of an array of rays with a sphere. '''
+        ax2 = self.cv
+        cx2 = self.cv * np.einsum('ij,ij->i', p0s, p0s) - 2*p0s[:, 2]
+        b = self.cv * np.einsum('ij,ij->i', ds, p0s) - ds[:, 2]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Use z_dir to pick correct root; misses produce NaN
+            s = cx2/(z_dir*np.sqrt(b*b - ax2*cx2) - b)
+
+        p1 = p0s + s[:, np.newaxis]*ds
+        return s, p1
+
     def f(self, p):
         return p[2] - 0.5*self.cv*(np.dot(p, p))
 
+    def f_many(self, ps):
+        return ps[:, 2] - 0.5*self.cv*np.einsum('ij,ij->i', ps, ps)
+
+    def df_many(self, ps):
+        df = -self.cv*ps
+        df[:, 2] += 1.0
+        return df
+
     def df(self, p):
         return np.array(
                 [-self.cv*p[0], -self.cv*p[1], 1.0-self.cv*p[2]])
@@ -315,6 +457,17 @@ class Spherical(SurfaceProfile):
         else:
             return 0
 
+    def sag_many(self, x, y):
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        if self.cv != 0.0:
+            r = 1/self.cv
+            with np.errstate(invalid='ignore'):
+                adj = np.sqrt(r*r - x*x - y*y)
+            return r*(1 - np.abs(adj/r))
+        else:
+            return np.zeros(x.shape)
+
     def profile(self, sd, dir=1, steps=6):
         prf = []
         if len(sd) == 1:
@@ -428,6 +581,9 @@ class Conic(SurfaceProfile):
         self.cv = other.cv
         self.cc = other.cc
 
+    def aspheric_4th_order_term(self):
+        return self.cc*self.cv**3/8.0
+
     def apply_scale_factor(self, scale_factor):
         self.cv /= scale_factor
 
@@ -468,6 +624,20 @@ class Conic(SurfaceProfile):
         p1 = p + s*d
         return s, p1
 
+    def intersect_many(self, p0s, ds, eps, z_dir):
+        ''' Intersection of an array of rays with a conic. '''
+        x, y, z = p0s[:, 0], p0s[:, 1], p0s[:, 2]
+        dx, dy, dz = ds[:, 0], ds[:, 1], ds[:, 2]
+        ax2 = self.cv*(1. + self.cc*dz*dz)
+        cx2 = self.cv*(x*x + y*y + self.ec*z*z) - 2.0*z
+        b = self.cv*(dx*x + dy*y + self.ec*dz*z) - dz
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Use z_dir to pick correct root; misses produce NaN
+            s = cx2/(z_dir*np.sqrt(b*b - ax2*cx2) - b)
+
+        p1 = p0s + s[:, np.newaxis]*ds
+        return s, p1
+
     def f(self, p):
         return p[2] - 0.5*self.cv*(p[0]*p[0] +
                                    p[1]*p[1] +
@@ -479,6 +649,15 @@ class Conic(SurfaceProfile):
                  -self.cv*p[1],
                  1.0-(self.cc+1.0)*self.cv*p[2]])
 
+    def f_many(self, ps):
+        x, y, z = ps[:, 0], ps[:, 1], ps[:, 2]
+        return z - 0.5*self.cv*(x*x + y*y + (self.cc+1.0)*z*z)
+
+    def df_many(self, ps):
+        df = -self.cv*ps
+        df[:, 2] = 1.0 - (self.cc+1.0)*self.cv*ps[:, 2]
+        return df
+
     def sag(self, x, y):
         r2 = x*x + y*y
         try:
@@ -487,6 +666,11 @@ class Conic(SurfaceProfile):
             raise TraceMissedSurfaceError
         return z
 
+    def sag_many(self, x, y):
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        return conic_sag_many(self.cv, self.cc+1.0, x*x + y*y)
+
     def profile(self, sd, dir=1, steps=6):
         prf = []
         if len(sd) == 1:
@@ -512,6 +696,12 @@ class Conic(SurfaceProfile):
         return prf
 
 
+def conic_sag_many(cv, ec, r2):
+    """ sag of a conic at an array of squared radii, NaN outside the conic """
+    with np.errstate(invalid='ignore'):
+        return cv*r2/(1. + np.sqrt(1. - ec*cv*cv*r2))
+
+
 def append_pt_to_2d_profile(surface_profile, y, poly_profile):
     """ calc surface sag at y and append to poly if ok, else return None """
     try:
@@ -537,11 +727,12 @@ def aspheric_profile(surface_profile, sd, dir=1, steps=21):
 
     if surface_profile.max_nonzero_coef > 0 or surface_profile.cv != 0.0:
         delta = dir*(sd_upr-sd_lwr)/(2*steps)
-        y = sd_lwr if dir > 0 else sd_upr
-        append_pt_to_2d_profile(surface_profile, y, prf)
-        for i in range(2*steps):
-            y += delta
-            append_pt_to_2d_profile(surface_profile, y, prf)
+        y0 = sd_lwr if dir > 0 else sd_upr
+        y = y0 + delta*np.arange(2*steps+1)
+        z = surface_profile.sag_many(0., y)
+        # drop the points that fall outside the profile's domain
+        ok = np.isfinite(z)
+        prf = np.column_stack((z[ok], y[ok])).tolist()
     else:
         prf.append([0, dir*sd_lwr])
         prf.append([0, dir*sd_upr])
@@ -639,6 +830,7 @@ class EvenPolynomial(SurfaceProfile):
         self.coef20 = other.coef20
 
     def gen_coef_list(self):
+        self.max_nonzero_coef = -1
         if len(self.coefs) == 0:
             self.coefs = []
             self.coefs.append(self.coef2)
@@ -651,12 +843,15 @@ class EvenPolynomial(SurfaceProfile):
             self.coefs.append(self.coef16)
             self.coefs.append(self.coef18)
             self.coefs.append(self.coef20)
-            self.max_nonzero_coef = -1
         for i, c in enumerate(self.coefs):
             if c != 0.0:
                 self.max_nonzero_coef = i
         self.max_nonzero_coef += 1
 
+    def aspheric_4th_order_term(self):
+        coef4 = self.coefs[1] if len(self.coefs) > 1 else self.coef4
+        return self.cc*self.cv**3/8.0 + coef4
+
     def apply_scale_factor(self, scale_factor):
         self.cv /= scale_factor
         sf_sqr = scale_factor**2
@@ -713,6 +908,40 @@ class EvenPolynomial(SurfaceProfile):
         e_tot = e + e_asp
         return np.array([-e_tot*p[0], -e_tot*p[1], 1.0])
 
+    def sag_many(self, x, y):
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        r2 = x*x + y*y
+        # sphere + conic contribution
+        z = conic_sag_many(self.cv, self.cc+1.0, r2)
+
+        # polynomial asphere contribution
+        r_pow = r2
+        for i in range(self.max_nonzero_coef):
+            z = z + self.coefs[i]*r_pow
+            r_pow = r_pow*r2
+        return z
+
+    def f_many(self, ps):
+        return ps[:, 2] - self.sag_many(ps[:, 0], ps[:, 1])
+
+    def df_many(self, ps):
+        # sphere + conic contribution
+        r2 = ps[:, 0]*ps[:, 0] + ps[:, 1]*ps[:, 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            e = self.cv/np.sqrt(1. - self.ec*self.cv*self.cv*r2)
+
+        # polynomial asphere contribution
+        r_pow = np.sqrt(r2)  # = r
+        c_coef = 2.0
+        for i in range(self.max_nonzero_coef):
+            e = e + c_coef*self.coefs[i]*r_pow
+            c_coef += 2.0
+            r_pow = r_pow*r2
+
+        return np.column_stack((-e*ps[:, 0], -e*ps[:, 1],
+                                np.ones(len(ps))))
+
     def profile(self, sd, dir=1, steps=21):
         return aspheric_profile(self, sd, dir, steps)
 
@@ -831,6 +1060,7 @@ class RadialPolynomial(SurfaceProfile):
         self.coef10 = other.coef10
 
     def gen_coef_list(self):
+        self.max_nonzero_coef = -1
         if len(self.coefs) == 0:
             self.coefs = []
             self.coefs.append(self.coef1)
@@ -843,12 +1073,15 @@ class RadialPolynomial(SurfaceProfile):
             self.coefs.append(self.coef8)
             self.coefs.append(self.coef9)
             self.coefs.append(self.coef10)
-            self.max_nonzero_coef = -1
         for i, c in enumerate(self.coefs):
             if c != 0.0:
                 self.max_nonzero_coef = i
         self.max_nonzero_coef += 1
 
+    def aspheric_4th_order_term(self):
+        coef4 = self.coefs[3] if len(self.coefs) > 3 else self.coef4
+        return self.cc*self.cv**3/8.0 + coef4
+
     def apply_scale_factor(self, scale_factor):
         self.cv /= scale_factor
         self.coef1 *= scale_factor
@@ -911,6 +1144,42 @@ class RadialPolynomial(SurfaceProfile):
         e_tot = e + e_asp
         return np.array([-e_tot*p[0], -e_tot*p[1], 1.0])
 
+    def sag_many(self, x, y):
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        r2 = x*x + y*y
+        r = np.sqrt(r2)
+        # sphere + conic contribution
+        z = conic_sag_many(self.cv, self.ec, r2)
+
+        # polynomial asphere contribution
+        r_pow = r
+        for coef in self.coefs[:self.max_nonzero_coef]:
+            z = z + coef*r_pow
+            r_pow = r_pow*r
+        return z
+
+    def f_many(self, ps):
+        return ps[:, 2] - self.sag_many(ps[:, 0], ps[:, 1])
+
+    def df_many(self, ps):
+        # sphere + conic contribution
+        r2 = ps[:, 0]*ps[:, 0] + ps[:, 1]*ps[:, 1]
+        r = np.sqrt(r2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            e = self.cv/np.sqrt(1. - self.ec*self.cv*self.cv*r2)
+
+        # polynomial asphere contribution - compute using Horner's Rule
+        r_pow = 1.0
+        c_coef = 1.0
+        for coef in self.coefs[:self.max_nonzero_coef]:
+            e = e + c_coef*coef*r_pow
+            c_coef += 1.0
+            r_pow = r_pow*r
+
+        return np.column_stack((-e*ps[:, 0], -e*ps[:, 1],
+                                np.ones(len(ps))))
+
     def profile(self, sd, dir=1, steps=21):
         return aspheric_profile(self, sd, dir, steps)
 
@@ -1032,6 +1301,7 @@ class YToroid(SurfaceProfile):
         self.coef20 = other.coef20
 
     def gen_coef_list(self):
+        self.max_nonzero_coef = -1
         if len(self.coefs) == 0:
             self.coefs = []
             self.coefs.append(self.coef2)
@@ -1044,7 +1314,6 @@ class YToroid(SurfaceProfile):
             self.coefs.append(self.coef16)
             self.coefs.append(self.coef18)
             self.coefs.append(self.coef20)
-            self.max_nonzero_coef = -1
         for i, c in enumerate(self.coefs):
             if c != 0.0:
                 self.max_nonzero_coef = i
@@ -1123,6 +1392,56 @@ class YToroid(SurfaceProfile):
 
         return np.array([Fx, Fy, Fz])
 
+    def sag_many(self, x, y):
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        fY = self.fY_many(y)
+        if self.cR == 0:
+            return fY
+        else:
+            rRp = self.rR - fY
+            with np.errstate(invalid='ignore'):
+                z = rRp - np.sqrt(rRp*rRp - x*x)
+            return z + fY
+
+    def fY_many(self, y):
+        y2 = y*y
+        # sphere + conic contribution
+        z = conic_sag_many(self.cv, self.cc+1.0, y2)
+
+        # polynomial asphere contribution
+        y_pow = y2
+        for i in range(self.max_nonzero_coef):
+            z = z + self.coefs[i]*y_pow
+            y_pow = y_pow*y2
+        return z
+
+    def f_many(self, ps):
+        fY = self.fY_many(ps[:, 1])
+        return (ps[:, 2] - fY -
+                self.cR*(ps[:, 0]*ps[:, 0] + ps[:, 2]*ps[:, 2] - fY*fY)/2)
+
+    def df_many(self, ps):
+        # sphere + conic contribution
+        y = ps[:, 1]
+        y2 = y*y
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dfdY = (self.cv*y)/np.sqrt(1. - (self.cc+1.0)*self.cv*self.cv*y2)
+
+        # polynomial asphere contribution
+        y_pow = 1.0
+        c_coef = 2.0
+        for i in range(self.max_nonzero_coef):
+            dfdY = dfdY + c_coef*self.coefs[i]*y_pow
+            c_coef += 2.0
+            y_pow = y_pow*y2
+
+        Fx = -self.cR*ps[:, 0]
+        Fy = (self.cR*self.fY_many(y) - 1)*(dfdY)
+        Fz = 1 - self.cR*ps[:, 2]
+
+        return np.column_stack((Fx, Fy, Fz))
+
     def profile(self, sd, dir=1, steps=21):
         return aspheric_profile(self, sd, dir, steps)
 
@@ -1162,6 +1481,18 @@ class XToroid(YToroid):
     def df(self, p):
         return super().df(np.array([p[1], p[0], p[2]]))
 
+    def normal_many(self, ps):
+        return super().normal_many(ps[:, [1, 0, 2]])
+
+    def sag_many(self, x, y):
+        return super().sag_many(y, x)
+
+    def f_many(self, ps):
+        return super().f_many(ps[:, [1, 0, 2]])
+
+    def df_many(self, ps):
+        return super().df_many(ps[:, [1, 0, 2]])
+
 
 dispatch = {
   (Spherical, Spherical): Spherical.copyDataFrom,
@@ -27,7 +27,7 @@
 """
 
 from enum import Enum, auto
-from math import sqrt
+from math import sqrt, cos, sin, radians
 import numpy as np
 
 from rayoptics.seq import interface
@@ -122,6 +122,18 @@ class Surface(interface.Interface):
     def z_sag(self, pt):
         return self.profile.sag(0., pt[1])
 
+    def points_inside(self, x, y):
+        """ returns True where (x, y) is within one of the clear apertures
+
+        Every point is inside a surface without clear apertures.
+        """
+        if len(self.clear_apertures) == 0:
+            return super().points_inside(x, y)
+        inside = np.zeros(np.shape(x), dtype=bool)
+        for ca in self.clear_apertures:
+            inside |= ca.points_inside(x, y)
+        return inside
+
     def set_z_sag(self, pt):
         self.profile.cv = self.calc_cv_from_zsag(pt)
 
@@ -197,9 +209,15 @@ class Surface(interface.Interface):
     def intersect(self, p0, d, eps=1.0e-12, z_dir=1.0):
         return self.profile.intersect(p0, d, eps, z_dir)
 
+    def intersect_many(self, p0s, ds, eps=1.0e-12, z_dir=1.0):
+        return self.profile.intersect_many(p0s, ds, eps, z_dir)
+
     def normal(self, p):
         return self.profile.normal(p)
 
+    def normal_many(self, ps):
+        return self.profile.normal_many(ps)
+
 
 class DecenterData():
     """ Maintains data and actions for position and orientation changes.
@@ -282,6 +300,10 @@ class Aperture():
     def point_inside(self, x, y):
         pass
 
+    def points_inside(self, x, y):
+        """ vectorized :meth:`point_inside` for arrays of x and y """
+        return np.vectorize(self.point_inside, otypes=[bool])(x, y)
+
     def bounding_box(self):
         center = np.array([self.x_offset, self.y_offset])
         extent = np.array(self.dimension())
@@ -292,8 +314,13 @@ class Aperture():
         self.y_offset *= scale_factor
 
     def tform(self, x, y):
-        x -= self.x_offset
-        y -= self.y_offset
+        """ returns x, y in aperture coordinates, i.e. with the offsets
+        removed and rotated by -rotation (in degrees) """
+        x = x - self.x_offset
+        y = y - self.y_offset
+        if self.rotation != 0.0:
+            c, s = cos(radians(self.rotation)), sin(radians(self.rotation))
+            x, y = c*x + s*y, c*y - s*x
         return x, y
 
 
@@ -315,6 +342,10 @@ class Circular(Aperture):
         x, y = self.tform(x, y)
         return sqrt(x*x + y*y) <= self.radius
 
+    def points_inside(self, x, y):
+        x, y = self.tform(np.asarray(x), np.asarray(y))
+        return x*x + y*y <= self.radius*self.radius
+
     def apply_scale_factor(self, scale_factor):
         super().apply_scale_factor(scale_factor)
         self.radius *= scale_factor
@@ -337,6 +368,11 @@ class Rectangular(Aperture):
         x, y = self.tform(x, y)
         return abs(x) <= self.x_half_width and abs(y) <= self.y_half_width
 
+    def points_inside(self, x, y):
+        x, y = self.tform(np.asarray(x), np.asarray(y))
+        return ((np.abs(x) <= self.x_half_width) &
+                (np.abs(y) <= self.y_half_width))
+
     def apply_scale_factor(self, scale_factor):
         super().apply_scale_factor(scale_factor)
         self.x_half_width *= scale_factor
@@ -356,6 +392,14 @@ class Elliptical(Aperture):
         self.x_half_width = abs(x)
         self.y_half_width = abs(y)
 
+    def point_inside(self, x, y):
+        x, y = self.tform(x, y)
+        return ((x/self.x_half_width)**2 +
+                (y/self.y_half_width)**2) <= 1.0
+
+    def points_inside(self, x, y):
+        return self.point_inside(np.asarray(x), np.asarray(y))
+
     def apply_scale_factor(self, scale_factor):
         super().apply_scale_factor(scale_factor)
         self.x_half_width *= scale_factor
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare the vectorized aperture tests against the single point tests
+
+"""
+
+
+import unittest
+import numpy as np
+import numpy.testing as npt
+
+from rayoptics.elem.surface import (Surface, Circular, Rectangular,
+                                    Elliptical)
+
+
+class ApertureTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x, self.y = rng.uniform(-3., 3., (2, 500))
+
+    def test_points_inside(self):
+        apertures = [Circular(radius=2., x_offset=0.5),
+                     Rectangular(x_half_width=2., y_half_width=1.,
+                                 y_offset=-0.5, rotation=30.),
+                     Elliptical(x_half_width=2.5, y_half_width=1.5,
+                                x_offset=0.3, rotation=-45.)]
+        for ap in apertures:
+            inside = ap.points_inside(self.x, self.y)
+            npt.assert_array_equal(inside, [ap.point_inside(x, y)
+                                            for x, y in zip(self.x, self.y)])
+            self.assertTrue(0 < np.count_nonzero(inside) < len(self.x))
+
+        # a rotation of 90 degrees swaps the rectangle's axes
+        rect = Rectangular(x_half_width=2., y_half_width=1., rotation=90.)
+        npt.assert_array_equal(rect.points_inside(self.x, self.y),
+                               (np.abs(self.x) <= 1.) & (np.abs(self.y) <= 2.))
+
+    def test_surface_apertures(self):
+        s = Surface()
+        self.assertTrue(np.all(s.points_inside(self.x, self.y)))
+        s.clear_apertures = [Circular(radius=1., x_offset=-1.),
+                             Circular(radius=1., x_offset=1.)]
+        npt.assert_array_equal(s.points_inside(self.x, self.y),
+                               ((self.x + 1.)**2 + self.y**2 <= 1.) |
+                               ((self.x - 1.)**2 + self.y**2 <= 1.))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -9,7 +9,9 @@ Created on Wed Oct 18 10:59:29 2017
 
 import unittest
 from pytest import approx
-from rayoptics.elem.profiles import Spherical, EvenPolynomial
+from rayoptics.elem.profiles import (Spherical, Conic, EvenPolynomial,
+                                     RadialPolynomial, YToroid, XToroid)
+from rayoptics.raytr.traceerror import TraceError
 from rayoptics.util.misc_math import normalize
 import numpy as np
 import numpy.testing as npt
@@ -154,5 +156,54 @@ class SphericalProfileTestCase(unittest.TestCase):
         npt.assert_allclose(dir_p1s1, dir_p1s1_truth, rtol=1e-14)
 
 
+class ProfileArrayTestCase(unittest.TestCase):
+    """ compare the array methods against the single point methods """
+
+    def setUp(self):
+        self.eps = 1.0e-12
+        self.z_dir = 1.0
+        num_rays = 100
+        x, y = np.meshgrid(np.linspace(-40., 40., 10),
+                           np.linspace(-40., 40., 10))
+        self.p0s = np.column_stack((x.ravel(), y.ravel(),
+                                    np.zeros(num_rays)))
+        dirs = np.column_stack((0.005*y.ravel(), -0.005*x.ravel(),
+                                np.ones(num_rays)))
+        self.dirs = dirs/np.linalg.norm(dirs, axis=1)[:, np.newaxis]
+        self.profiles = [
+            Spherical(c=0.02),
+            Conic(c=-0.03, cc=-1.5),
+            EvenPolynomial(c=0.03, cc=-0.5, coefs=[0., 1e-5, -2e-8]),
+            RadialPolynomial(c=0.03, ec=0.5, coefs=[0., 1e-3, 1e-5]),
+            YToroid(c=0.03, cR=0.01, cc=-0.5, coefs=[0., 1e-5]),
+            XToroid(c=0.03, cR=-0.01, cc=0.2, coefs=[0., 1e-5]),
+            ]
+
+    def test_intersect_many(self):
+        for prf in self.profiles:
+            prf.update()
+            s, p = prf.intersect_many(self.p0s, self.dirs,
+                                      self.eps, self.z_dir)
+            for i, (p0, d) in enumerate(zip(self.p0s, self.dirs)):
+                try:
+                    si, pi = prf.intersect(p0, d, self.eps, self.z_dir)
+                except (TraceError, ValueError):
+                    self.assertTrue(np.isnan(s[i]), msg=repr(prf))
+                else:
+                    assert s[i] == approx(si, abs=1e-10)
+                    npt.assert_allclose(p[i], pi, atol=1e-10)
+
+    def test_sag_and_normal_many(self):
+        x, y = self.p0s[:, 0]/4, self.p0s[:, 1]/4
+        for prf in self.profiles:
+            prf.update()
+            z = prf.sag_many(x, y)
+            ps = np.column_stack((x, y, z))
+            nrml = prf.normal_many(ps)
+            for i in range(len(x)):
+                npt.assert_allclose(z[i], prf.sag(x[i], y[i]), atol=1e-14)
+                npt.assert_allclose(nrml[i], prf.normal(ps[i]), atol=1e-14)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=3)
@@ -137,3 +137,31 @@ def transform_after_surface(interface, ray_seg):
         b4_pt, b4_dir = ray_seg[0], ray_seg[1]
 
     return b4_pt, b4_dir
+
+
+def transform_after_surface_many(interface, ray_segs):
+    """Transform arrays of ray segments from interface to following seg.
+
+    Args:
+        interface: the :class:'~seq.interface.Interface' for the path sequence
+        ray_segs: (pts, dirs), (N, 3) arrays of the ray segments exiting from
+                  **interface**
+
+    Returns:
+        (**b4_pts**, **b4_dirs**)
+
+        - **b4_pts** - ray intersection pts wrt following seg
+        - **b4_dirs** - ray direction cosines wrt following seg
+    """
+    pts, dirs = ray_segs
+    if interface.decenter:
+        # get transformation info after surf
+        r, t = interface.decenter.tform_after_surf()
+        if r is None:
+            b4_pts, b4_dirs = (pts - t), dirs
+        else:
+            b4_pts, b4_dirs = (pts - t).dot(r), dirs.dot(r)
+    else:
+        b4_pts, b4_dirs = pts, dirs
+
+    return b4_pts, b4_dirs
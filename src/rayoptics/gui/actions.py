@@ -25,8 +25,6 @@
 
 import math
 
-from opticalglass import glassfactory as gfact
-
 
 class Action():
     """ Action built on a set/get function pair """
@@ -165,6 +163,7 @@ class ReplaceGlassAction():
         self.update = update
 
     def __call__(self, fig, event):
+        from opticalglass import glassfactory as gfact
         mime = event.mimeData()
         # comma separated list
         glass_name, catalog_name = mime.text().split(',')
@@ -9,13 +9,9 @@
 """
 
 import os.path
-import json_tricks
 import math
 import pathlib
 
-from opticalglass import glassmap as gm
-from opticalglass import glassfactory as gfact
-
 import rayoptics.codev.cmdproc as cvp
 from rayoptics.zemax import zmxread
 
@@ -34,23 +30,11 @@ import rayoptics.seq.medium as medium
 
 from rayoptics.gui.appmanager import ModelInfo
 from rayoptics.gui.roafile import open_roa
+from rayoptics.optical import snapshot
 
-from rayoptics.mpl.interactivelayout import InteractiveLayout
-from rayoptics.mpl.axisarrayfigure import Fit
-from rayoptics.mpl.axisarrayfigure import (RayFanFigure, SpotDiagramFigure,
-                                           WavefrontFigure)
-
-from rayoptics.mpl.analysisplots import FieldCurveFigure, ThirdOrderBarChart
-import rayoptics.mpl.interactivediagram as dgm
-
-import rayoptics.qtgui.plotview as plotview
-from rayoptics.qtgui.idealimagerdialog import IdealImagerDialog
-from rayoptics.qtgui.pytablemodel import PyTableModel
-from rayoptics.qtgui.plotview import (create_plot_scale_panel,
-                                      create_draw_rays_groupbox,
-                                      create_diagram_controls_groupbox,
-                                      create_2d_figure_toolbar)
-
+# The matplotlib and Qt based views, the glass map and the table models are
+# imported by the functions that create them, so that opening, tracing and
+# analyzing models doesn't load the GUI toolkits.
 
 def open_model(file_name, info=False, **kwargs):
     """ open a file and populate an optical model with the data
@@ -59,6 +43,7 @@ def open_model(file_name, info=False, **kwargs):
         file_name (str): a filename of a supported file type
 
             - .roa - a rayoptics JSON encoded file
+            - .rob - a rayoptics binary snapshot, see :mod:`~.snapshot`
             - .seq - a CODE V (TM) sequence file
             - .zmx - a Zemax (TM) lens file
         info (bool): if true, return an info tuple with import statistics
@@ -77,6 +62,8 @@ def open_model(file_name, info=False, **kwargs):
             return opm, import_info
     elif file_extension == '.roa':
         opm = open_roa(file_name, **kwargs)
+    elif file_extension == snapshot.snapshot_extension:
+        opm = snapshot.load_snapshot(file_name)
     elif file_extension == '.zmx':
         opm, import_info = zmxread.read_lens_file(file_name, **kwargs)
         if info:
@@ -136,6 +123,7 @@ def update_specsheet(iid, opt_model):
 
 
 def create_new_ideal_imager(**inputs):
+    from rayoptics.qtgui.idealimagerdialog import IdealImagerDialog
     specsheets = {}
     conj_type = (inputs['conjugate_type'] if 'conjugate_type' in inputs
                  else 'finite')
@@ -192,6 +180,8 @@ def get_defaults_from_gui_parent(gui_parent):
 
 
 def create_live_layout_view(opt_model, gui_parent=None):
+    from rayoptics.mpl.interactivelayout import InteractiveLayout
+    import rayoptics.qtgui.plotview as plotview
     refresh_gui, is_dark = get_defaults_from_gui_parent(gui_parent)
     fig = InteractiveLayout(opt_model, refresh_gui=refresh_gui,
                             do_draw_frame=True,
@@ -203,8 +193,8 @@ def create_live_layout_view(opt_model, gui_parent=None):
     view_width = 880
     view_ht = 660
     title = "Optical Layout"
-    panel_fcts = [create_2d_figure_toolbar,
-                  create_draw_rays_groupbox,
+    panel_fcts = [plotview.create_2d_figure_toolbar,
+                  plotview.create_draw_rays_groupbox,
                   ]
     plotview.create_plot_view(gui_parent, fig, title, view_width, view_ht,
                               add_panel_fcts=panel_fcts, commands=cmds,
@@ -239,15 +229,17 @@ def create_live_layout_commands(fig):
 
 
 def create_paraxial_design_view_v2(opt_model, dgm_type, gui_parent=None):
+    import rayoptics.mpl.interactivediagram as dgm
+    import rayoptics.qtgui.plotview as plotview
     refresh_gui, is_dark = get_defaults_from_gui_parent(gui_parent)
     fig = dgm.InteractiveDiagram(opt_model, dgm_type, refresh_gui=refresh_gui,
                                  do_draw_frame=True, do_draw_axes=True,
                                  aspect='auto', is_dark=is_dark)
-    panel_fcts = [create_2d_figure_toolbar,
+    panel_fcts = [plotview.create_2d_figure_toolbar,
                   ]
     if dgm_type == 'ht':
         cmds = diagram.create_parax_design_commands(fig)
-        panel_fcts.append(create_diagram_controls_groupbox)
+        panel_fcts.append(plotview.create_diagram_controls_groupbox)
     else:
         cmds = None
     view_width = 880
@@ -262,6 +254,8 @@ def create_paraxial_design_view_v2(opt_model, dgm_type, gui_parent=None):
 
 
 def create_ray_fan_view(opt_model, data_type, gui_parent=None):
+    from rayoptics.mpl.axisarrayfigure import Fit, RayFanFigure
+    import rayoptics.qtgui.plotview as plotview
     refresh_gui, is_dark = get_defaults_from_gui_parent(gui_parent)
     fig = RayFanFigure(opt_model, data_type,
                        scale_type=Fit.All_Same,
@@ -274,12 +268,14 @@ def create_ray_fan_view(opt_model, data_type, gui_parent=None):
         title = "OPD Fan View"
     else:
         title = "bad data_type argument"
-    panel_fcts = [create_plot_scale_panel]
+    panel_fcts = [plotview.create_plot_scale_panel]
     plotview.create_plot_view(gui_parent, fig, title, view_width, view_ht,
                               add_panel_fcts=panel_fcts)
 
 
 def create_ray_grid_view(opt_model, gui_parent=None):
+    from rayoptics.mpl.axisarrayfigure import Fit, SpotDiagramFigure
+    import rayoptics.qtgui.plotview as plotview
     refresh_gui, is_dark = get_defaults_from_gui_parent(gui_parent)
     num_flds = len(opt_model.optical_spec.field_of_view.fields)
 
@@ -289,12 +285,14 @@ def create_ray_grid_view(opt_model, gui_parent=None):
     view_width = view_box
     view_ht = num_flds * view_box
     title = "Spot Diagram"
-    panel_fcts = [create_plot_scale_panel]
+    panel_fcts = [plotview.create_plot_scale_panel]
     plotview.create_plot_view(gui_parent, fig, title, view_width, view_ht,
                               add_panel_fcts=panel_fcts)
 
 
 def create_wavefront_view(opt_model, gui_parent=None):
+    from rayoptics.mpl.axisarrayfigure import Fit, WavefrontFigure
+    import rayoptics.qtgui.plotview as plotview
     refresh_gui, is_dark = get_defaults_from_gui_parent(gui_parent)
     num_flds = len(opt_model.optical_spec.field_of_view.fields)
     num_wvls = len(opt_model.optical_spec.spectral_region.wavelengths)
@@ -306,34 +304,41 @@ def create_wavefront_view(opt_model, gui_parent=None):
     view_width = num_wvls * view_box
     view_ht = num_flds * view_box
     title = "Wavefront Map"
-    panel_fcts = [create_plot_scale_panel]
+    panel_fcts = [plotview.create_plot_scale_panel]
     plotview.create_plot_view(gui_parent, fig, title, view_width, view_ht,
                               add_panel_fcts=panel_fcts)
 
 
 def create_field_curves(opt_model, gui_parent=None):
+    from rayoptics.mpl.analysisplots import FieldCurveFigure
+    import rayoptics.qtgui.plotview as plotview
     refresh_gui, is_dark = get_defaults_from_gui_parent(gui_parent)
     fig = FieldCurveFigure(opt_model, dpi=100, is_dark=is_dark)
     view_width = 600
     view_ht = 600
     title = "Field Curves"
-    panel_fcts = [create_plot_scale_panel]
+    panel_fcts = [plotview.create_plot_scale_panel]
     plotview.create_plot_view(gui_parent, fig, title, view_width, view_ht,
                               add_panel_fcts=panel_fcts)
 
 
 def create_3rd_order_bar_chart(opt_model, gui_parent=None):
+    from rayoptics.mpl.analysisplots import ThirdOrderBarChart
+    import rayoptics.qtgui.plotview as plotview
     refresh_gui, is_dark = get_defaults_from_gui_parent(gui_parent)
     fig = ThirdOrderBarChart(opt_model, dpi=100, is_dark=is_dark)
     view_width = 600
     view_ht = 600
     title = "3rd Order Aberrations"
-    panel_fcts = [create_plot_scale_panel]
+    panel_fcts = [plotview.create_plot_scale_panel]
     plotview.create_plot_view(gui_parent, fig, title, view_width, view_ht,
                               add_panel_fcts=panel_fcts)
 
 
 def create_glass_map_view(opt_model, gui_parent=None):
+    from opticalglass import glassfactory as gfact
+    from opticalglass import glassmap as gm
+    import rayoptics.qtgui.plotview as plotview
     refresh_gui, is_dark = get_defaults_from_gui_parent(gui_parent)
     glass_names = set()
     glasses = list()
@@ -353,6 +358,9 @@ def update_table_view(table_view):
 
 
 def create_lens_table_model(seq_model):
+    from opticalglass import glassfactory as gfact
+    from rayoptics.qtgui.pytablemodel import PyTableModel
+
     def replace_glass(event, index):
         mime = event.mimeData()
         # comma separated list
@@ -378,6 +386,7 @@ def create_lens_table_model(seq_model):
 
 
 def create_element_table_model(opt_model):
+    from rayoptics.qtgui.pytablemodel import PyTableModel
     ele_model = opt_model.ele_model
 
     def get_row_headers():
@@ -400,6 +409,7 @@ def create_element_table_model(opt_model):
 
 
 def create_ray_table_model(opt_model, ray):
+    from rayoptics.qtgui.pytablemodel import PyTableModel
     colEvalStr = ['[{}].p[0]', '[{}].p[1]', '[{}].p[2]',
                   '[{}].d[0]', '[{}].d[1]', '[{}].d[2]',
                   '[{}].dst']
@@ -415,6 +425,7 @@ def create_ray_table_model(opt_model, ray):
 
 
 def create_parax_table_model(opt_model):
+    from rayoptics.qtgui.pytablemodel import PyTableModel
     rootEvalStr = ".optical_spec.parax_data"
     colEvalStr = ['[0][{}][0]', '[0][{}][1]', '[0][{}][2]',
                   '[1][{}][0]', '[1][{}][1]', '[1][{}][2]']
@@ -430,6 +441,7 @@ def create_parax_table_model(opt_model):
 
 
 def create_parax_model_table(opt_model):
+    from rayoptics.qtgui.pytablemodel import PyTableModel
     rootEvalStr = ".parax_model"
     colEvalStr = ['.ax[{}][0]', '.pr[{}][0]', '.ax[{}][1]', '.pr[{}][1]',
                   '.sys[{}][0]', '.sys[{}][1]', '.sys[{}][2]', '.sys[{}][3]']
@@ -8,8 +8,6 @@
 .. codeauthor: Michael J. Hayford
 """
 
-import json_tricks
-
 
 module_repl_050 = {
     'rayoptics.optical.elements': 'rayoptics.elem.elements',
@@ -59,6 +57,7 @@ def open_roa(file_name, mapping=None):
     Returns:
         if successful, an OpticalModel instance, otherwise, None
     """
+    import json_tricks
     opm = None
     str_replacements = module_repl_050 if mapping is None else mapping
     contents = preprocess_roa(file_name, str_replacements)
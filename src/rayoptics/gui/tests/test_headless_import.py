@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests that the model, trace and analysis modules import without the GUI
+
+"""
+
+
+import subprocess
+import sys
+import unittest
+
+gui_modules = ['matplotlib', 'PyQt5', 'pandas', 'json_tricks',
+               'opticalglass.glassfactory', 'opticalglass.glassmap']
+
+check_modules = """
+import sys
+import rayoptics.gui.appcmds
+import rayoptics.raytr.analyses
+import rayoptics.raytr.trace
+print(' '.join(m for m in {} if m in sys.modules))
+"""
+
+
+class HeadlessImportTestCase(unittest.TestCase):
+    def test_no_gui_modules(self):
+        # use a new interpreter, the test runner may have imported them
+        proc = subprocess.run([sys.executable, '-c',
+                               check_modules.format(gui_modules)],
+                              stdout=subprocess.PIPE, check=True,
+                              universal_newlines=True)
+        self.assertEqual(proc.stdout.split(), [])
+
+    def test_catalog_glass_on_demand(self):
+        from rayoptics.seq.medium import GlassHandlerBase
+        medium = GlassHandlerBase(None).find_glass('N-BK7', 'Schott')
+        self.assertAlmostEqual(medium.rindex('d'), 1.5168, places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
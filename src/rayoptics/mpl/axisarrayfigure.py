@@ -9,6 +9,7 @@
 """
 
 from enum import Enum, auto
+from functools import partial
 
 from scipy.interpolate import interp1d
 
@@ -40,6 +41,77 @@ def clip_to_range(rgb_list, lower, upper):
     return rgbc
 
 
+def eval_ray_fan(opt_model, fi, xy, data_type='Ray', num_rays=21):
+    """ ray fan data for field **fi**, x (=0) or y (=1) fan **xy** """
+    seq_model = opt_model.seq_model
+    central_wvl = opt_model.optical_spec.spectral_region.central_wvl
+    convert_to_waves = 1/opt_model.nm_to_sys_units(central_wvl)
+
+    def ray_abr(p, xy, ray_pkg, fld, wvl, foc):
+        if ray_pkg[mc.ray] is not None:
+            image_pt = fld.ref_sphere[0]
+            ray = ray_pkg[mc.ray]
+            dist = foc / ray[-1][mc.d][2]
+            defocused_pt = ray[-1][mc.p] - dist*ray[-1][mc.d]
+            t_abr = defocused_pt - image_pt
+            return t_abr[xy]
+        else:
+            return None
+
+    def opd(p, xy, ray_pkg, fld, wvl, foc):
+        if ray_pkg[mc.ray] is not None:
+            fod = opt_model.optical_spec.parax_data.fod
+            opd = wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg,
+                                     fld.chief_ray, fld.ref_sphere)
+            return convert_to_waves*opd
+        else:
+            return None
+
+    if data_type == 'Ray':
+        fct = ray_abr
+    elif data_type == 'OPD':
+        fct = opd
+    return seq_model.trace_fan(fct, fi, xy, num_rays=num_rays)
+
+
+def eval_spot_grid(opt_model, fi, wi, num_rays=21):
+    """ spot diagram data for field **fi**, for all wavelengths """
+    def spot(p, wi, ray_pkg, fld, wvl, foc):
+        if ray_pkg is not None:
+            image_pt = fld.ref_sphere[0]
+            ray = ray_pkg[mc.ray]
+            dist = foc / ray[-1][mc.d][2]
+            defocused_pt = ray[-1][mc.p] - dist*ray[-1][mc.d]
+            t_abr = defocused_pt - image_pt
+            return np.array([t_abr[0], t_abr[1]])
+        else:
+            return None
+
+    return opt_model.seq_model.trace_grid(spot, fi, num_rays=num_rays,
+                                          form='list', append_if_none=False)
+
+
+def eval_wavefront_grid(opt_model, fi, wi, num_rays=21):
+    """ wavefront data for field **fi** and wavelength **wi** """
+    central_wvl = opt_model.optical_spec.spectral_region.central_wvl
+    convert_to_waves = 1/opt_model.nm_to_sys_units(central_wvl)
+
+    def wave(p, wi, ray_pkg, fld, wvl, foc):
+        x = p[0]
+        y = p[1]
+        if ray_pkg is not None:
+            fod = opt_model.optical_spec.parax_data.fod
+            opd = wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg,
+                                     fld.chief_ray, fld.ref_sphere)
+            opd = convert_to_waves*opd
+        else:
+            opd = 0.0
+        return np.array([x, y, opd])
+
+    return opt_model.seq_model.trace_grid(wave, fi, wl=wi, num_rays=num_rays,
+                                          form='grid', append_if_none=True)
+
+
 class AxisArrayFigure(StyledFigure):
 
     def __init__(self, opt_model,
@@ -47,11 +119,12 @@ class AxisArrayFigure(StyledFigure):
                  scale_type=Fit.All,
                  user_scale_value=0.1,
                  num_rows=1, num_cols=1,
-                 eval_fct=None, **kwargs):
+                 eval_fct=None, executor=None, **kwargs):
         self.opt_model = opt_model
         self.num_rays = num_rays
         self.user_scale_value = user_scale_value
         self.scale_type = scale_type
+        self.executor = executor
 
         super().__init__(**kwargs)
 
@@ -85,6 +158,25 @@ class AxisArrayFigure(StyledFigure):
     def wvl_to_sys_units(self, wvl):
         return self.opt_model.nm_to_sys_units(wvl)
 
+    def eval_array_data(self):
+        """ evaluate eval_fct for each cell of the plot array
+
+        The cells are evaluated in parallel if an
+        :class:`~rayoptics.raytr.executor.AnalysisExecutor` was supplied.
+
+        Returns:
+            a list of rows of eval_fct results, in plot array order
+        """
+        jobs = [(i, j) for i in reversed(range(self.num_rows))
+                for j in reversed(range(self.num_cols))]
+        fct = partial(self.eval_fct, num_rays=self.num_rays)
+        if self.executor is None:
+            results = [fct(self.opt_model, *job) for job in jobs]
+        else:
+            results = self.executor.map(fct, jobs)
+        n = self.num_cols
+        return [results[k:k+n] for k in range(0, len(results), n)]
+
     def refresh(self, **kwargs):
         self.update_data(**kwargs)
         self.plot()
@@ -103,56 +195,19 @@ class RayFanFigure(AxisArrayFigure):
                  **kwargs):
         self.max_value_all = 0.0
         self.override_style = override_style
-        seq_model = opt_model.seq_model
         osp = opt_model.optical_spec
-        central_wvl = osp.spectral_region.central_wvl
-        convert_to_waves = 1/opt_model.nm_to_sys_units(central_wvl)
-
-        def ray_abr(p, xy, ray_pkg, fld, wvl, foc):
-            if ray_pkg[mc.ray] is not None:
-                image_pt = fld.ref_sphere[0]
-                ray = ray_pkg[mc.ray]
-                dist = foc / ray[-1][mc.d][2]
-                defocused_pt = ray[-1][mc.p] - dist*ray[-1][mc.d]
-                t_abr = defocused_pt - image_pt
-                return t_abr[xy]
-            else:
-                return None
-
-        def opd(p, xy, ray_pkg, fld, wvl, foc):
-            if ray_pkg[mc.ray] is not None:
-                fod = opt_model.optical_spec.parax_data.fod
-                opd = wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg,
-                                         fld.chief_ray, fld.ref_sphere)
-                return convert_to_waves*opd
-            else:
-                return None
-
-        def eval_abr_fan(i, j):
-            fld, wvl, foc = osp.lookup_fld_wvl_focus(i)
-            return seq_model.trace_fan(ray_abr, i, j, num_rays=self.num_rays)
-
-        def eval_opd_fan(i, j):
-            fld, wvl, foc = osp.lookup_fld_wvl_focus(i)
-            return seq_model.trace_fan(opd, i, j, num_rays=self.num_rays)
-
-        if data_type == 'Ray':
-            eval_fan = eval_abr_fan
-        elif data_type == 'OPD':
-            eval_fan = eval_opd_fan
+        eval_fan = partial(eval_ray_fan, data_type=data_type)
         num_flds = len(osp.field_of_view.fields)
         super().__init__(opt_model, eval_fct=eval_fan,
                          num_rows=num_flds, num_cols=2, **kwargs)
 
     def update_data(self, build='rebuild', **kwargs):
         self.axis_data_array = []
-        for i in reversed(range(self.num_rows)):
+        for data_row in self.eval_array_data():
             row = []
-            for j in reversed(range(self.num_cols)):
+            for x_data, y_data, max_value, rc in data_row:
                 x_smooth = []
                 y_smooth = []
-                x_data, y_data, max_value, rc = self.eval_fct(i, j)
-#                x_data, y_data, max_value, rc = self.eval_axis_data(i, j)
 #                rc = clip_to_range(rc, 0.0, 1.0)
                 for k in range(len(x_data)):
                     interpolator = interp1d(x_data[k], y_data[k],
@@ -209,27 +264,9 @@ class SpotDiagramFigure(AxisArrayFigure):
 
     def __init__(self, opt_model, **kwargs):
         self.max_value_all = 0.0
-        seq_model = opt_model.seq_model
         osp = opt_model.optical_spec
-
-        def spot(p, wi, ray_pkg, fld, wvl, foc):
-            if ray_pkg is not None:
-                image_pt = fld.ref_sphere[0]
-                ray = ray_pkg[mc.ray]
-                dist = foc / ray[-1][mc.d][2]
-                defocused_pt = ray[-1][mc.p] - dist*ray[-1][mc.d]
-                t_abr = defocused_pt - image_pt
-                return np.array([t_abr[0], t_abr[1]])
-            else:
-                return None
-
-        def eval_grid(i, j):
-            fld, wvl, foc = osp.lookup_fld_wvl_focus(i, wl=j)
-            return seq_model.trace_grid(spot, i, num_rays=self.num_rays,
-                                        form='list', append_if_none=False)
-
         num_flds = len(osp.field_of_view.fields)
-        super().__init__(opt_model, eval_fct=eval_grid,
+        super().__init__(opt_model, eval_fct=eval_spot_grid,
                          num_rows=num_flds, num_cols=1, **kwargs)
 
     def init_axis(self, ax):
@@ -239,10 +276,9 @@ class SpotDiagramFigure(AxisArrayFigure):
 
     def update_data(self, build='rebuild', **kwargs):
         self.axis_data_array = []
-        for i in reversed(range(self.num_rows)):
+        for data_row in self.eval_array_data():
             row = []
-            for j in reversed(range(self.num_cols)):
-                grids, rc = self.eval_fct(i, j)
+            for grids, rc in data_row:
                 max_val = max([max(np.max(g), -np.min(g)) for g in grids])
                 row.append((grids, max_val, rc))
             self.axis_data_array.append(row)
@@ -297,31 +333,10 @@ class WavefrontFigure(AxisArrayFigure):
 
     def __init__(self, opt_model, **kwargs):
         self.max_value_all = 0.0
-        seq_model = opt_model.seq_model
         osp = opt_model.optical_spec
-        central_wvl = osp.spectral_region.central_wvl
-        convert_to_waves = 1/opt_model.nm_to_sys_units(central_wvl)
-
-        def wave(p, wi, ray_pkg, fld, wvl, foc):
-            x = p[0]
-            y = p[1]
-            if ray_pkg is not None:
-                fod = opt_model.optical_spec.parax_data.fod
-                opd = wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg,
-                                         fld.chief_ray, fld.ref_sphere)
-                opd = convert_to_waves*opd
-            else:
-                opd = 0.0
-            return np.array([x, y, opd])
-
-        def eval_grid(i, j):
-            fld, wvl, foc = osp.lookup_fld_wvl_focus(i, wl=j)
-            return seq_model.trace_grid(wave, i, wl=j, num_rays=self.num_rays,
-                                        form='grid', append_if_none=True)
-
         num_flds = len(osp.field_of_view.fields)
         num_wvls = len(osp.spectral_region.wavelengths)
-        super().__init__(opt_model, eval_fct=eval_grid,
+        super().__init__(opt_model, eval_fct=eval_wavefront_grid,
                          num_rows=num_flds, num_cols=num_wvls, **kwargs)
 
     def init_axis(self, ax):
@@ -334,10 +349,9 @@ class WavefrontFigure(AxisArrayFigure):
     def update_data(self, build='rebuild', **kwargs):
         self.axis_data_array = []
         self.max_value_all = 0.0
-        for i in reversed(range(self.num_rows)):
+        for data_row in self.eval_array_data():
             row = []
-            for j in reversed(range(self.num_cols)):
-                grids, rc = self.eval_fct(i, j)
+            for grids, rc in data_row:
                 g = grids[0]
                 g = np.rollaxis(g, 2)
                 max_value = max(np.max(g[2]), -np.min(g[2]))
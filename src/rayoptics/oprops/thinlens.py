@@ -111,10 +111,20 @@ class ThinLens(Interface):
     def normal(self, p):
         return np.array([0., 0., 1.])
 
+    def normal_many(self, ps):
+        nrml = np.zeros_like(ps)
+        nrml[:, 2] = 1.
+        return nrml
+
     def intersect(self, p0, d, **kwargs):
         s1 = -p0[2]/d[2]
         p = p0 + s1*d
         return s1, p
 
+    def intersect_many(self, p0s, ds, **kwargs):
+        s1 = -p0s[:, 2]/ds[:, 2]
+        p = p0s + s1[:, np.newaxis]*ds
+        return s1, p
+
     def phase(self, pt, d_in, normal, wl):
         return self.phase_element.phase(pt, d_in, normal)
@@ -8,12 +8,12 @@
 .. codeauthor: Michael J. Hayford
 """
 import os.path
-import json_tricks
 
 import rayoptics
 
 import rayoptics.elem.elements as ele
 import rayoptics.optical.model_constants as mc
+from rayoptics.optical import snapshot
 
 from rayoptics.elem.elements import ElementModel
 from rayoptics.parax.paraxialdesign import ParaxialModel
@@ -121,9 +121,18 @@ class OpticalModel:
         self.seq_model.set_from_specsheet(specsheet)
         self.optical_spec.set_from_specsheet(specsheet)
 
-    def save_model(self, file_name):
+    def save_model(self, file_name, **kwargs):
+        """ save the model as a .roa file, or a binary snapshot if the
+        extension is .rob
+
+        kwargs are passed to :func:`~.snapshot.save_snapshot`
+        """
         file_extension = os.path.splitext(file_name)[1]
         filename = file_name if len(file_extension) > 0 else file_name+'.roa'
+        if file_extension.lower() == snapshot.snapshot_extension:
+            snapshot.save_snapshot(self, filename, **kwargs)
+            return
+        import json_tricks
         fs_dict = {}
         fs_dict['optical_model'] = self
         with open(filename, 'w') as f:
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Binary snapshots of an OpticalModel
+
+A snapshot (.rob file) stores the complete state of an
+:class:`~.opticalmodel.OpticalModel`, including the derived data such as
+the first order data, field aim points, clear apertures and cached ray
+data, so that loading a snapshot doesn't need to rebuild the model the way
+reading a .roa file does.
+
+The file layout is:
+
+    - the 8 byte magic number ``b'RAYOPTIC'``
+    - the format version and the length of the header, as little endian
+      uint16 and uint32
+    - a JSON header with the rayoptics version, the compression codec and
+      the offsets and lengths of the data blocks
+    - the body, compressed by default: a pickle (protocol 5) of the model,
+      followed by the larger numpy arrays stored out-of-band as contiguous,
+      64 byte aligned buffers. Before Python 3.8, a protocol 4 pickle holds
+      all of the arrays in-band.
+
+Snapshots are pickles and are meant for archiving models for the same
+rayoptics installation; only load snapshots from trusted sources.
+
+.. codeauthor: Michael J. Hayford
+"""
+
+import bz2
+import json
+import lzma
+import pickle
+import struct
+import zlib
+
+import rayoptics
+
+MAGIC = b'RAYOPTIC'
+FORMAT_VERSION = 1
+snapshot_extension = '.rob'
+
+_prefix = struct.Struct('<HI')
+_alignment = 64
+# out-of-band buffers need pickle protocol 5, new in Python 3.8
+_protocol = min(5, pickle.HIGHEST_PROTOCOL)
+
+codecs = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'bz2': (bz2.compress, bz2.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+    }
+""" compression codec name to (compress, decompress) functions """
+
+
+def dumps(opt_model, compression='zlib', min_buffer_size=1024):
+    """ returns a bytes snapshot of **opt_model**
+
+    Args:
+        opt_model: the :class:`~.opticalmodel.OpticalModel` to save
+        compression: None or the name of a codec in :data:`codecs`
+        min_buffer_size: arrays smaller than this many bytes are stored
+                         in the pickle instead of as separate buffers
+    """
+    buffers = []
+
+    def buffer_callback(buf):
+        # a falsy return value stores the buffer out-of-band
+        if buf.raw().nbytes < min_buffer_size:
+            return True
+        buffers.append(buf)
+
+    if _protocol >= 5:
+        pkl = pickle.dumps(opt_model, protocol=_protocol,
+                           buffer_callback=buffer_callback)
+    else:
+        pkl = pickle.dumps(opt_model, protocol=_protocol)
+
+    blocks = [pkl]
+    offset = len(pkl)
+    buffer_table = []
+    for buf in buffers:
+        pad = -offset % _alignment
+        if pad:
+            blocks.append(bytes(pad))
+            offset += pad
+        raw = buf.raw()
+        blocks.append(raw)
+        buffer_table.append((offset, raw.nbytes))
+        offset += raw.nbytes
+    body = b''.join(blocks)
+
+    if compression is not None:
+        body = codecs[compression][0](body)
+
+    header = json.dumps({'rayoptics': rayoptics.__version__,
+                         'compression': compression,
+                         'pickle': len(pkl),
+                         'buffers': buffer_table,
+                         'size': offset}).encode('utf-8')
+    return b''.join([MAGIC, _prefix.pack(FORMAT_VERSION, len(header)),
+                     header, body])
+
+
+def read_header(data):
+    """ returns (header dict, offset of the body) of the snapshot **data** """
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError('not a rayoptics snapshot')
+    start = len(MAGIC)
+    version, header_len = _prefix.unpack_from(data, start)
+    if version > FORMAT_VERSION:
+        raise ValueError('unsupported snapshot format version {}'
+                         .format(version))
+    start += _prefix.size
+    header = json.loads(bytes(data[start:start+header_len]).decode('utf-8'))
+    return header, start + header_len
+
+
+def loads(data):
+    """ returns the OpticalModel in the snapshot **data** (bytes-like)
+
+    The out-of-band arrays of an uncompressed snapshot share the memory of a
+    writable **data**, e.g. a bytearray.
+    """
+    header, start = read_header(data)
+    body = memoryview(data)[start:]
+    compression = header['compression']
+    if compression is not None:
+        body = memoryview(bytearray(codecs[compression][1](body)))
+    elif body.readonly:
+        body = memoryview(bytearray(body))
+    if not header['buffers']:
+        return pickle.loads(body[:header['pickle']])
+    buffers = [body[offset:offset+length]
+               for offset, length in header['buffers']]
+    return pickle.loads(body[:header['pickle']], buffers=buffers)
+
+
+def save_snapshot(opt_model, file_name, compression='zlib', **kwargs):
+    """ save a binary snapshot of **opt_model** to **file_name**
+
+    Args:
+        opt_model: the :class:`~.opticalmodel.OpticalModel` to save
+        file_name: a filename, conventionally with a .rob extension
+        compression: None or the name of a codec in :data:`codecs`
+        kwargs: keyword args passed to :func:`dumps`
+    """
+    with open(file_name, 'wb') as f:
+        f.write(dumps(opt_model, compression=compression, **kwargs))
+
+
+def load_snapshot(file_name):
+    """ returns the OpticalModel saved in the snapshot **file_name** """
+    with open(file_name, 'rb') as f:
+        data = bytearray(f.read())
+    return loads(data)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the binary model snapshots
+
+"""
+
+
+import unittest
+from pathlib import Path
+import tempfile
+from unittest import mock
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.optical import snapshot
+from rayoptics.raytr import analyses
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+
+    def check_model(self, opm):
+        fod = self.opm.optical_spec.parax_data.fod
+        self.assertEqual(opm.optical_spec.parax_data.fod.efl, fod.efl)
+        for fld, fld_truth in zip(opm.optical_spec.field_of_view.fields,
+                                  self.opm.optical_spec.field_of_view.fields):
+            npt.assert_array_equal(fld.aim_pt, fld_truth.aim_pt)
+        for ifc, ifc_truth in zip(opm.seq_model.ifcs, self.opm.seq_model.ifcs):
+            self.assertEqual(ifc.max_aperture, ifc_truth.max_aperture)
+        npt.assert_array_equal(analyses.RayGrid(opm, f=1).grid,
+                               analyses.RayGrid(self.opm, f=1).grid)
+
+    def test_round_trip(self):
+        for compression in [None, 'zlib', 'lzma']:
+            data = snapshot.dumps(self.opm, compression=compression,
+                                  min_buffer_size=0)
+            header, start = snapshot.read_header(data)
+            self.assertEqual(header['compression'], compression)
+            if snapshot._protocol >= 5:
+                self.assertGreater(len(header['buffers']), 0)
+            self.check_model(snapshot.loads(data))
+
+        with self.assertRaises(ValueError):
+            snapshot.loads(b'not a snapshot')
+
+    def test_in_band_arrays(self):
+        # the protocol 4 pickles of Python 3.7 store the arrays in-band
+        with mock.patch.object(snapshot, '_protocol', 4):
+            data = snapshot.dumps(self.opm, min_buffer_size=0)
+        header, start = snapshot.read_header(data)
+        self.assertEqual(header['buffers'], [])
+        self.check_model(snapshot.loads(data))
+
+    def test_save_model(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_name = str(Path(tmpdir)/'ag_dblgauss.rob')
+            self.opm.save_model(file_name)
+            opm = open_model(file_name)
+        self.check_model(opm)
+
+        # the restored model can be changed and updated
+        opm.seq_model.gaps[1].thi += 1.
+        opm.update_model()
+        self.assertNotEqual(opm.optical_spec.parax_data.fod.efl,
+                            self.opm.optical_spec.parax_data.fod.efl)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,10 @@
+""" Package for optimization of optical models
+
+    The :mod:`~.optimize` subpackage provides classes and functions for
+    improving an optical model automatically. These include:
+
+        - Variables, merit function operands and a damped least squares
+          optimizer, :mod:`~.optimizer`
+        - Monte Carlo tolerance analysis with compensators,
+          :mod:`~.tolerance`
+"""
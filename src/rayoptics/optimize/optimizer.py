@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Damped least squares optimization of an optical model
+
+An optimization is defined by a list of :class:`Variable` model parameters
+and a list of :class:`Operand` terms of the merit function. The merit
+function is the sum of the squares of the weighted operand residuals. An
+:class:`Optimizer` minimizes it with the damped least squares method::
+
+    variables = [Variable('cv', 1), Variable('cv', 2),
+                 Variable('thi', 2, bounds=(0., None))]
+    operands = [FirstOrderOperand('efl', target=100.),
+                RMSSpotOperand(0), RMSSpotOperand(2)]
+    result = Optimizer(opm, variables, operands).optimize()
+
+The Jacobian is computed by finite differences. The perturbed models and
+the trial steps for several damping factors are independent, and are
+evaluated as batches on an :class:`~.executor.AnalysisExecutor` process
+pool.
+
+Operands with **bounds** instead of a target are constraints; they
+contribute to the merit function only when the value is out of bounds.
+Variable bounds are enforced by clipping the steps.
+
+.. codeauthor: Michael J. Hayford
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from rayoptics.elem.profiles import EvenPolynomial, RadialPolynomial
+from rayoptics.elem.surface import DecenterData
+from rayoptics.optical.model_enums import DecenterType
+from rayoptics.seq.medium import OffsetMedium
+from rayoptics.parax import thirdorder
+from rayoptics.raytr import analyses
+from rayoptics.raytr import trace
+from rayoptics.raytr import traceerror as terr
+from rayoptics.raytr.executor import AnalysisExecutor
+
+OptimizationResult = namedtuple('OptimizationResult',
+                                ['x', 'merit', 'iterations', 'evaluations',
+                                 'converged'])
+OptimizationResult.x.__doc__ = "final variable values"
+OptimizationResult.merit.__doc__ = "merit function value at x"
+OptimizationResult.iterations.__doc__ = "number of damped least squares steps"
+OptimizationResult.evaluations.__doc__ = "number of merit function evaluations"
+OptimizationResult.converged.__doc__ = "True if the merit function converged"
+
+
+class MeritFunctionError(ValueError):
+    """ The merit function can't be evaluated for the starting model """
+
+
+# default finite difference increments of the variable kinds. These are
+#  well above the noise in the ray aiming from a distant object
+var_deltas = {'cv': 1e-5, 'thi': 1e-4, 'n': 1e-5, 'cc': 1e-3, 'coef': 1e-5,
+              'dec': 1e-4, 'tilt': 1e-3}
+
+
+class Variable:
+    """ A parameter of the sequential model varied by the optimizer
+
+    The kinds of variable are:
+
+        - 'cv': curvature of interface **idx**
+        - 'thi': thickness of gap **idx**
+        - 'n': refractive index offset of the medium of gap **idx**, see
+          :class:`~.medium.OffsetMedium`
+        - 'cc': conic constant of interface **idx**
+        - 'coef': polynomial coefficient **index** of interface **idx**
+        - 'dec': x (**index** 0) or y (**index** 1) decenter of interface
+          **idx**
+        - 'tilt': alpha, beta or gamma (**index** 0-2) tilt of interface
+          **idx**, in degrees
+
+    Attributes:
+        kind: the kind of variable
+        idx: the interface or gap index
+        index: the coefficient or axis index, if applicable
+        bounds: (lower, upper) limits of the variable, either may be None
+        delta: finite difference increment; for 'coef' variables the
+               default is scaled so that the sag changes by about 1e-5 at
+               the edge of the surface
+    """
+
+    def __init__(self, kind, idx, index=None, bounds=None, delta=None):
+        if kind not in var_deltas:
+            raise ValueError('unknown variable kind {}'.format(kind))
+        self.kind = kind
+        self.idx = idx
+        self.index = index
+        self.bounds = (None, None) if bounds is None else bounds
+        self.delta = delta
+
+    def __repr__(self):
+        return ('{}({!r}, {}'.format(type(self).__name__, self.kind,
+                                     self.idx) +
+                ('' if self.index is None else ', index={}'.format(self.index))
+                + ')')
+
+    def get(self, opt_model):
+        """ returns the current value of the variable in **opt_model** """
+        seq_model = opt_model.seq_model
+        if self.kind == 'thi':
+            return seq_model.gaps[self.idx].thi
+        elif self.kind == 'n':
+            medium = seq_model.gaps[self.idx].medium
+            return (medium.offset if isinstance(medium, OffsetMedium)
+                    else 0.)
+        ifc = seq_model.ifcs[self.idx]
+        if self.kind == 'cv':
+            return ifc.profile.cv
+        elif self.kind == 'cc':
+            return ifc.profile.cc
+        elif self.kind == 'coef':
+            coefs = self.profile_coefs(ifc)
+            return coefs[self.index] if self.index < len(coefs) else 0.
+        elif ifc.decenter is None:
+            return 0.
+        elif self.kind == 'dec':
+            return ifc.decenter.dec[self.index]
+        elif self.kind == 'tilt':
+            return ifc.decenter.euler[self.index]
+
+    def set(self, opt_model, value):
+        """ sets the variable in **opt_model**; the model isn't updated """
+        seq_model = opt_model.seq_model
+        if self.kind == 'thi':
+            seq_model.gaps[self.idx].thi = value
+            return
+        elif self.kind == 'n':
+            gap = seq_model.gaps[self.idx]
+            if not isinstance(gap.medium, OffsetMedium):
+                gap.medium = OffsetMedium(gap.medium)
+            gap.medium.offset = value
+            return
+        ifc = seq_model.ifcs[self.idx]
+        if self.kind == 'cv':
+            ifc.profile.cv = value
+        elif self.kind == 'cc':
+            ifc.profile.cc = value
+        elif self.kind == 'coef':
+            coefs = self.profile_coefs(ifc)
+            if self.index >= len(coefs):
+                coefs.extend([0.]*(self.index + 1 - len(coefs)))
+            coefs[self.index] = value
+            ifc.profile.update()
+        else:
+            if ifc.decenter is None:
+                ifc.decenter = DecenterData(DecenterType.LOCAL)
+            if self.kind == 'dec':
+                ifc.decenter.dec[self.index] = value
+            elif self.kind == 'tilt':
+                ifc.decenter.euler[self.index] = value
+            ifc.decenter.update()
+
+    def profile_coefs(self, ifc):
+        """ returns the polynomial coefficients of the profile of **ifc**
+
+        Raises:
+            ValueError: if the profile has no polynomial coefficients
+        """
+        profile = ifc.profile
+        if not hasattr(profile, 'coefs'):
+            raise ValueError('{!r}: the {} profile of interface {} has no '
+                             'polynomial coefficients'
+                             .format(self, type(profile).__name__, self.idx))
+        return profile.update().coefs
+
+    def increment(self, opt_model):
+        """ returns the finite difference increment of the variable """
+        if self.delta is not None:
+            return self.delta
+        if self.kind == 'coef':
+            ifc = opt_model.seq_model.ifcs[self.idx]
+            profile = ifc.profile
+            if isinstance(profile, EvenPolynomial):
+                power = 2*self.index + 2
+            elif isinstance(profile, RadialPolynomial):
+                power = self.index + 1
+            else:
+                power = 1
+            return var_deltas['coef']/max(ifc.surface_od(), 1.)**power
+        return var_deltas[self.kind]
+
+
+def get_values(opt_model, variables):
+    """ returns an array of the values of **variables** in **opt_model** """
+    return np.array([v.get(opt_model) for v in variables], dtype=float)
+
+
+def get_aim_pts(opt_model):
+    """ returns a list of the aim points of the fields """
+    return [fld.aim_pt for fld in opt_model.optical_spec.field_of_view.fields]
+
+
+def set_aim_pts(opt_model, aim_pts):
+    """ sets the aim points of the fields and clears the cached aim points
+
+    The next update of the model aims the fields starting from **aim_pts**.
+    """
+    osp = opt_model.optical_spec
+    for fld, aim_pt in zip(osp.field_of_view.fields, aim_pts):
+        fld.aim_pt = aim_pt
+    osp.ray_cache.invalidate()
+
+
+def set_values(opt_model, variables, x):
+    """ sets **variables** to **x** and updates **opt_model** """
+    for v, value in zip(variables, x):
+        v.set(opt_model, value)
+    opt_model.seq_model.update_model()
+
+
+class Operand:
+    """ Base class of the merit function operands
+
+    Subclasses implement :meth:`value`, returning a scalar or an array.
+
+    Attributes:
+        target: the target value of the operand
+        weight: weight applied to the residuals
+        bounds: if not None, (lower, upper) limits of the value, either may
+                be None; the residual is the distance out of bounds and
+                **target** is ignored
+    """
+
+    def __init__(self, target=0., weight=1., bounds=None):
+        self.target = target
+        self.weight = weight
+        self.bounds = bounds
+
+    def value(self, opt_model):
+        raise NotImplementedError
+
+    def residuals(self, opt_model):
+        """ returns a 1d array of the weighted residuals of the operand """
+        value = np.ravel(np.asarray(self.value(opt_model), dtype=float))
+        if self.bounds is None:
+            resid = value - self.target
+        else:
+            lower, upper = self.bounds
+            resid = np.zeros_like(value)
+            if lower is not None:
+                resid = np.where(value < lower, value - lower, resid)
+            if upper is not None:
+                resid = np.where(value > upper, value - upper, resid)
+        return self.weight*resid
+
+
+class FunctionOperand(Operand):
+    """ operand given by ``fct(opt_model)``
+
+    For evaluation in worker processes, **fct** must be picklable, i.e.
+    defined at module level.
+    """
+
+    def __init__(self, fct, **kwargs):
+        super().__init__(**kwargs)
+        self.fct = fct
+
+    def value(self, opt_model):
+        return self.fct(opt_model)
+
+
+class FirstOrderOperand(Operand):
+    """ an attribute of the :class:`~.FirstOrderData`, e.g. 'efl' """
+
+    def __init__(self, attr, **kwargs):
+        super().__init__(**kwargs)
+        self.attr = attr
+
+    def value(self, opt_model):
+        return getattr(opt_model.optical_spec.parax_data.fod, self.attr)
+
+
+class SeidelOperand(Operand):
+    """ the sum of a Seidel coefficient, one of ``thirdorder.seidel_labels``
+    """
+
+    def __init__(self, coef, **kwargs):
+        super().__init__(**kwargs)
+        self.coef = coef
+
+    def value(self, opt_model):
+        to_data = thirdorder.calc_third_order(opt_model)
+        k = thirdorder.seidel_labels.index(self.coef)
+        return to_data.seidel[:, k].sum()
+
+
+class ThicknessOperand(Operand):
+    """ the thickness of gap **idx**, usually used with **bounds** """
+
+    def __init__(self, idx, **kwargs):
+        super().__init__(**kwargs)
+        self.idx = idx
+
+    def value(self, opt_model):
+        return opt_model.seq_model.gaps[self.idx].thi
+
+
+def pupil_grid(num_rays):
+    """ returns the coordinates of a square grid inside the unit circle """
+    coords = analyses.grid_pupil_coords([[-1., -1.], [1., 1.], num_rays])
+    coords = coords.reshape(-1, 2)
+    return coords[np.sum(coords**2, axis=1) < 1.0]
+
+
+class RMSSpotOperand(Operand):
+    """ RMS spot radius about the centroid at field **fi**
+
+    The residuals are the x and y deviations of the rays from the centroid,
+    scaled so that their sum of squares is the squared RMS spot radius. The
+    rays are sampled on a square grid of **num_rays** across the pupil.
+    Rays that fail make the merit function undefined.
+    """
+
+    def __init__(self, fi, wl=None, num_rays=9, **kwargs):
+        super().__init__(**kwargs)
+        self.fi = fi
+        self.wl = wl
+        self.num_rays = num_rays
+
+    def value(self, opt_model):
+        fld, wvl, foc = opt_model.optical_spec.lookup_fld_wvl_focus(self.fi,
+                                                                   self.wl)
+        coords = pupil_grid(self.num_rays)
+        bundle = trace.trace_bundle(opt_model, coords, fld, wvl,
+                                    pupil_filter=False)
+        pts = analyses.transverse_abr_many(bundle, foc, np.zeros(3))
+        pts[~bundle.valid] = np.nan
+        return (pts - pts.mean(axis=0))/np.sqrt(len(pts))
+
+
+class RMSWavefrontOperand(Operand):
+    """ RMS wavefront error in waves at field **fi**, piston removed
+
+    The residuals are the OPDs of the rays less their mean, scaled so that
+    their sum of squares is the squared RMS wavefront error. The rays are
+    sampled on a square grid of **num_rays** across the pupil.
+    """
+
+    def __init__(self, fi, wl=None, num_rays=9, **kwargs):
+        super().__init__(**kwargs)
+        self.fi = fi
+        self.wl = wl
+        self.num_rays = num_rays
+
+    def value(self, opt_model):
+        fld, wvl, foc = opt_model.optical_spec.lookup_fld_wvl_focus(self.fi,
+                                                                   self.wl)
+        opd = analyses.eval_wavefront(opt_model, fld, wvl, foc,
+                                      num_rays=self.num_rays)
+        inside = np.sum(opd[..., :2]**2, axis=-1) < 1.0
+        opd = opd[..., 2][inside]
+        return (opd - opd.mean())/np.sqrt(len(opd))
+
+
+def eval_residuals(opt_model, variables, operands, x, aim_pts=None):
+    """ returns the residuals of **operands** with **variables** set to **x**
+
+    If **aim_pts** is given, the fields are aimed starting from them instead
+    of from the results of the previous evaluation, so that the residuals
+    don't depend on the evaluation order.
+
+    Returns None if the model can't be evaluated at **x**, i.e. a ray
+    fails to trace, a paraxial quantity is undefined or a residual isn't
+    finite. Other errors, e.g. of the operand definitions, are raised.
+    """
+    if aim_pts is not None:
+        set_aim_pts(opt_model, aim_pts)
+    try:
+        set_values(opt_model, variables, x)
+        resid = np.concatenate([op.residuals(opt_model) for op in operands])
+    except (terr.TraceError, ZeroDivisionError):
+        return None
+    return resid if np.all(np.isfinite(resid)) else None
+
+
+def merit(resid):
+    """ returns the merit function value of the residuals **resid** """
+    return np.inf if resid is None else float(np.dot(resid, resid))
+
+
+class Optimizer:
+    """ Damped least squares optimizer
+
+    Each iteration computes the Jacobian of the residuals by forward
+    differences and evaluates the steps for a set of damping factors about
+    the current one, keeping the best. The evaluations in each stage are
+    independent and are done on an
+    :class:`~.executor.AnalysisExecutor`.
+
+    Attributes:
+        opt_model: the :class:`~.OpticalModel` to optimize
+        variables: list of :class:`Variable`
+        operands: list of :class:`Operand`
+        executor: the :class:`~.executor.AnalysisExecutor` that evaluates
+                  the batches of variable values
+        evaluations: count of the merit function evaluations
+        aim_pts: the aim points that every evaluation starts aiming the
+                 fields from, set at the start of :meth:`optimize`
+    """
+
+    def __init__(self, opt_model, variables, operands, max_workers=None):
+        self.opt_model = opt_model
+        self.variables = variables
+        self.operands = operands
+        self.executor = AnalysisExecutor(opt_model, max_workers=max_workers)
+        self.evaluations = 0
+        self.aim_pts = None
+
+    def get_values(self):
+        return get_values(self.opt_model, self.variables)
+
+    def residuals(self, x):
+        """ returns the residuals at **x**, evaluated on the model """
+        self.evaluations += 1
+        return eval_residuals(self.opt_model, self.variables, self.operands,
+                              x, self.aim_pts)
+
+    def eval_batch(self, xs):
+        """ returns a list of the residuals at each of the values in **xs**
+        """
+        self.evaluations += len(xs)
+        jobs = [(self.variables, self.operands, x, self.aim_pts) for x in xs]
+        return self.executor.map(eval_residuals, jobs)
+
+    def clip(self, x):
+        """ returns **x** limited to the variable bounds """
+        x = x.copy()
+        for i, v in enumerate(self.variables):
+            lower, upper = v.bounds
+            if lower is not None:
+                x[i] = max(x[i], lower)
+            if upper is not None:
+                x[i] = min(x[i], upper)
+        return x
+
+    def jacobian(self, x, resid):
+        """ returns the Jacobian of the residuals at **x**
+
+        The perturbed values are kept within the variable bounds; each
+        variable steps forward, or backward if the bounds leave more room
+        that way. A variable that can't be perturbed or whose perturbed
+        model can't be evaluated gets a column of zeros, i.e. it is frozen
+        for the step.
+        """
+        deltas = np.array([v.increment(self.opt_model)
+                           for v in self.variables])
+        x_fwd = self.clip(x + deltas)
+        x_bwd = self.clip(x - deltas)
+        x_pert = np.where(x_fwd - x >= x - x_bwd, x_fwd, x_bwd)
+        steps = x_pert - x
+        jac = np.zeros((len(resid), len(x)))
+        perturbed = np.flatnonzero(steps)
+        xs = []
+        for i in perturbed:
+            xi = x.copy()
+            xi[i] = x_pert[i]
+            xs.append(xi)
+        for i, r in zip(perturbed, self.eval_batch(xs)):
+            if r is not None and len(r) == len(resid):
+                jac[:, i] = (r - resid)/steps[i]
+        return jac
+
+    def optimize(self, max_iter=20, ftol=1e-6, damping=1e-3,
+                 damping_factors=(0.1, 1., 10., 100.)):
+        """ minimize the merit function, starting from the current model
+
+        Args:
+            max_iter: maximum number of iterations
+            ftol: convergence limit on the relative decrease of the merit
+                  function in an iteration
+            damping: initial damping factor
+            damping_factors: multipliers of the current damping factor for
+                             the trial steps evaluated in each iteration
+
+        Returns:
+            an :class:`OptimizationResult`; the model is left at the best
+            variable values found
+        """
+        x = self.get_values()
+        self.aim_pts = get_aim_pts(self.opt_model)
+        resid = self.residuals(x)
+        if resid is None:
+            raise MeritFunctionError('the merit function can not be '
+                                     'evaluated for the starting model')
+        with self.executor:
+            x, phi, it, converged = self._iterate(x, resid, max_iter, ftol,
+                                                  damping, damping_factors)
+
+        set_values(self.opt_model, self.variables, x)
+        self.opt_model.update_model()
+        return OptimizationResult(x, phi, it, self.evaluations, converged)
+
+    def _iterate(self, x, resid, max_iter, ftol, damping, damping_factors):
+        phi = merit(resid)
+        converged = False
+        it = 0
+        while it < max_iter and phi > 0.:
+            it += 1
+            jac = self.jacobian(x, resid)
+            jtj = jac.T.dot(jac)
+            grad = jac.T.dot(resid)
+            scale = np.maximum(np.diag(jtj), 1e-12*np.max(np.diag(jtj),
+                                                          initial=1.))
+
+            best = None
+            for retry in range(4):
+                dampings = [damping*f for f in damping_factors]
+                xs = [self.clip(x + self.solve(jtj, grad, scale, d))
+                      for d in dampings]
+                for d, x_new, r_new in zip(dampings, xs, self.eval_batch(xs)):
+                    phi_new = merit(r_new)
+                    if phi_new < phi and (best is None or phi_new < best[0]):
+                        best = phi_new, d, x_new, r_new
+                if best is not None:
+                    break
+                damping *= 10.0**len(damping_factors)
+
+            if best is None:
+                converged = True
+                break
+            phi_new, damping, x, resid = best
+            if (phi - phi_new) <= ftol*phi:
+                phi = phi_new
+                converged = True
+                break
+            phi = phi_new
+        return x, phi, it, converged
+
+    @staticmethod
+    def solve(jtj, grad, scale, damping):
+        """ returns the damped least squares step """
+        a = jtj + damping*np.diag(scale)
+        try:
+            return np.linalg.solve(a, -grad)
+        except np.linalg.LinAlgError:
+            return np.linalg.lstsq(a, -grad, rcond=None)[0]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check the damped least squares optimizer
+
+"""
+
+
+import unittest
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.optimize.optimizer import (Variable, Optimizer, merit,
+                                          eval_residuals, FunctionOperand,
+                                          FirstOrderOperand, RMSSpotOperand,
+                                          ThicknessOperand)
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+class OptimizerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/singlet.seq')
+        self.variables = [Variable('cv', 1), Variable('cv', 2),
+                          Variable('thi', 2, bounds=(10., 20.))]
+        self.operands = [FirstOrderOperand('efl', target=12.5, weight=10.),
+                         RMSSpotOperand(0), RMSSpotOperand(1)]
+
+    def test_optimize(self):
+        opt = Optimizer(self.opm, self.variables, self.operands,
+                        max_workers=1)
+        merit_0 = merit(opt.residuals(opt.get_values()))
+        result = opt.optimize(max_iter=10)
+
+        self.assertLess(result.merit, 1e-3*merit_0)
+        fod = self.opm.optical_spec.parax_data.fod
+        self.assertAlmostEqual(fod.efl, 12.5, places=4)
+        npt.assert_allclose(opt.get_values(), result.x)
+        self.assertEqual(self.opm.seq_model.gaps[2].thi, result.x[2])
+
+    def test_parallel_evaluation(self):
+        serial = Optimizer(self.opm, self.variables, self.operands,
+                           max_workers=1).optimize(max_iter=2)
+        opm = open_model(root_pth/'codev/tests/singlet.seq')
+        parallel = Optimizer(opm, self.variables, self.operands,
+                             max_workers=2).optimize(max_iter=2)
+        npt.assert_array_equal(parallel.x, serial.x)
+        self.assertEqual(parallel.merit, serial.merit)
+
+    def test_coef_variable(self):
+        # the singlet has spherical surfaces
+        var = Variable('coef', 1, index=1)
+        with self.assertRaises(ValueError):
+            var.get(self.opm)
+        opt = Optimizer(self.opm, [var], self.operands, max_workers=1)
+        with self.assertRaises(ValueError):
+            opt.optimize(max_iter=1)
+
+    def test_operand_errors(self):
+        # errors in an operand aren't taken as an unreachable model
+        def bad_operand(opt_model):
+            return np.concatenate([np.zeros(2), np.zeros((2, 2))])
+        operands = self.operands + [FunctionOperand(bad_operand)]
+        x = Optimizer(self.opm, self.variables, operands,
+                      max_workers=1).get_values()
+        with self.assertRaises(ValueError):
+            eval_residuals(self.opm, self.variables, operands, x)
+
+    def test_jacobian_bounds(self):
+        # the lens thickness is 1, the back focus 15; the steps are 1e-4
+        cv = self.opm.seq_model.ifcs[1].profile.cv
+        variables = [Variable('thi', 1, bounds=(1. - 2e-5, 1. + 5e-5)),
+                     Variable('thi', 2, bounds=(None, 15. + 2e-5)),
+                     Variable('cv', 1, bounds=(cv, cv))]
+        opt = Optimizer(self.opm, variables, self.operands, max_workers=1)
+        evaluated = []
+
+        def eval_batch(xs):
+            evaluated.extend(xs)
+            return Optimizer.eval_batch(opt, xs)
+        opt.eval_batch = eval_batch
+
+        x = opt.get_values()
+        resid = opt.residuals(x)
+        jac = opt.jacobian(x, resid)
+        # the fixed variable isn't perturbed
+        self.assertEqual(len(evaluated), 2)
+        for x_pert in evaluated:
+            npt.assert_array_equal(opt.clip(x_pert), x_pert)
+        self.assertAlmostEqual(evaluated[0][0] - x[0], 5e-5)
+        self.assertAlmostEqual(evaluated[1][1] - x[1], -1e-4)
+        self.assertTrue(not jac[:, 2].any())
+
+        # the columns match the unbounded forward differences
+        free = Optimizer(self.opm, [Variable('thi', 1), Variable('thi', 2)],
+                         self.operands, max_workers=1)
+        jac_free = free.jacobian(x[:2], resid)
+        npt.assert_allclose(jac[:, :2], jac_free, rtol=0.05, atol=1e-6)
+
+    def test_constraints(self):
+        thi = ThicknessOperand(1, bounds=(2., None))
+        npt.assert_allclose(thi.residuals(self.opm), [-1.])
+        thi.bounds = (0.5, 3.)
+        npt.assert_allclose(thi.residuals(self.opm), [0.])
+
+        # hold the lens thickness at 2 while reaching the focal length
+        variables = self.variables + [Variable('thi', 1)]
+        operands = self.operands + [ThicknessOperand(1, bounds=(2., None),
+                                                     weight=100.)]
+        Optimizer(self.opm, variables, operands,
+                  max_workers=1).optimize(max_iter=10)
+        self.assertGreater(self.opm.seq_model.gaps[1].thi, 2. - 1e-3)
+        self.assertAlmostEqual(self.opm.optical_spec.parax_data.fod.efl,
+                               12.5, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check the Monte Carlo tolerance analysis
+
+"""
+
+
+import unittest
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.optimize.optimizer import (Variable, FirstOrderOperand,
+                                          RMSSpotOperand)
+from rayoptics.optimize.tolerance import (Tolerance, MonteCarlo,
+                                          RunningStats, sample_perturbations)
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+class MonteCarloTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/singlet.seq')
+        self.tolerances = [Tolerance(Variable('thi', 1), 0.05),
+                           Tolerance(Variable('cv', 1), 1e-3, 'normal'),
+                           Tolerance(Variable('tilt', 2, index=0), 0.1,
+                                     'end'),
+                           Tolerance(Variable('n', 1), 0.001),
+                           Tolerance(Variable('dec', 1, index=1), 0.01)]
+        self.metrics = {'spot': RMSSpotOperand(0),
+                        'efl': FirstOrderOperand('efl')}
+
+    def test_perturbations(self):
+        delta = np.array([sample_perturbations(self.tolerances, 3, k)
+                          for k in range(200)])
+        limits = np.array([tol.limit for tol in self.tolerances])
+        self.assertTrue(np.all(np.abs(delta) <= limits))
+        npt.assert_array_equal(np.abs(delta[:, 2]), 0.1)
+        npt.assert_array_equal(sample_perturbations(self.tolerances, 3, 7),
+                               delta[7])
+
+    def test_running_stats(self):
+        values = np.random.default_rng(1).normal(size=101)
+        stats = RunningStats()
+        for v in values:
+            stats.add(v)
+        self.assertAlmostEqual(stats.mean, values.mean())
+        self.assertAlmostEqual(stats.std, values.std(ddof=1))
+        self.assertEqual(stats.max, values.max())
+        self.assertEqual(stats.percentile(50), np.median(values))
+
+    def test_monte_carlo(self):
+        fod = self.opm.optical_spec.parax_data.fod
+        efl = fod.efl
+        medium = self.opm.seq_model.gaps[1].medium
+        for i in (1, 2):
+            self.assertIsNone(self.opm.seq_model.ifcs[i].decenter)
+        mc = MonteCarlo(self.opm, self.tolerances, self.metrics,
+                        compensators=[Variable('thi', 2)], max_workers=1)
+        self.assertEqual(mc.nominal_metrics['efl'], efl)
+        stats = mc.run(8, batch_size=3)
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['spot'].count, 8)
+        self.assertGreater(stats['efl'].std, 0.)
+        # the model is restored to the nominal values
+        self.assertEqual(self.opm.optical_spec.parax_data.fod.efl, efl)
+        self.assertIs(self.opm.seq_model.gaps[1].medium, medium)
+        for i in (1, 2):
+            self.assertIsNone(self.opm.seq_model.ifcs[i].decenter)
+
+        opm = open_model(root_pth/'codev/tests/singlet.seq')
+        parallel = MonteCarlo(opm, self.tolerances, self.metrics,
+                              compensators=[Variable('thi', 2)],
+                              max_workers=2).run(8, batch_size=3)
+        for name in self.metrics:
+            npt.assert_array_equal(parallel[name].values,
+                                   stats[name].values)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Monte Carlo tolerance analysis
+
+A tolerance analysis perturbs the toleranced parameters of a model at
+random, optionally adjusts compensators such as the back focus, and
+evaluates performance metrics for each trial::
+
+    tolerances = [Tolerance(Variable('thi', 1), 0.05),
+                  Tolerance(Variable('dec', 2, index=1), 0.02),
+                  Tolerance(Variable('n', 1), 0.001, 'normal')]
+    mc = MonteCarlo(opm, tolerances, {'spot': RMSSpotOperand(0)},
+                    compensators=[Variable('thi', -1)])
+    stats = mc.run(10000)
+    stats['spot'].percentile(90)
+
+The perturbations of trial k are drawn from a random generator seeded by
+(seed, k), so a trial is reproducible regardless of the worker it runs on
+or the number of workers. The trials are evaluated in batches on an
+:class:`~.executor.AnalysisExecutor` process pool, and the statistics are
+accumulated as the batches complete.
+
+.. codeauthor: Michael J. Hayford
+"""
+
+import math
+
+import numpy as np
+
+from rayoptics.optimize.optimizer import (Optimizer, MeritFunctionError,
+                                          get_values, set_values,
+                                          get_aim_pts, set_aim_pts)
+from rayoptics.raytr import traceerror as terr
+from rayoptics.raytr.executor import AnalysisExecutor
+
+distributions = ('uniform', 'normal', 'end')
+
+
+class Tolerance:
+    """ A toleranced parameter and the distribution of its errors
+
+    The distributions are:
+
+        - 'uniform': uniform between -limit and limit
+        - 'normal': normal with a standard deviation of limit/2, truncated
+          at +/- limit
+        - 'end': -limit or +limit with equal probability
+
+    Attributes:
+        var: the :class:`~.optimizer.Variable` that is perturbed
+        limit: the tolerance limit, added to the nominal value
+        distribution: the distribution of the perturbations
+    """
+
+    def __init__(self, var, limit, distribution='uniform'):
+        if distribution not in distributions:
+            raise ValueError('unknown distribution {}'.format(distribution))
+        self.var = var
+        self.limit = limit
+        self.distribution = distribution
+
+    def __repr__(self):
+        return '{}({!r}, {}, {!r})'.format(type(self).__name__, self.var,
+                                           self.limit, self.distribution)
+
+    def sample(self, rng):
+        """ returns a perturbation drawn with the random generator **rng** """
+        if self.distribution == 'uniform':
+            return rng.uniform(-self.limit, self.limit)
+        elif self.distribution == 'normal':
+            while True:
+                delta = rng.normal(0., self.limit/2)
+                if abs(delta) <= self.limit:
+                    return delta
+        elif self.distribution == 'end':
+            return self.limit if rng.random() < 0.5 else -self.limit
+
+
+def sample_perturbations(tolerances, seed, trial):
+    """ returns an array of the perturbations of **tolerances** in **trial**
+    """
+    rng = np.random.default_rng([seed, trial])
+    return np.array([tol.sample(rng) for tol in tolerances])
+
+
+def eval_metric(metric, opt_model):
+    """ returns the value of **metric** for **opt_model**
+
+    An :class:`~.optimizer.Operand` metric evaluates to the root sum of
+    squares of its residuals, e.g. the RMS spot radius for an
+    :class:`~.optimizer.RMSSpotOperand`; other metrics are called as
+    ``metric(opt_model)``.
+    """
+    if hasattr(metric, 'residuals'):
+        resid = metric.residuals(opt_model)
+        return math.sqrt(np.dot(resid, resid))
+    return metric(opt_model)
+
+
+class RunningStats:
+    """ Statistics of a metric, accumulated one value at a time
+
+    The mean and variance are accumulated with Welford's algorithm. The
+    values are kept for percentiles unless **keep_values** is False.
+
+    Attributes:
+        count: number of values
+        mean: mean of the values
+        min: smallest value
+        max: largest value
+        values: list of the values, if kept
+    """
+
+    def __init__(self, keep_values=True):
+        self.count = 0
+        self.mean = 0.
+        self._m2 = 0.
+        self.min = np.inf
+        self.max = -np.inf
+        self.values = [] if keep_values else None
+
+    def __repr__(self):
+        return ('{}(count={}, mean={:.6g}, std={:.6g}, min={:.6g}, '
+                'max={:.6g})'.format(type(self).__name__, self.count,
+                                     self.mean, self.std, self.min, self.max))
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta/self.count
+        self._m2 += delta*(value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if self.values is not None:
+            self.values.append(value)
+
+    @property
+    def variance(self):
+        """ the sample variance of the values """
+        return self._m2/(self.count - 1) if self.count > 1 else 0.
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def percentile(self, q):
+        """ returns the q-th percentile of the values """
+        return float(np.percentile(self.values, q))
+
+
+class ToleranceSpec:
+    """ The definition of a tolerance analysis, as sent to the workers
+
+    Attributes:
+        tolerances: list of :class:`Tolerance`
+        metrics: dict of metric name to metric, see :func:`eval_metric`
+        compensators: list of :class:`~.optimizer.Variable` adjusted after
+                      the perturbations are applied
+        comp_operands: list of :class:`~.optimizer.Operand` minimized by
+                       the compensators
+        comp_iter: maximum number of iterations of the compensation
+        seed: the seed of the random perturbations
+        nominal: nominal values of the toleranced parameters
+        comp_nominal: nominal values of the compensators
+        aim_pts: the nominal aim points of the fields
+        media: dict of gap index to the nominal medium of the gaps with 'n'
+               variables, which are replaced by an
+               :class:`~.medium.OffsetMedium` when perturbed
+        decenters: dict of interface index to the nominal decenter of the
+                   interfaces with 'dec' or 'tilt' variables, which are
+                   given a decenter when perturbed
+    """
+
+    def __init__(self, opt_model, tolerances, metrics, compensators,
+                 comp_operands, comp_iter, seed):
+        self.tolerances = tolerances
+        self.metrics = metrics
+        self.compensators = compensators
+        self.comp_operands = comp_operands
+        self.comp_iter = comp_iter
+        self.seed = seed
+        self.nominal = get_values(opt_model, [t.var for t in tolerances])
+        self.comp_nominal = get_values(opt_model, compensators)
+        self.aim_pts = get_aim_pts(opt_model)
+        variables = [t.var for t in tolerances] + compensators
+        gaps = opt_model.seq_model.gaps
+        self.media = {v.idx: gaps[v.idx].medium
+                      for v in variables if v.kind == 'n'}
+        ifcs = opt_model.seq_model.ifcs
+        self.decenters = {v.idx: ifcs[v.idx].decenter
+                          for v in variables if v.kind in ('dec', 'tilt')}
+
+
+def run_trial(opt_model, spec, trial):
+    """ perturb, compensate and evaluate **opt_model** for **trial**
+
+    The model is set to the nominal values plus the perturbations of the
+    trial; results of earlier trials evaluated on the same model are
+    overwritten.
+
+    Returns:
+        (**perturbations**, **metrics**) arrays; the metrics are NaN if the
+        trial can't be evaluated
+    """
+    delta = sample_perturbations(spec.tolerances, spec.seed, trial)
+    metrics = np.full(len(spec.metrics), np.nan)
+    set_aim_pts(opt_model, spec.aim_pts)
+    try:
+        set_values(opt_model, spec.compensators, spec.comp_nominal)
+        set_values(opt_model, [t.var for t in spec.tolerances],
+                   spec.nominal + delta)
+        if len(spec.compensators) > 0:
+            Optimizer(opt_model, spec.compensators, spec.comp_operands,
+                      max_workers=1).optimize(max_iter=spec.comp_iter)
+        for i, metric in enumerate(spec.metrics.values()):
+            metrics[i] = eval_metric(metric, opt_model)
+    except (terr.TraceError, MeritFunctionError, ZeroDivisionError):
+        pass
+    return delta, metrics
+
+
+def run_trials(opt_model, spec, start, stop):
+    """ returns a list of the results of trials **start** to **stop** """
+    return [run_trial(opt_model, spec, trial) for trial in range(start, stop)]
+
+
+class MonteCarlo:
+    """ Monte Carlo tolerance analysis of an optical model
+
+    Attributes:
+        opt_model: the nominal :class:`~.OpticalModel`; it is restored to
+                   the nominal values after the analysis
+        spec: the :class:`ToleranceSpec` of the analysis
+        executor: the :class:`~.executor.AnalysisExecutor` running the
+                  trials
+        nominal_metrics: dict of the metric values of the nominal model
+    """
+
+    def __init__(self, opt_model, tolerances, metrics, compensators=None,
+                 comp_operands=None, comp_iter=5, seed=0, max_workers=None):
+        """ define a tolerance analysis
+
+        Args:
+            opt_model: the nominal model
+            tolerances: list of :class:`Tolerance`
+            metrics: dict of metric name to metric, see :func:`eval_metric`
+            compensators: list of :class:`~.optimizer.Variable`
+            comp_operands: operands minimized by the compensators, defaults
+                           to the operands in **metrics**
+            comp_iter: maximum number of compensation iterations per trial
+            seed: seed of the random perturbations
+            max_workers: number of worker processes, 1 for serial evaluation
+        """
+        self.opt_model = opt_model
+        compensators = [] if compensators is None else compensators
+        if comp_operands is None:
+            comp_operands = [m for m in metrics.values()
+                             if hasattr(m, 'residuals')]
+        self.spec = ToleranceSpec(opt_model, tolerances, metrics,
+                                  compensators, comp_operands, comp_iter,
+                                  seed)
+        self.executor = AnalysisExecutor(opt_model, max_workers=max_workers)
+        self.nominal_metrics = {name: eval_metric(metric, opt_model)
+                                for name, metric in metrics.items()}
+
+    def trial(self, trial):
+        """ returns the perturbations and metrics of **trial**, evaluated
+        on the model; the model is left perturbed """
+        return run_trial(self.opt_model, self.spec, trial)
+
+    def run(self, num_trials, batch_size=16, callback=None, start=0,
+            keep_values=True):
+        """ run **num_trials** trials and return the metric statistics
+
+        Args:
+            num_trials: number of trials
+            batch_size: number of trials evaluated per job
+            callback: if not None, called as ``callback(stats, num_done)``
+                      after each round of batches
+            start: index of the first trial
+            keep_values: keep the metric values for percentiles
+
+        Returns:
+            a dict of metric name to :class:`RunningStats`, plus the count
+            of failed trials under 'failed'
+        """
+        stats = {name: RunningStats(keep_values=keep_values)
+                 for name in self.spec.metrics}
+        stats['failed'] = 0
+        batches = [(self.spec, b, min(b + batch_size, start + num_trials))
+                   for b in range(start, start + num_trials, batch_size)]
+        round_size = max(self.executor.max_workers, 1)
+        num_done = 0
+        with self.executor:
+            for r in range(0, len(batches), round_size):
+                for results in self.executor.map(run_trials,
+                                                 batches[r:r+round_size]):
+                    for delta, metrics in results:
+                        num_done += 1
+                        if not np.all(np.isfinite(metrics)):
+                            stats['failed'] += 1
+                            continue
+                        for name, value in zip(self.spec.metrics, metrics):
+                            stats[name].add(value)
+                if callback is not None:
+                    callback(stats, num_done)
+
+        self.restore_nominal()
+        return stats
+
+    def restore_nominal(self):
+        """ set the model back to the nominal values """
+        spec = self.spec
+        set_aim_pts(self.opt_model, spec.aim_pts)
+        set_values(self.opt_model, spec.compensators, spec.comp_nominal)
+        set_values(self.opt_model, [t.var for t in spec.tolerances],
+                   spec.nominal)
+        gaps = self.opt_model.seq_model.gaps
+        for idx, medium in spec.media.items():
+            gaps[idx].medium = medium
+        ifcs = self.opt_model.seq_model.ifcs
+        for idx, decenter in spec.decenters.items():
+            ifcs[idx].decenter = decenter
+        self.opt_model.update_model()
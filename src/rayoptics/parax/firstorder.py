@@ -9,6 +9,9 @@
 """
 import math
 from collections import namedtuple
+
+import numpy as np
+
 from rayoptics.optical.model_constants import Intfc, Gap, Tfrm, Indx, Zdir
 from rayoptics.optical.model_constants import ht, slp, aoi
 from rayoptics.parax.idealimager import ideal_imager_setup
@@ -327,6 +330,205 @@ def compute_first_order(opt_model, stop, wvl):
     return ParaxData(ax_ray, pr_ray, fod)
 
 
+def paraxial_trace_many(pwr, thi, n, y0, nu0, start=0):
+    """ trace paraxial rays through M variants of a system at once
+
+    The rays are traced in reduced coordinates, i.e. the height y and the
+    reduced slope n*u, so that the transfer and refraction at each interface
+    are 2x2 ray transfer matrices applied to all variants and rays at once.
+
+    Args:
+        pwr: (M, N) array of the optical powers of the N interfaces
+        thi: (M, N-1) array of the gap thicknesses
+        n: (M, N) array of the signed refractive indices following each
+           interface
+        y0: (M, R) array of the ray heights at interface **start**
+        nu0: (M, R) array of the reduced slopes preceding interface
+             **start**
+        start: index of the starting interface
+
+    Returns:
+        (**y**, **nu**), (M, N, R) arrays of the heights and reduced slopes
+        following each interface. Interfaces before **start** are NaN.
+    """
+    num_variants, num_ifcs = pwr.shape
+    y = np.full((num_variants, num_ifcs) + np.shape(y0)[1:], np.nan)
+    nu = np.full_like(y, np.nan)
+    cur_y = np.asarray(y0, dtype=float)
+    cur_nu = np.asarray(nu0, dtype=float) - cur_y*pwr[:, start, np.newaxis]
+    y[:, start] = cur_y
+    nu[:, start] = cur_nu
+    for i in range(start+1, num_ifcs):
+        cur_y = cur_y + (thi[:, i-1]/n[:, i-1])[:, np.newaxis]*cur_nu
+        cur_nu = cur_nu - cur_y*pwr[:, i, np.newaxis]
+        y[:, i] = cur_y
+        nu[:, i] = cur_nu
+    return y, nu
+
+
+def compute_first_order_many(opt_model, cv=None, thi=None, rndx=None,
+                             wvls=None, stop=None):
+    """ Returns first order data for M variants of the model at once.
+
+    The variants are defined by arrays of curvatures, thicknesses and/or
+    refractive indices replacing the model values; any of them may have a
+    leading dimension of length M, and the others are broadcast. With
+    **wvls**, the variants are the model at each of the M wavelengths, and
+    the powers of the surfaces are computed at each wavelength.
+
+    The aperture and field specifications of the model are applied to each
+    variant, as in :func:`compute_first_order`.
+
+    Args:
+        opt_model: the :class:`~.OpticalModel` supplying the system
+        cv: (N,) or (M, N) array of interface curvatures
+        thi: (N-1,) or (M, N-1) array of gap thicknesses
+        rndx: (N,) or (M, N) array of the refractive indices following each
+              interface, as in seq_model.rndx
+        wvls: sequence of M wavelengths in nm, used if rndx is None
+        stop: the stop surface; defaults to the model stop, or to the 1st
+              interface if the stop is floating
+
+    Returns:
+        a :class:`ParaxData` tuple; **ax_ray** and **pr_ray** are (M, N, 2)
+        arrays of heights and slopes and the attributes of **fod** are (M,)
+        arrays
+    """
+    seq_model = opt_model.seq_model
+    osp = opt_model.optical_spec
+    ref_wl = osp.spectral_region.reference_wvl
+    num_ifcs = len(seq_model.ifcs)
+    if rndx is None:
+        if wvls is None:
+            rndx = [n[ref_wl] for n in seq_model.rndx]
+        else:
+            rndx = seq_model.rindex_table(wvls).T
+    if cv is None:
+        cv = [ifc.profile_cv for ifc in seq_model.ifcs]
+    if thi is None:
+        thi = [g.thi for g in seq_model.gaps]
+    rndx, cv, thi = (np.atleast_2d(np.asarray(a, dtype=float))
+                     for a in (rndx, cv, thi))
+    num_variants = np.broadcast(rndx[..., 0], cv[..., 0],
+                                thi[..., 0]).shape[0]
+    rndx = np.broadcast_to(rndx, (num_variants, num_ifcs))
+    cv = np.broadcast_to(cv, (num_variants, num_ifcs))
+    thi = np.broadcast_to(thi, (num_variants, num_ifcs-1))
+
+    # signed indices and powers of the interfaces
+    n = np.array(seq_model.z_dir[:num_ifcs], dtype=float)*rndx
+    pwr = np.zeros((num_variants, num_ifcs))
+    for i, ifc in enumerate(seq_model.ifcs[1:], start=1):
+        if hasattr(ifc, 'profile'):
+            pwr[:, i] = cv[:, i]*(n[:, i] - n[:, i-1])
+        else:
+            pwr[:, i] = ifc.optical_power
+
+    n_0 = n[:, 0]
+    n_k = n[:, -1]
+    img = -2 if num_ifcs > 2 else -1
+    ones, zeros = np.ones(num_variants), np.zeros(num_variants)
+    y, nu = paraxial_trace_many(pwr, thi, n,
+                                np.stack([ones, zeros], axis=-1),
+                                np.stack([zeros, ones], axis=-1), start=1)
+    ak1, bk1 = y[:, img, 0], y[:, img, 1]
+    ck1, dk1 = nu[:, img, 0], nu[:, img, 1]
+
+    # compute the object yu and yu_bar values
+    if stop is None:
+        stop = seq_model.stop_surface if seq_model.stop_surface else 1
+    ybar1 = -y[:, stop, 1]
+    ubar1 = y[:, stop, 0]
+    n_obj = rndx[:, 0]
+    enp_dist = -ybar1/(n_obj*ubar1)
+    thi0 = thi[:, 0]
+    red = dk1 + thi0*ck1
+    obj2enp_dist = thi0 + enp_dist
+
+    pupil = osp.pupil
+    aperture, obj_img_key, value_key = pupil.key
+    if obj_img_key == 'object':
+        if value_key == 'pupil':
+            slp0 = 0.5*pupil.value/obj2enp_dist
+        elif value_key == 'NA':
+            slp0 = n_obj*np.tan(np.arcsin(pupil.value/n_obj))
+    elif obj_img_key == 'image':
+        if value_key == 'f/#':
+            slpk = -1./(2.0*pupil.value)
+            slp0 = slpk/red
+        elif value_key == 'NA':
+            slpk = n_k*np.tan(np.arcsin(pupil.value/n_k))
+            slp0 = slpk/red
+
+    fov = osp.field_of_view
+    field, obj_img_key, value_key = fov.key
+    max_fld, fn = fov.max_field()
+    if max_fld == 0.0:
+        max_fld = 1.0
+    if obj_img_key == 'object':
+        if value_key == 'angle':
+            slpbar0 = math.tan(math.radians(max_fld))*ones
+            ybar0 = -slpbar0*obj2enp_dist
+        elif value_key == 'height':
+            ybar0 = -max_fld*ones
+            slpbar0 = -ybar0/obj2enp_dist
+    elif obj_img_key == 'image':
+        if value_key == 'height':
+            ybar0 = red*max_fld
+            slpbar0 = -ybar0/obj2enp_dist
+
+    # We have the starting coordinates, now trace the rays
+    y, nu = paraxial_trace_many(pwr, thi, n,
+                                np.stack([zeros, ybar0], axis=-1),
+                                n_0[:, np.newaxis]*np.stack([slp0, slpbar0],
+                                                            axis=-1))
+    u = nu/n[:, :, np.newaxis]
+    ax_ray = np.stack([y[..., 0], u[..., 0]], axis=-1)
+    pr_ray = np.stack([y[..., 1], u[..., 1]], axis=-1)
+    ax_y, ax_u = ax_ray[..., ht], ax_ray[..., slp]
+    pr_y, pr_u = pr_ray[..., ht], pr_ray[..., slp]
+
+    # Fill in the contents of the FirstOrderData struct
+    fod = FirstOrderData()
+    fod.opt_inv = opt_inv = n_obj*(ax_y[:, 1]*pr_u[:, 0] -
+                                   pr_y[:, 1]*ax_u[:, 0])
+    fod.obj_dist = obj_dist = thi[:, 0].copy()
+    fod.img_dist = img_dist = thi[:, -1].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_pwr = ck1 != 0.0
+        fod.power = np.where(has_pwr, -ck1, 0.)
+        fod.efl = np.where(has_pwr, -1.0/ck1, 0.)
+        fod.pp1 = np.where(has_pwr, (dk1 - 1.0)*(n_obj/ck1), 0.)
+        fod.ppk = np.where(has_pwr, (ak1 - 1.0)*(n_k/ck1), 0.)
+        fod.ffl = fod.pp1 - fod.efl
+        fod.bfl = fod.efl - fod.ppk
+        fod.fno = -1.0/(2.0*n_k*ax_u[:, -1])
+
+        fod.m = ak1 + ck1*img_dist/n_k
+        fod.red = dk1 + ck1*obj_dist
+        fod.n_obj = n_obj
+        fod.n_img = n_k
+        fod.img_ht = -opt_inv/(n_k*ax_u[:, -1])
+        fod.obj_ang = np.degrees(np.arctan(pr_u[:, 0]))
+
+        nu_pr0 = n_obj*pr_u[:, 0]
+        has_enp = pr_u[:, 0] != 0
+        fod.enp_dist = np.where(has_enp, -pr_y[:, 1]/nu_pr0, -1e10)
+        fod.enp_radius = np.where(has_enp, np.abs(opt_inv/nu_pr0), 1e10)
+
+        has_exp = pr_u[:, -1] != 0
+        fod.exp_dist = np.where(has_exp,
+                                -(pr_y[:, -1]/pr_u[:, -1] - img_dist), -1e10)
+        fod.exp_radius = np.where(has_exp,
+                                  np.abs(opt_inv/(n_k*pr_u[:, -1])), 1e10)
+
+    # compute object and image space numerical apertures
+    fod.obj_na = n_obj*np.sin(np.arctan(seq_model.z_dir[0]*ax_u[:, 0]))
+    fod.img_na = n_k*np.sin(np.arctan(seq_model.z_dir[-1]*ax_u[:, -1]))
+
+    return ParaxData(ax_ray, pr_ray, fod)
+
+
 def compute_principle_points(path, n_0=1.0, n_k=1.0):
     """ Returns paraxial p and q rays, plus partial first order data.
 
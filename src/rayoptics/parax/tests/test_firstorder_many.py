@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" tests for the batched first order calculations
+
+.. codeauthor: Michael J. Hayford
+"""
+
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.parax import firstorder as fo
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+fod_attrs = ['opt_inv', 'power', 'efl', 'pp1', 'ppk', 'ffl', 'bfl', 'fno',
+             'm', 'red', 'img_ht', 'obj_ang', 'enp_dist', 'enp_radius',
+             'exp_dist', 'exp_radius', 'obj_na', 'img_na']
+
+
+def test_first_order_variants():
+    opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+    sm = opm.seq_model
+    osp = opm.optical_spec
+
+    pd_many = fo.compute_first_order_many(opm)
+    fod = osp.parax_data.fod
+    for attr in fod_attrs:
+        npt.assert_allclose(getattr(pd_many.fod, attr), [getattr(fod, attr)],
+                            rtol=1e-10, atol=1e-12, err_msg=attr)
+    npt.assert_allclose(pd_many.ax_ray[0],
+                        np.array(osp.parax_data.ax_ray)[:, :2], atol=1e-12)
+
+    scale = np.array([0.9, 1.0, 1.1])
+    cv = np.tile([ifc.profile_cv for ifc in sm.ifcs], (3, 1))
+    cv[:, 3] *= scale
+    thi = np.array([g.thi for g in sm.gaps])
+    thi_5 = thi[5]*scale
+    thi = np.tile(thi, (3, 1))
+    thi[:, 5] = thi_5
+    fod_many = fo.compute_first_order_many(opm, cv=cv, thi=thi).fod
+
+    cv_3 = sm.ifcs[3].profile_cv
+    for i in range(3):
+        sm.ifcs[3].profile.cv = cv[i, 3]
+        sm.gaps[5].thi = thi_5[i]
+        opm.update_model()
+        fod = osp.parax_data.fod
+        for attr in fod_attrs:
+            npt.assert_allclose(getattr(fod_many, attr)[i],
+                                getattr(fod, attr),
+                                rtol=1e-9, atol=1e-12, err_msg=attr)
+    sm.ifcs[3].profile.cv = cv_3
+    sm.gaps[5].thi = thi_5[1]
+    opm.update_model()
+
+    fod_wvls = fo.compute_first_order_many(opm, wvls=sm.wvlns).fod
+    ref_wl = osp.spectral_region.reference_wvl
+    npt.assert_allclose(fod_wvls.efl[ref_wl], osp.parax_data.fod.efl)
+    # the double Gauss has undercorrected axial color
+    assert fod_wvls.bfl[0] > fod_wvls.bfl[-1]
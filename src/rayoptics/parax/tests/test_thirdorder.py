@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" tests for the third order and chromatic aberration contributions
+
+.. codeauthor: Michael J. Hayford
+"""
+
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.parax import thirdorder as to
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+def paraxial_image_ht(seq_model, wl_idx, y, u):
+    """ paraxial ray height at the image, with the powers at wl_idx """
+    n_before = seq_model.rndx[0][wl_idx]
+    for c in range(1, len(seq_model.ifcs)):
+        y = y + seq_model.gaps[c-1].thi*u
+        n_after = seq_model.z_dir[c]*seq_model.rndx[c][wl_idx]
+        pwr = seq_model.ifcs[c].profile_cv*(n_after - n_before)
+        u = (n_before*u - y*pwr)/n_after
+        n_before = n_after
+    return y
+
+
+def test_chromatic_aberrations():
+    opm = open_model(root_pth/'codev/tests/singlet.seq')
+    sm = opm.seq_model
+    ax_ray, pr_ray, fod = opm.optical_spec.parax_data
+    ref_wl = opm.optical_spec.spectral_region.reference_wvl
+    to_data = to.calc_third_order(opm)
+    chromatic_sum = to_data.chromatic.sum(axis=0)
+
+    y_ref = paraxial_image_ht(sm, ref_wl, *ax_ray[0][:2])
+    ybar_ref = paraxial_image_ht(sm, ref_wl, *pr_ray[0][:2])
+    for wl_idx in range(len(sm.wvlns)):
+        tac, tlc = to.chromatic_to_transverse_aberration(
+            chromatic_sum[:, wl_idx], sm.rndx[-1][ref_wl], ax_ray[-1][1])
+        y = paraxial_image_ht(sm, wl_idx, *ax_ray[0][:2])
+        ybar = paraxial_image_ht(sm, wl_idx, *pr_ray[0][:2])
+        npt.assert_allclose(tac, y - y_ref, rtol=0.05, atol=1e-12)
+        npt.assert_allclose(tlc, ybar - ybar_ref, rtol=0.05, atol=1e-12)
+
+    dense = np.linspace(450., 650., 101)
+    to_dense = to.calc_third_order(opm, wvls=dense)
+    npt.assert_array_equal(to_dense.seidel, to_data.seidel)
+    assert to_dense.chromatic.shape == (len(to_data.ifcs), 2, len(dense))
+    npt.assert_allclose(to_dense.chromatic[..., 0],
+                        to_data.chromatic[..., -1])
+
+
+def test_aspheric_contributions():
+    opm = open_model(root_pth/'optical/tests/cell_phone_camera.roa')
+    to_df = to.compute_third_order(opm)
+    asp_rows = [lbl for lbl in to_df.index if lbl.endswith('.asp')]
+    assert len(asp_rows) == 8
+    npt.assert_allclose(to_df.loc['sum'], to_df.drop('sum').sum())
+
+    chroma_df = to.compute_first_order_chromatic(opm)
+    assert list(chroma_df.columns.levels[0]) == to.chromatic_labels
+    assert len(chroma_df) == len(opm.seq_model.ifcs) - 1
@@ -8,75 +8,159 @@
 .. codeauthor: Michael J. Hayford
 """
 
+from collections import namedtuple
+
 import numpy as np
 import pandas as pd
 
 from rayoptics.optical.model_constants import ht, slp, aoi
 
-
-def compute_third_order(opt_model):
-    """ Compute Seidel aberration coefficents. """
+seidel_labels = ['S-I', 'S-II', 'S-III', 'S-IV', 'S-V']
+chromatic_labels = ['C-I', 'C-II']
+
+ThirdOrderData = namedtuple('ThirdOrderData', ['ifcs', 'seidel', 'asp',
+                                               'has_asp', 'chromatic',
+                                               'wvls'])
+ThirdOrderData.__doc__ = "surface by surface third order aberration data"
+ThirdOrderData.ifcs.__doc__ = "(M,) array of the interface indices"
+ThirdOrderData.seidel.__doc__ = "(M, 5) array of the Seidel contributions"
+ThirdOrderData.asp.__doc__ = "(M, 5) array of the aspheric contributions"
+ThirdOrderData.has_asp.__doc__ = "(M,) bool array, True for aspheres"
+ThirdOrderData.chromatic.__doc__ = ("(M, 2, W) array of the axial and "
+                                    "lateral color contributions")
+ThirdOrderData.wvls.__doc__ = "the W wavelengths of the chromatic data"
+
+
+def calc_third_order(opt_model, wvls=None):
+    """ Compute the third order and chromatic aberration contributions.
+
+    The Seidel contributions of all of the surfaces are computed from the
+    paraxial ray data at the reference wavelength. The first order axial
+    (C-I) and lateral (C-II) color contributions are computed for all of
+    the wavelengths at once, relative to the reference wavelength.
+
+    Args:
+        opt_model: the :class:`~.OpticalModel`
+        wvls: wavelengths (nm) for the chromatic contributions, defaults
+              to the model wavelengths
+
+    Returns:
+        a :class:`ThirdOrderData` tuple of arrays
+    """
     seq_model = opt_model.seq_model
-    n_before = seq_model.central_rndx(0)
-    parax_data = opt_model.optical_spec.parax_data
-    ax_ray, pr_ray, fod = parax_data
+    ax_ray, pr_ray, fod = opt_model.optical_spec.parax_data
     opt_inv = fod.opt_inv
-    opt_inv_sqr = opt_inv*opt_inv
-
-    third_order = {}
-
-    # Transfer from object
-    p = 0
-    pd_index = ['S-I', 'S-II', 'S-III', 'S-IV', 'S-V']
-    for c in range(1, len(ax_ray)-1):
-        n_after = seq_model.central_rndx(c)
-        n_after = n_after if seq_model.z_dir[c] > 0 else -n_after
-        cv = seq_model.ifcs[c].profile_cv
-
-        A = n_after * ax_ray[c][aoi]
-        Abar = n_after * pr_ray[c][aoi]
-        P = cv*(1./n_after - 1./n_before)
-        delta_slp = ax_ray[c][slp]/n_after - ax_ray[p][slp]/n_before
-        SIi = -A**2 * ax_ray[c][ht] * delta_slp
-        SIIi = -A*Abar * ax_ray[c][ht] * delta_slp
-        SIIIi = -Abar**2 * ax_ray[c][ht] * delta_slp
-        SIVi = -opt_inv_sqr * P
-        delta_n_sqr = 1./n_after**2 - 1./n_before**2
-        SVi = -Abar*(Abar * Abar * delta_n_sqr * ax_ray[c][ht] -
-                     (opt_inv + Abar * ax_ray[c][ht])*pr_ray[c][ht]*P)
-
-        scoef = pd.Series([SIi, SIIi, SIIIi, SIVi, SVi], index=pd_index)
-        col = str(c)
-        third_order[col] = scoef
-
-        # handle case of aspheric profile
-        if hasattr(seq_model.ifcs[c], 'profile'):
-            to_asp = aspheric_seidel_contribution(seq_model, parax_data, c,
-                                                  n_before, n_after)
-            if to_asp:
-                ascoef = pd.Series(to_asp, index=pd_index)
-                third_order[col+'.asp'] = ascoef
-
-        p = c
-        n_before = n_after
-
-    third_order_df = pd.DataFrame(third_order, index=pd_index)
-    third_order_df['sum'] = third_order_df.sum(axis='columns')
-    return third_order_df.T
+    ref_wl = opt_model.optical_spec.spectral_region.reference_wvl
+
+    ax = np.array(ax_ray)
+    pr = np.array(pr_ray)
+    num_ifcs = len(ax)
+    z_dir = np.array(seq_model.z_dir[:num_ifcs], dtype=float)
+    rndx = np.array(seq_model.rndx[:num_ifcs])
+    n = z_dir*rndx[:, ref_wl]
+    if wvls is None:
+        wvls = seq_model.wvlns
+        dn = rndx - rndx[:, ref_wl:ref_wl+1]
+    else:
+        dn = seq_model.rindex_table(wvls)[:num_ifcs] - rndx[:, ref_wl:ref_wl+1]
+
+    # interface c vs. the preceding gap, c = 1 ... num_ifcs - 2
+    ifcs = np.arange(1, num_ifcs-1)
+    n_before, n_after = n[:-2], n[1:-1]
+    y, u, i = ax[1:-1, ht], ax[1:-1, slp], ax[1:-1, aoi]
+    u_before = ax[:-2, slp]
+    ybar, ubar, ibar = pr[1:-1, ht], pr[1:-1, slp], pr[1:-1, aoi]
+    cv = np.array([seq_model.ifcs[c].profile_cv for c in ifcs])
+
+    A = n_after*i
+    Abar = n_after*ibar
+    P = cv*(1./n_after - 1./n_before)
+    delta_slp = u/n_after - u_before/n_before
+    delta_n_sqr = 1./n_after**2 - 1./n_before**2
+
+    seidel = np.empty((len(ifcs), 5))
+    seidel[:, 0] = -A**2*y*delta_slp
+    seidel[:, 1] = -A*Abar*y*delta_slp
+    seidel[:, 2] = -Abar**2*y*delta_slp
+    seidel[:, 3] = -opt_inv**2*P
+    seidel[:, 4] = -Abar*(Abar*Abar*delta_n_sqr*y -
+                          (opt_inv + Abar*y)*ybar*P)
+
+    # aspheric contributions
+    G = np.array([seq_model.ifcs[c].profile.aspheric_4th_order_term()
+                  if hasattr(seq_model.ifcs[c], 'profile') else 0.
+                  for c in ifcs])
+    has_asp = G != 0.
+    asp = np.zeros_like(seidel)
+    if np.any(has_asp):
+        ya, ua, yba, uba = y[has_asp], u[has_asp], ybar[has_asp], ubar[has_asp]
+        na = n_after[has_asp]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = -yba/uba
+            e = np.where(uba == 0., yba/ya,
+                         opt_inv*(-z/(na*ya*(ya + z*ua))))
+        SI_star = 8.0*G[has_asp]*(na - n_before[has_asp])*ya**4
+        asp[has_asp, 0] = SI_star
+        asp[has_asp, 1] = SI_star*e
+        asp[has_asp, 2] = SI_star*e**2
+        asp[has_asp, 4] = SI_star*e**3
+
+    # first order chromatic contributions, from the change of the relative
+    #  dispersion dn/n across each interface
+    dn_n = dn/rndx[:, ref_wl:ref_wl+1]
+    delta_dn_n = dn_n[1:-1] - dn_n[:-2]
+    chromatic = np.empty((len(ifcs), 2, dn.shape[1]))
+    chromatic[:, 0] = (A*y)[:, np.newaxis]*delta_dn_n
+    chromatic[:, 1] = (Abar*y)[:, np.newaxis]*delta_dn_n
+
+    return ThirdOrderData(ifcs, seidel, asp, has_asp, chromatic,
+                          list(wvls))
 
 
-def calc_4th_order_aspheric_term(p):
-    G = 0.
-    if type(p).__name__ == 'Conic':
-        cv = p.cv
-        cc = p.cc
-        G = cc*cv**3/8.0
-    elif type(p).__name__ == 'EvenPolynomial':
-        cv = p.cv
-        cc = p.cc
-        G = cc*cv**3/8.0 + p.coef4
+def compute_third_order(opt_model):
+    """ Compute Seidel aberration coefficents.
+
+    Returns:
+        a |DataFrame| of the S-I through S-V contributions, with a row per
+        surface, a row per aspheric surface contribution and a 'sum' row
+    """
+    to_data = calc_third_order(opt_model)
+    rows = []
+    labels = []
+    for c, seidel, asp, has_asp in zip(to_data.ifcs, to_data.seidel,
+                                       to_data.asp, to_data.has_asp):
+        rows.append(seidel)
+        labels.append(str(c))
+        if has_asp:
+            rows.append(asp)
+            labels.append(str(c)+'.asp')
+    rows = np.array(rows).reshape(-1, 5)
+    rows = np.append(rows, [rows.sum(axis=0)], axis=0)
+    labels.append('sum')
+    return pd.DataFrame(rows, index=labels, columns=seidel_labels)
+
+
+def compute_first_order_chromatic(opt_model, wvls=None):
+    """ Compute the axial and lateral color contributions for **wvls**.
+
+    The contributions are relative to the reference wavelength; the
+    contributions for a wavelength pair are the difference of the columns.
+
+    Returns:
+        a |DataFrame| with a row per surface and a 'sum' row, and columns
+        for C-I and C-II at each wavelength
+    """
+    to_data = calc_third_order(opt_model, wvls=wvls)
+    chromatic = to_data.chromatic.reshape(len(to_data.ifcs), -1)
+    chromatic = np.append(chromatic, [chromatic.sum(axis=0)], axis=0)
+    labels = [str(c) for c in to_data.ifcs] + ['sum']
+    columns = pd.MultiIndex.from_product([chromatic_labels, to_data.wvls],
+                                         names=['coef', 'wvl'])
+    return pd.DataFrame(chromatic, index=labels, columns=columns)
+
 
-    return G
+def calc_4th_order_aspheric_term(p):
+    return p.aspheric_4th_order_term()
 
 
 def aspheric_seidel_contribution(seq_model, parax_data, i, n_before, n_after):
@@ -132,6 +216,18 @@ def seidel_to_transverse_aberration(seidel, ref_index, slope):
     return pd.Series([TSA, TCO, TAS, SAS, PTB, DST], index=pd_index)
 
 
+def chromatic_to_transverse_aberration(chromatic, ref_index, slope):
+    """ Convert C-I and C-II coefficients to transverse ray aberrations """
+    pd_index = ['TAC', 'TLC']
+    CI, CII = chromatic
+    cnvrt = 1.0/(ref_index*slope)
+    # TAC = transverse axial color
+    TAC = cnvrt*CI
+    # TLC = transverse lateral color
+    TLC = cnvrt*CII
+    return pd.Series([TAC, TLC], index=pd_index)
+
+
 def seidel_to_field_curv(seidel, ref_index, opt_inv):
     """ Convert Seidel coefficients to astigmatic and Petzval curvatures """
     pd_index = ['TCV', 'SCV', 'PCV']
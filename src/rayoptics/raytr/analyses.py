@@ -14,6 +14,7 @@
         - :class:`~.RayFan`: trace a fan of rays in either the x or y meridian
         - :class:`~.RayList`: trace a list of rays from an object point
         - :class:`~.RayGrid`: trace a rectilinear grid of rays
+        - :class:`~.MTF`: tangential and sagittal MTF, including through focus
 
     All but the `Ray` class are supported by a group of functions to trace the
     rays, accumulate the data (trace_*), and refocus (focus_*) the data. A
@@ -22,26 +23,34 @@
     ray data.
 
     This module also has functions to calculate chief ray and reference sphere
-    information as well as functions for calculating the monochromatic PSF of
-    the model.
+    information as well as functions for calculating the monochromatic and
+    polychromatic PSF of the model.
 
 .. Created on Sat Feb 22 22:01:56 2020
 
 .. codeauthor: Michael J. Hayford
 """
 from math import sqrt
+import threading
+
 import numpy as np
-from numpy.fft import fftshift, fft2
+from numpy.fft import fftshift
 
+import scipy.fft
+from scipy import ndimage
 from scipy.interpolate import interp1d
 from rayoptics.util.misc_math import normalize
 
 import rayoptics.optical.model_constants as mc
 
 from rayoptics.raytr import sampler
-from rayoptics.raytr.raytrace import eic_distance
-from rayoptics.elem.transform import transform_after_surface
+from rayoptics.raytr import raytrace as rt
+from rayoptics.raytr.raytrace import eic_distance, eic_distance_many
+from rayoptics.elem.transform import (transform_after_surface,
+                                      transform_after_surface_many)
 from rayoptics.raytr import trace
+from rayoptics.raytr import tracestats
+from rayoptics.raytr.raycache import field_key
 from rayoptics.raytr import traceerror as terr
 
 
@@ -65,16 +74,16 @@ def get_chief_ray_pkg(opt_model, fld, wvl, foc):
                 - dir: direction cosine of the chief ray in exit pupil space
                 - dist: distance from interface to the exit pupil point
 
+    The chief ray package is cached for each field and wavelength on the
+    :attr:`~.OpticalSpecs.ray_cache` until the model is updated.
     """
-    if fld.chief_ray is None:
-        trace.aim_chief_ray(opt_model, fld, wvl=wvl)
-        chief_ray_pkg = trace.trace_chief_ray(opt_model, fld, wvl, foc)
-        fld.chief_ray = chief_ray_pkg
-    elif fld.chief_ray[0][2] != wvl:
+    ray_cache = opt_model.optical_spec.ray_cache
+    key = field_key(fld) + (wvl,)
+    chief_ray_pkg = ray_cache.get('chief_ray', key)
+    if chief_ray_pkg is None:
         chief_ray_pkg = trace.trace_chief_ray(opt_model, fld, wvl, foc)
-        fld.chief_ray = chief_ray_pkg
-    else:
-        chief_ray_pkg = fld.chief_ray
+        ray_cache.put('chief_ray', key, chief_ray_pkg)
+    fld.chief_ray = chief_ray_pkg
     return chief_ray_pkg
 
 
@@ -93,10 +102,20 @@ def setup_exit_pupil_coords(opt_model, fld, wvl, foc,
 
     Returns:
         ref_sphere: tuple of image_pt, ref_dir, ref_sphere_radius
+
+    The reference sphere is cached on the :attr:`~.OpticalSpecs.ray_cache`
+    for each **chief_ray_pkg**, **foc** and **image_pt_2d**.
     """
     osp = opt_model.optical_spec
     fod = osp.parax_data.fod
 
+    ray_cache = osp.ray_cache
+    key = (field_key(fld) + (wvl, foc) +
+           (None if image_pt_2d is None else tuple(image_pt_2d[:2]),))
+    cached = ray_cache.get('ref_sphere', key)
+    if cached is not None and cached[0] is chief_ray_pkg:
+        return cached[1]
+
     cr, cr_exp_seg = chief_ray_pkg
     # cr_exp_pt: E upper bar prime: pupil center for pencils from Q
     # cr_exp_pt, cr_b4_dir, cr_dst
@@ -118,10 +137,28 @@ def setup_exit_pupil_coords(opt_model, fld, wvl, foc,
     ref_dir = normalize(ref_sphere_vec)
 
     ref_sphere = (image_pt, ref_dir, ref_sphere_radius)
+    ray_cache.put('ref_sphere', key, (chief_ray_pkg, ref_sphere))
 
     return ref_sphere
 
 
+def chief_ray_image_pt_2d(opt_model, fld, wvl, foc):
+    """Return the x, y image point of the chief ray at **fld**.
+
+    Args:
+        opt_model: :class:`~.OpticalModel` instance
+        fld: :class:`~.Field` point for wave aberration calculation
+        wvl: wavelength of ray (nm)
+        foc: defocus amount
+
+    Returns:
+        image_pt_2d: chief ray intersection with the defocussed image plane
+    """
+    cr_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
+    ref_sphere = setup_exit_pupil_coords(opt_model, fld, wvl, foc, cr_pkg)
+    return ref_sphere[0][:2]
+
+
 def wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg, chief_ray_pkg, ref_sphere):
     """Given a ray, a chief ray and an image pt, evaluate the OPD.
 
@@ -223,6 +260,68 @@ def wave_abr_calc(fod, fld, wvl, foc, ray_pkg, chief_ray_pkg,
     return opd
 
 
+def wave_abr_pre_calc_many(fod, fld, wvl, foc, ray_bundle, chief_ray_pkg):
+    """Array version of :func:`wave_abr_pre_calc` for a RayBundle.
+
+    Returns:
+        (**pre_opd**, **p_coord**, **b4_pt**, **b4_dir**) arrays with a row
+        for each ray in **ray_bundle**. The pre_opd of rays that failed is NaN.
+    """
+    cr, cr_exp_seg = chief_ray_pkg
+    chief_ray, chief_ray_op, wvl = cr
+    cr_exp_pt, cr_exp_dir, cr_exp_dist, ifc, cr_b4_pt, cr_b4_dir = cr_exp_seg
+
+    pt, dir = ray_bundle.pt, ray_bundle.dir
+
+    k = -2  # last interface in sequence
+
+    # eq 3.12
+    e1 = eic_distance_many((pt[:, 1], dir[:, 0]),
+                           (chief_ray[1][mc.p], chief_ray[0][mc.d]))
+    # eq 3.13
+    ekp = eic_distance_many((pt[:, k], dir[:, k]),
+                            (chief_ray[k][mc.p], chief_ray[k][mc.d]))
+
+    pre_opd = (-abs(fod.n_obj)*e1 - ray_bundle.op + abs(fod.n_img)*ekp +
+               chief_ray_op)
+
+    b4_pt, b4_dir = transform_after_surface_many(ifc, (pt[:, k], dir[:, k]))
+    dst = ekp - cr_exp_dist
+    eic_exp_pt = b4_pt - dst[:, np.newaxis]*b4_dir
+    p_coord = eic_exp_pt - cr_exp_pt
+
+    return pre_opd, p_coord, b4_pt, b4_dir
+
+
+def wave_abr_calc_many(fod, fld, wvl, foc, chief_ray_pkg,
+                       pre_opd_pkg, ref_sphere):
+    """Array version of :func:`wave_abr_calc`, returns an array of OPDs."""
+    cr, cr_exp_seg = chief_ray_pkg
+    image_pt, ref_dir, ref_sphere_radius = ref_sphere
+    pre_opd, p_coord, b4_pt, b4_dir = pre_opd_pkg
+
+    F = (b4_dir.dot(ref_dir) -
+         np.einsum('ij,ij->i', b4_dir, p_coord)/ref_sphere_radius)
+    J = (np.einsum('ij,ij->i', p_coord, p_coord)/ref_sphere_radius -
+         2.0*p_coord.dot(ref_dir))
+
+    sign_soln = -1 if ref_dir[2]*cr.ray[-1][mc.d][2] < 0 else 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = F + sign_soln*np.sqrt(F**2 + J/ref_sphere_radius)
+        ep = np.where(denom == 0, 0., J/denom)
+
+    opd = pre_opd - abs(fod.n_img)*ep
+    return opd
+
+
+def transverse_abr_many(ray_bundle, foc, image_pt):
+    """Return the (N, 2) transverse aberrations of ray_bundle at focus foc."""
+    pt, dir = ray_bundle.pt[:, -1], ray_bundle.dir[:, -1]
+    dist = foc/dir[:, 2]
+    defocused_pt = pt - dist[:, np.newaxis]*dir
+    return (defocused_pt - image_pt)[:, :2]
+
+
 # --- Single ray
 class Ray():
     """A ray at the given field and wavelength.
@@ -259,6 +358,7 @@ class Ray():
 
         self.update_data()
 
+    @tracestats.timed
     def update_data(self, **kwargs):
         """Set the fan attribute to a list of (pupil coords), dx, dy, opd."""
         build = kwargs.pop('build', 'rebuild')
@@ -320,6 +420,7 @@ class RayFan():
         del attrs['fan_pkg']
         return attrs
 
+    @tracestats.timed
     def update_data(self, **kwargs):
         """Set the fan attribute to a list of (pupil coords), dx, dy, opd."""
         build = kwargs.get('build', 'rebuild')
@@ -356,60 +457,31 @@ def smooth_plot_data(f_x, f_y, num_points=100):
     return x_sample, y_fit
 
 
-def trace_ray_fan(opt_model, fan_rng, fld, wvl, foc, **kwargs):
-    """Trace a fan of rays, according to fan_rng. """
-    start = np.array(fan_rng[0])
+def fan_pupil_coords(fan_rng):
+    """Returns a (num, 2) array of the pupil coordinates for fan_rng."""
+    start = np.array(fan_rng[0], dtype=float)
     stop = fan_rng[1]
     num = fan_rng[2]
     step = (stop - start)/(num - 1)
-    fan = []
-    for r in range(num):
-        pupil = np.array(start)
-        ray_pkg = trace.trace_base(opt_model, pupil, fld, wvl, **kwargs)
-        fan.append([pupil[0], pupil[1], ray_pkg])
-        start += step
-    return fan
+    # accumulate the coordinates the same way as the ray by ray traces
+    steps = np.tile(step, (num, 1))
+    steps[0] = start
+    return np.cumsum(steps, axis=0)
+
+
+def trace_ray_fan(opt_model, fan_rng, fld, wvl, foc, **kwargs):
+    """Trace a fan of rays, according to fan_rng, and return a RayBundle."""
+    return trace.trace_bundle(opt_model, fan_pupil_coords(fan_rng), fld, wvl,
+                              pupil_filter=False, **kwargs)
 
 
 def eval_fan(opt_model, fld, wvl, foc, xy,
              image_pt_2d=None, num_rays=21):
     """Trace a fan of rays and evaluate dx, dy, & OPD across the fan."""
-    fod = opt_model.optical_spec.parax_data.fod
-    cr_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
-    ref_sphere = setup_exit_pupil_coords(opt_model, fld, wvl, foc, cr_pkg,
-                                         image_pt_2d=image_pt_2d)
-    fld.chief_ray = cr_pkg
-    fld.ref_sphere = ref_sphere
-
-    fan_start = np.array([0., 0.])
-    fan_stop = np.array([0., 0.])
-    fan_start[xy] = -1.0
-    fan_stop[xy] = 1.0
-    fan_def = [fan_start, fan_stop, num_rays]
-
-    fan = trace_ray_fan(opt_model, fan_def, fld, wvl, foc)
-
-    central_wvl = opt_model.optical_spec.spectral_region.central_wvl
-    convert_to_opd = 1/opt_model.nm_to_sys_units(central_wvl)
-
-    def rfc(fi):
-        pupil_x, pupil_y, ray_pkg = fi
-        if ray_pkg is not None:
-            image_pt = ref_sphere[0]
-            ray = ray_pkg[mc.ray]
-            dist = foc / ray[-1][mc.d][2]
-            defocused_pt = ray[-1][mc.p] - dist*ray[-1][mc.d]
-            t_abr = defocused_pt - image_pt
-
-            opdelta = wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg,
-                                         cr_pkg, ref_sphere)
-            opd = convert_to_opd*opdelta
-            return (pupil_x, pupil_y), (t_abr[0], t_abr[1], opd)
-        else:
-            return pupil_x, pupil_y, np.NaN
-    fan_data = [rfc(i) for i in fan]
-
-    return fan_data
+    fan_pkg = trace_fan(opt_model, fld, wvl, foc, xy,
+                        image_pt_2d=image_pt_2d, num_rays=num_rays)
+    return focus_fan(opt_model, fan_pkg, fld, wvl, foc,
+                     image_pt_2d=image_pt_2d)
 
 
 def trace_fan(opt_model, fld, wvl, foc, xy,
@@ -430,23 +502,18 @@ def trace_fan(opt_model, fld, wvl, foc, xy,
     fan_def = [fan_start, fan_stop, num_rays]
 
     fan = trace_ray_fan(opt_model, fan_def, fld, wvl, foc)
-
-    def wpc(fi):
-        pupil_x, pupil_y, ray_pkg = fi
-        if ray_pkg is not None:
-            pre_opd_pkg = wave_abr_pre_calc(fod, fld, wvl, foc,
-                                            ray_pkg, cr_pkg)
-            return pre_opd_pkg
-        else:
-            return None
-
-    upd_fan = [wpc(i) for i in fan]
+    upd_fan = wave_abr_pre_calc_many(fod, fld, wvl, foc, fan, cr_pkg)
 
     return fan, upd_fan
 
 
 def focus_fan(opt_model, fan_pkg, fld, wvl, foc, image_pt_2d=None):
-    """Refocus the fan of rays and return the tranverse abr. and OPD."""
+    """Refocus the fan of rays and return the tranverse abr. and OPD.
+
+    Returns:
+        a list of ((pupil_x, pupil_y), (dx, dy, opd)) for each ray in the fan.
+        The data of rays that failed is NaN.
+    """
     fod = opt_model.optical_spec.parax_data.fod
     fan, upd_fan = fan_pkg
     cr_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
@@ -455,23 +522,12 @@ def focus_fan(opt_model, fan_pkg, fld, wvl, foc, image_pt_2d=None):
     central_wvl = opt_model.optical_spec.spectral_region.central_wvl
     convert_to_opd = 1/opt_model.nm_to_sys_units(central_wvl)
 
-    def rfc(fi, fiu):
-        pupil_x, pupil_y, ray_pkg = fi
-        if ray_pkg is not None:
-            image_pt = ref_sphere[0]
-            ray = ray_pkg[mc.ray]
-            dist = foc / ray[-1][mc.d][2]
-            defocused_pt = ray[-1][mc.p] - dist*ray[-1][mc.d]
-            t_abr = defocused_pt - image_pt
-
-            opdelta = wave_abr_calc(fod, fld, wvl, foc,
-                                    ray_pkg, cr_pkg, fiu, ref_sphere)
-            opd = convert_to_opd*opdelta
-            return (pupil_x, pupil_y), (t_abr[0], t_abr[1], opd)
-        else:
-            return pupil_x, pupil_y, np.NaN
-    fan_data = [rfc(fi, fiu) for fi, fiu in zip(fan, upd_fan)]
-    return fan_data
+    t_abr = transverse_abr_many(fan, foc, ref_sphere[0])
+    opd = convert_to_opd*wave_abr_calc_many(fod, fld, wvl, foc, cr_pkg,
+                                            upd_fan, ref_sphere)
+    fan_data = np.column_stack([t_abr, opd])
+    fan_data[~fan.valid] = np.nan
+    return list(zip(fan.pupil, fan_data))
 
 
 # --- List of rays
@@ -482,7 +538,8 @@ class RayList():
         opt_model: :class:`~.OpticalModel` instance
         pupil_gen: (fct, args, kwargs), where:
 
-            - fct: a function returning a generator returning a 2d coordinate
+            - fct: a function returning an (N, 2) array or a generator of 2d
+              coordinates, e.g. from :mod:`~.sampler`
             - args: passed to fct
             - kwargs: passed to fct
 
@@ -511,7 +568,7 @@ class RayList():
                 grid_start = np.array([-1., -1.])
                 grid_stop = np.array([1., 1.])
                 grid_def = [grid_start, grid_stop, num_rays]
-                self.pupil_gen = (sampler.csd_grid_ray_generator,
+                self.pupil_gen = (sampler.csd_grid_samples,
                                   (grid_def,), {})
             fct, args, kwargs = self.pupil_gen
             self.pupil_coords = fct(*args, **kwargs)
@@ -533,6 +590,7 @@ class RayList():
         del attrs['ray_list']
         return attrs
 
+    @tracestats.timed
     def update_data(self, **kwargs):
         build = kwargs.get('build', 'rebuild')
         if build == 'rebuild':
@@ -557,18 +615,20 @@ class RayList():
 
 def trace_ray_list(opt_model, pupil_coords, fld, wvl, foc,
                    append_if_none=False, **kwargs):
-    """Trace a list of rays at fld and wvl and return ray_pkgs in a list."""
+    """Trace a list of rays at fld and wvl and return a RayBundle.
 
-    ray_list = []
-    for pupil in pupil_coords:
-        if (pupil[0]**2 + pupil[1]**2) < 1.0:
-            ray_pkg = trace.trace_base(opt_model, pupil, fld, wvl, **kwargs)
-            ray_list.append([pupil[0], pupil[1], ray_pkg])
-        else:  # ray outside pupil
-            if append_if_none:
-                ray_list.append([pupil[0], pupil[1], None])
-
-    return ray_list
+    Iterating over the returned :class:`~.raybundle.RayBundle` gives
+    ``[pupil_x, pupil_y, ray_pkg]`` for each ray. Rays outside the pupil,
+    or that fail to trace, have a ray_pkg of None; rays outside the pupil
+    are included only if **append_if_none** is True.
+    """
+    if not isinstance(pupil_coords, np.ndarray):
+        pupil_coords = list(pupil_coords)
+    pupil_coords = np.array(pupil_coords, dtype=float).reshape(-1, 2)
+    if not append_if_none:
+        inside = (pupil_coords[:, 0]**2 + pupil_coords[:, 1]**2) < 1.0
+        pupil_coords = pupil_coords[inside]
+    return trace.trace_bundle(opt_model, pupil_coords, fld, wvl, **kwargs)
 
 
 def trace_list_of_rays(opt_model, rays, output_filter=None, **kwargs):
@@ -595,12 +655,15 @@ def trace_list_of_rays(opt_model, rays, output_filter=None, **kwargs):
 
     Returns:
         A list with an entry for each ray in rays
+
+    For large numbers of rays, see :func:`trace_ray_stream`.
     """
     ray_list = []
     for ray in rays:
         pt0, dir0, wvl = ray
         try:
-            ray_pkg = trace.trace(opt_model, pt0, dir0, wvl, **kwargs)
+            ray_pkg = trace.trace(opt_model.seq_model, pt0, dir0, wvl,
+                                  **kwargs)
         except terr.TraceError:
             ray_list.append(None)
         else:
@@ -615,35 +678,128 @@ def trace_list_of_rays(opt_model, rays, output_filter=None, **kwargs):
     return ray_list
 
 
+def ray_chunks(rays, chunk_size):
+    """ generate (pts0, dirs0, wvls) arrays of at most **chunk_size** rays
+
+    **rays** is an iterable of (pt0, dir0, wvl) rays or of (pts0, dirs0,
+    wvls) arrays of rays, or a single tuple of arrays. Arrays, including
+    memory mapped ones, are sliced into chunks; single rays are collected
+    into chunks. **wvls** may be a scalar or an (N,) array.
+    """
+    if isinstance(rays, tuple) and len(rays) == 3 and np.ndim(rays[0]) == 2:
+        rays = [rays]
+
+    def stack(buf):
+        pts0, dirs0, wvls = zip(*buf)
+        return np.array(pts0, dtype=float), np.array(dirs0, dtype=float), \
+            np.array(wvls, dtype=float)
+
+    buf = []
+    for pt0, dir0, wvl in rays:
+        if np.ndim(pt0) == 2:
+            if len(buf) > 0:
+                yield stack(buf)
+                buf = []
+            wvls = np.broadcast_to(np.asarray(wvl, dtype=float), (len(pt0),))
+            for i in range(0, len(pt0), chunk_size):
+                yield (np.asarray(pt0[i:i+chunk_size], dtype=float),
+                       np.asarray(dir0[i:i+chunk_size], dtype=float),
+                       wvls[i:i+chunk_size])
+        else:
+            buf.append((pt0, dir0, wvl))
+            if len(buf) == chunk_size:
+                yield stack(buf)
+                buf = []
+    if len(buf) > 0:
+        yield stack(buf)
+
+
+def trace_chunk(seq_model, pts0, dirs0, wvls, **kwargs):
+    """ trace an array of rays in one or more wavelengths
+
+    The rays are grouped by wavelength and each group is traced with
+    :func:`~.raytrace.trace_batch`.
+
+    Returns:
+        :class:`~.raytrace.BatchRayPkg` of the rays, in the order given. If
+        there is more than one wavelength, **wvl** is the (N,) array
+        **wvls**.
+    """
+    wvl_set, inverse = np.unique(wvls, return_inverse=True)
+    if len(wvl_set) == 1:
+        return rt.trace_batch(seq_model, pts0, dirs0, float(wvl_set[0]),
+                              **kwargs)
+
+    chunk = None
+    for j, wvl in enumerate(wvl_set):
+        idx = np.flatnonzero(inverse == j)
+        grp = rt.trace_batch(seq_model, pts0[idx], dirs0[idx], float(wvl),
+                             **kwargs)
+        if chunk is None:
+            chunk = rt.BatchRayPkg(
+                *(np.empty((len(pts0),) + a.shape[1:], dtype=a.dtype)
+                  if isinstance(a, np.ndarray) else None for a in grp))
+        for a, a_grp in zip(chunk, grp):
+            if a is not None:
+                a[idx] = a_grp
+    return chunk._replace(wvl=np.asarray(wvls))
+
+
+def trace_ray_stream(opt_model, rays, chunk_size=4096, output_filter='last',
+                     **kwargs):
+    """Trace a stream of rays in chunks, yielding filtered results per chunk.
+
+    Unlike :func:`trace_list_of_rays`, the rays are traced in vectorized
+    chunks of at most **chunk_size** rays and only the filtered results are
+    kept, so arbitrarily many rays can be traced in bounded memory.
+
+    Args:
+        opt_model: :class:`~.OpticalModel` instance
+        rays: iterable of (pt0, dir0, wvl) or chunks of (pts0, dirs0, wvls),
+              see :func:`ray_chunks`. Chunks may mix wavelengths.
+        chunk_size: the maximum number of rays traced at once
+        output_filter: None, "last", or a callable. See below
+        **kwargs: keyword args passed to :func:`~.raytrace.trace_batch`
+
+    The output_filter keyword argument controls what is yielded per chunk.
+
+        - if None, the :class:`~.raytrace.BatchRayPkg` of the chunk
+        - if "last", the :class:`~.raytrace.BatchRayPkg` with the ray data
+          from the last interface only, i.e. pt, dir and nrml are (N, 3)
+          arrays and dst is an (N,) array
+        - if a callable, it must take the :class:`~.raytrace.BatchRayPkg` of
+          the chunk as an argument and return the desired data; None is not
+          yielded, so a callable may simply accumulate results, e.g. a
+          histogram of the image points
+
+    Failed rays are identified by the status array of the chunk.
+    """
+    seq_model = opt_model.seq_model
+    for pts0, dirs0, wvls in ray_chunks(rays, chunk_size):
+        chunk = trace_chunk(seq_model, pts0, dirs0, wvls, **kwargs)
+        if output_filter is None:
+            yield chunk
+        elif output_filter == 'last':
+            yield chunk._replace(pt=chunk.pt[:, -1], dir=chunk.dir[:, -1],
+                                 dst=chunk.dst[:, -1], nrml=chunk.nrml[:, -1])
+        else:
+            result = output_filter(chunk)
+            if result is not None:
+                yield result
+
+
 def eval_pupil_coords(opt_model, fld, wvl, foc,
                       image_pt_2d=None, num_rays=21):
     """Trace a list of rays and return the transverse abr."""
-    cr_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
-    ref_sphere = setup_exit_pupil_coords(opt_model, fld, wvl, foc, cr_pkg,
-                                         image_pt_2d=image_pt_2d)
-    fld.chief_ray = cr_pkg
-    fld.ref_sphere = ref_sphere
-
     grid_start = np.array([-1., -1.])
     grid_stop = np.array([1., 1.])
     grid_def = [grid_start, grid_stop, num_rays]
 
-    ray_list = trace_ray_list(opt_model, sampler.grid_ray_generator(grid_def),
-                              fld, wvl, foc)
-
-    def rfc(ri):
-        pupil_x, pupil_y, ray_pkg = ri
-        if ray_pkg is not None:
-            image_pt = ref_sphere[0]
-            ray = ray_pkg[mc.ray]
-            dist = foc / ray[-1][mc.d][2]
-            defocused_pt = ray[-1][mc.p] - dist*ray[-1][mc.d]
-            t_abr = defocused_pt - image_pt
-            return t_abr[0], t_abr[1]
-        else:
-            return np.NaN
-    ray_list_data = [rfc(ri) for ri in ray_list]
-    return np.array(ray_list_data)
+    ray_list = trace_pupil_coords(opt_model,
+                                  sampler.grid_samples(grid_def),
+                                  fld, wvl, foc, image_pt_2d=image_pt_2d)
+    return focus_pupil_coords(opt_model, ray_list, fld, wvl, foc,
+                              image_pt_2d=image_pt_2d)
 
 
 def trace_pupil_coords(opt_model, pupil_coords, fld, wvl, foc,
@@ -662,24 +818,16 @@ def trace_pupil_coords(opt_model, pupil_coords, fld, wvl, foc,
 
 
 def focus_pupil_coords(opt_model, ray_list, fld, wvl, foc, image_pt_2d=None):
-    """Given pre-traced rays and a ref. sphere, return the transverse abr."""
+    """Given pre-traced rays and a ref. sphere, return the transverse abr.
+
+    Returns:
+        an (N, 2) array of the transverse aberrations of the rays in
+        **ray_list**. The rows of rays that failed are NaN.
+    """
     cr_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
     ref_sphere = setup_exit_pupil_coords(opt_model, fld, wvl, foc, cr_pkg,
                                          image_pt_2d=image_pt_2d)
-
-    def rfc(ri):
-        pupil_x, pupil_y, ray_pkg = ri
-        if ray_pkg is not None:
-            image_pt = ref_sphere[0]
-            ray = ray_pkg[mc.ray]
-            dist = foc / ray[-1][mc.d][2]
-            defocused_pt = ray[-1][mc.p] - dist*ray[-1][mc.d]
-            t_abr = defocused_pt - image_pt
-            return t_abr[0], t_abr[1]
-        else:
-            return np.NaN
-    ray_list_data = [rfc(ri) for ri in ray_list]
-    return np.array(ray_list_data)
+    return transverse_abr_many(ray_list, foc, ref_sphere[0])
 
 
 # --- Square grid of rays
@@ -717,6 +865,7 @@ class RayGrid():
         del attrs['grid_pkg']
         return attrs
 
+    @tracestats.timed
     def update_data(self, **kwargs):
         build = kwargs.get('build', 'rebuild')
         if build == 'rebuild':
@@ -734,67 +883,40 @@ class RayGrid():
         return self
 
 
-def trace_ray_grid(opt_model, grid_rng, fld, wvl, foc, append_if_none=True,
-                   **kwargs):
-    """Trace a grid of rays at fld and wvl and return ray_pkgs in 2d list."""
-    start = np.array(grid_rng[0])
-    stop = grid_rng[1]
+def grid_pupil_coords(grid_rng):
+    """Returns a (num, num, 2) array of the pupil coordinates for grid_rng."""
     num = grid_rng[2]
-    step = np.array((stop - start)/(num - 1))
-    grid = []
-    for i in range(num):
-        grid_row = []
-
-        for j in range(num):
-            pupil = np.array(start)
-            if (pupil[0]**2 + pupil[1]**2) < 1.0:
-                ray_pkg = trace.trace_base(opt_model, pupil, fld, wvl,
-                                           **kwargs)
-                grid_row.append([pupil[0], pupil[1], ray_pkg])
-            else:  # ray outside pupil
-                if append_if_none:
-                    grid_row.append([pupil[0], pupil[1], None])
+    return sampler.grid_samples(grid_rng).reshape(num, num, 2)
 
-            start[1] += step[1]
 
-        grid.append(grid_row)
-        start[0] += step[0]
-        start[1] = grid_rng[0][1]
+def trace_ray_grid(opt_model, grid_rng, fld, wvl, foc, append_if_none=True,
+                   **kwargs):
+    """Trace a grid of rays at fld and wvl and return a grid RayBundle.
 
-    return grid
+    Indexing the returned :class:`~.raybundle.RayBundle` with i gives row i
+    of the grid; each row gives ``[pupil_x, pupil_y, ray_pkg]`` for its
+    rays. If **append_if_none** is False, a list of row bundles excluding
+    the rays outside the pupil and the rays that failed is returned instead.
+    """
+    coords = grid_pupil_coords(grid_rng)
+    num = grid_rng[2]
+    grid = trace.trace_bundle(opt_model, coords.reshape(-1, 2), fld, wvl,
+                              shape=(num, num), **kwargs)
+    if append_if_none:
+        return grid
+    valid = grid.valid.reshape(num, num)
+    return [grid.take(i*num + np.flatnonzero(valid[i]))
+            for i in range(num)]
 
 
 def eval_wavefront(opt_model, fld, wvl, foc,
                    image_pt_2d=None, num_rays=21, value_if_none=np.NaN):
     """Trace a grid of rays and evaluate the OPD across the wavefront."""
-    fod = opt_model.optical_spec.parax_data.fod
-    cr_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
-    ref_sphere = setup_exit_pupil_coords(opt_model, fld, wvl, foc, cr_pkg,
-                                         image_pt_2d=image_pt_2d)
-    fld.chief_ray = cr_pkg
-    fld.ref_sphere = ref_sphere
-
-    grid_start = np.array([-1., -1.])
-    grid_stop = np.array([1., 1.])
-    grid_def = [grid_start, grid_stop, num_rays]
-
-    grid = trace_ray_grid(opt_model, grid_def, fld, wvl, foc)
-
-    central_wvl = opt_model.optical_spec.spectral_region.central_wvl
-    convert_to_opd = 1/opt_model.nm_to_sys_units(central_wvl)
-
-    def rfc(gij):
-        pupil_x, pupil_y, ray_pkg = gij
-        if ray_pkg is not None:
-            opdelta = wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg,
-                                         cr_pkg, ref_sphere)
-            opd = convert_to_opd*opdelta
-            return pupil_x, pupil_y, opd
-        else:
-            return pupil_x, pupil_y, value_if_none
-    opd_grid = [[rfc(j) for j in i] for i in grid]
-
-    return np.array(opd_grid)
+    grid_pkg = trace_wavefront(opt_model, fld, wvl, foc,
+                               image_pt_2d=image_pt_2d, num_rays=num_rays)
+    return focus_wavefront(opt_model, grid_pkg, fld, wvl, foc,
+                           image_pt_2d=image_pt_2d,
+                           value_if_none=value_if_none)
 
 
 def trace_wavefront(opt_model, fld, wvl, foc,
@@ -812,23 +934,18 @@ def trace_wavefront(opt_model, fld, wvl, foc,
     grid_def = [grid_start, grid_stop, num_rays]
 
     grid = trace_ray_grid(opt_model, grid_def, fld, wvl, foc)
-
-    def wpc(gij):
-        pupil_x, pupil_y, ray_pkg = gij
-        if ray_pkg is not None:
-            pre_opd_pkg = wave_abr_pre_calc(fod, fld, wvl, foc,
-                                            ray_pkg, cr_pkg)
-            return pre_opd_pkg
-        else:
-            return None
-    upd_grid = [[wpc(j) for j in i] for i in grid]
+    upd_grid = wave_abr_pre_calc_many(fod, fld, wvl, foc, grid, cr_pkg)
 
     return grid, upd_grid
 
 
 def focus_wavefront(opt_model, grid_pkg, fld, wvl, foc, image_pt_2d=None,
                     value_if_none=np.NaN):
-    """Given pre-traced rays and a ref. sphere, return the ray's OPD."""
+    """Given pre-traced rays and a ref. sphere, return the ray's OPD.
+
+    Returns:
+        a (num_rays, num_rays, 3) array of pupil_x, pupil_y and OPD
+    """
     fod = opt_model.optical_spec.parax_data.fod
     grid, upd_grid = grid_pkg
     cr_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
@@ -837,19 +954,12 @@ def focus_wavefront(opt_model, grid_pkg, fld, wvl, foc, image_pt_2d=None,
     central_wvl = opt_model.optical_spec.spectral_region.central_wvl
     convert_to_opd = 1/opt_model.nm_to_sys_units(central_wvl)
 
-    def rfc(gij, uij):
-        pupil_x, pupil_y, ray_pkg = gij
-        if ray_pkg is not None:
-            opdelta = wave_abr_calc(fod, fld, wvl, foc,
-                                    ray_pkg, cr_pkg, uij, ref_sphere)
-            opd = convert_to_opd*opdelta
-            return pupil_x, pupil_y, opd
-        else:
-            return pupil_x, pupil_y, value_if_none
-    refocused_grid = [[rfc(jg, ju) for jg, ju in zip(ig, iu)]
-                      for ig, iu in zip(grid, upd_grid)]
+    opd = convert_to_opd*wave_abr_calc_many(fod, fld, wvl, foc, cr_pkg,
+                                            upd_grid, ref_sphere)
+    opd[~grid.valid] = value_if_none
+    refocused_grid = np.column_stack([grid.pupil, opd])
 
-    return np.array(refocused_grid)
+    return refocused_grid.reshape(grid.shape + (3,))
 
 
 # --- PSF calculation
@@ -902,7 +1012,88 @@ def calc_psf_scaling(pupil_grid, ndim, maxdim):
     return delta_x, delta_xp
 
 
-def calc_psf(wavefront, ndim, maxdim):
+class PSFEngine():
+    """FFT based PSF calculation for a fixed size sampling grid.
+
+    The pupil function work buffer is allocated once and reused for each PSF
+    calculated with the same **maxdim**. The FFT is done with :mod:`scipy.fft`,
+    which caches the FFT plans for repeated transforms of the same size.
+
+    Attributes:
+        maxdim: The total width of the sampling grid
+    """
+
+    def __init__(self, maxdim):
+        self.maxdim = maxdim
+        self.pupil_fct = np.zeros((maxdim, maxdim), dtype=complex)
+
+    def pupil_function(self, wavefront, ndim, apodization=None):
+        """Fill the work buffer with the pupil function of **wavefront**.
+
+        Args:
+            wavefront: ndim x ndim Numpy array of wavefront errors, in waves.
+                       No data condition is indicated by nan
+            ndim: The sampling across the wavefront
+            apodization: an ndim x ndim array of amplitudes or a function
+                         of the normalized pupil coordinates (x, y)
+
+        Returns: the maxdim x maxdim pupil function work buffer
+        """
+        wavefront = np.asarray(wavefront)
+        aperture = np.isfinite(wavefront)
+        amplitude = aperture.astype(float)
+        if apodization is not None:
+            if callable(apodization):
+                x, y = np.meshgrid(np.linspace(-1., 1., ndim),
+                                   np.linspace(-1., 1., ndim),
+                                   indexing='ij')
+                apodization = apodization(x, y)
+            amplitude *= apodization
+
+        start = self.maxdim//2 - (ndim - 1)//2
+        pupil_slice = slice(start, start + ndim)
+        pupil_fct = self.pupil_fct
+        pupil_fct.fill(0.)
+        pupil_fct[pupil_slice, pupil_slice] = (
+            amplitude*np.exp(1j*2*np.pi*np.where(aperture, wavefront, 0.)))
+        return pupil_fct
+
+    def calc_psf(self, wavefront, ndim, apodization=None):
+        """Calculate the point spread function of wavefront W.
+
+        Args:
+            wavefront: ndim x ndim Numpy array of wavefront errors, in waves.
+                       No data condition is indicated by nan
+            ndim: The sampling across the wavefront
+            apodization: an ndim x ndim array of amplitudes or a function
+                         of the normalized pupil coordinates (x, y)
+
+        Returns: AP, the PSF of the input wavefront, normalized to a peak of 1
+        """
+        pupil_fct = self.pupil_function(wavefront, ndim,
+                                        apodization=apodization)
+        # the buffer is refilled on every call, so let the FFT reuse it
+        amp = scipy.fft.fft2(pupil_fct, overwrite_x=True)
+        AP = fftshift(amp.real**2 + amp.imag**2)
+        AP_max = np.nanmax(AP)
+        AP = AP/AP_max
+        return AP
+
+
+_psf_engines = threading.local()
+
+
+def get_psf_engine(maxdim):
+    """Return the calling thread's :class:`PSFEngine` for **maxdim**."""
+    engines = _psf_engines.__dict__.setdefault('engines', {})
+    try:
+        return engines[maxdim]
+    except KeyError:
+        engine = engines[maxdim] = PSFEngine(maxdim)
+        return engine
+
+
+def calc_psf(wavefront, ndim, maxdim, apodization=None):
     """Calculate the point spread function of wavefront W.
 
     Args:
@@ -910,31 +1101,248 @@ def calc_psf(wavefront, ndim, maxdim):
                    condition is indicated by nan
         ndim: The sampling across the wavefront
         maxdim: The total width of the sampling grid
+        apodization: an ndim x ndim array of amplitudes or a function
+                     of the normalized pupil coordinates (x, y)
 
     Returns: AP, the PSF of the input wavefront
     """
-    maxdim_by_2 = maxdim//2
-    W = np.zeros([maxdim, maxdim])
-    nd2 = ndim//2
-    W[maxdim_by_2-(nd2-1):maxdim_by_2+(nd2+1),
-      maxdim_by_2-(nd2-1):maxdim_by_2+(nd2+1)] = np.nan_to_num(wavefront)
-
-    phase = np.exp(1j*2*np.pi*W)
-
-    for i in range(len(phase)):
-        for j in range(len(phase)):
-            if phase[i][j] == 1:
-                phase[i][j] = 0
-
-    AP = abs(fftshift(fft2(fftshift(phase))))**2
-    AP_max = np.nanmax(AP)
-    AP = AP/AP_max
-    return AP
+    return get_psf_engine(maxdim).calc_psf(wavefront, ndim,
+                                           apodization=apodization)
+
+
+@tracestats.timed
+def calc_polychromatic_psf(opt_model, fld, ndim, maxdim, foc=None,
+                           image_pt_2d=None, apodization=None):
+    """Calculate the PSF as a weighted sum over the model's wavelengths.
+
+    Each monochromatic PSF is resampled to the image plane sampling of the
+    central wavelength and normalized to unit energy before it is weighted
+    by the spectral weight of its wavelength. The wavefronts are referenced
+    to the central wavelength chief ray image point, unless **image_pt_2d**
+    is given, so that lateral color shifts the monochromatic PSFs.
+
+    Args:
+        opt_model: :class:`~.OpticalModel` instance
+        fld: index into :class:`~.FieldSpec` or a :class:`~.Field` instance
+        ndim: The sampling across the wavefront
+        maxdim: The total width of the sampling grid
+        foc: focus shift to apply to the results
+        image_pt_2d: image offset to apply to the results
+        apodization: an ndim x ndim array of amplitudes or a function
+                     of the normalized pupil coordinates (x, y)
 
+    Returns:
+        (**AP**, **delta_xp**)
+
+        - **AP** - the polychromatic PSF, normalized to a peak of 1
+        - **delta_xp** - the image plane grid spacing of **AP**
+    """
+    osp = opt_model.optical_spec
+    wvls = osp.spectral_region
+    central_wvl = wvls.central_wvl
+    engine = get_psf_engine(maxdim)
+
+    fld = osp.field_of_view.fields[fld] if isinstance(fld, int) else fld
+    foc = osp.defocus.focus_shift if foc is None else foc
+    if image_pt_2d is None:
+        image_pt_2d = chief_ray_image_pt_2d(opt_model, fld, central_wvl, foc)
+    ref_grid = RayGrid(opt_model, f=fld, wl=central_wvl, foc=foc,
+                       image_pt_2d=image_pt_2d, num_rays=ndim)
+    delta_x, ref_delta_xp = calc_psf_scaling(ref_grid, ndim, maxdim)
+
+    # sample coordinates of the central wavelength image plane grid
+    ref_coords = (np.arange(maxdim) - maxdim//2)*ref_delta_xp
+
+    AP = np.zeros((maxdim, maxdim))
+    for wvl, wt in zip(wvls.wavelengths, wvls.spectral_wts):
+        if wvl == central_wvl:
+            pupil_grid = ref_grid
+        else:
+            pupil_grid = RayGrid(opt_model, f=fld, wl=wvl, foc=foc,
+                                 image_pt_2d=image_pt_2d, num_rays=ndim)
+        # the wavefront grid is in waves at the central wavelength
+        wavefront = pupil_grid.grid[2]*(central_wvl/wvl)
+        psf = engine.calc_psf(wavefront, ndim, apodization=apodization)
 
-def update_psf_data(pupil_grid, build='rebuild'):
+        delta_x, delta_xp = calc_psf_scaling(pupil_grid, ndim, maxdim)
+        u = ref_coords/delta_xp + maxdim//2
+        ui, uj = np.meshgrid(u, u, indexing='ij')
+        psf = ndimage.map_coordinates(psf, [ui, uj], order=1, cval=0.)
+        AP += wt*psf/psf.sum()
+
+    AP = AP/np.nanmax(AP)
+    return AP, ref_delta_xp
+
+
+def update_psf_data(pupil_grid, build='rebuild', apodization=None):
     pupil_grid.update_data(build=build)
     ndim = pupil_grid.num_rays
     maxdim = pupil_grid.maxdim
-    AP = calc_psf(pupil_grid.grid[2], ndim, maxdim)
+    AP = calc_psf(pupil_grid.grid[2], ndim, maxdim, apodization=apodization)
     return AP
+
+
+# --- MTF calculation
+def calc_otf(wavefront, ndim, maxdim, apodization=None):
+    """Calculate the optical transfer function of wavefront W.
+
+    The OTF is the autocorrelation of the pupil function, computed as the
+    Fourier transform of the PSF.
+
+    Args:
+        wavefront: ndim x ndim Numpy array of wavefront errors, in waves.
+                   No data condition is indicated by nan
+        ndim: The sampling across the wavefront
+        maxdim: The total width of the sampling grid
+        apodization: an ndim x ndim array of amplitudes or a function
+                     of the normalized pupil coordinates (x, y)
+
+    Returns: the complex OTF, normalized to 1 at zero frequency and shifted
+             so that zero frequency is at index maxdim//2
+    """
+    engine = get_psf_engine(maxdim)
+    pupil_fct = engine.pupil_function(wavefront, ndim,
+                                      apodization=apodization)
+    amp = scipy.fft.fft2(pupil_fct, overwrite_x=True)
+    otf = scipy.fft.fft2(amp.real**2 + amp.imag**2)
+    otf /= otf[0, 0]
+    return fftshift(otf)
+
+
+def calc_mtf_scaling(pupil_grid, ndim, maxdim):
+    """Return the spatial frequency spacing of the OTF of **pupil_grid**."""
+    delta_x, delta_xp = calc_psf_scaling(pupil_grid, ndim, maxdim)
+    return 1/(maxdim*delta_xp)
+
+
+class MTF():
+    """Tangential and sagittal MTF of a field point.
+
+    The wavefront is traced once per wavelength with a :class:`~.RayGrid`.
+    Changes to **foc** and **image_pt_2d** are applied with the fast refocus
+    of :func:`~.focus_wavefront`, so through focus calculations don't
+    retrace the rays.
+
+    Attributes:
+        opt_model: :class:`~.OpticalModel` instance
+        f: index into :class:`~.FieldSpec` or a :class:`~.Field` instance
+        wl: wavelength (nm) of the MTF, or central wavelength if None
+        foc: focus shift to apply to the results
+        image_pt_2d: image offset to apply to the results, defaults to the
+                     chief ray image point
+        num_rays: number of samples along the side of the pupil grid
+        maxdim: the size of the sampling array
+        polychromatic: if True, the MTF is the weighted sum over the
+                       wavelengths of the spectral region, and wl is ignored
+        apodization: an array of pupil amplitudes or a function of the
+                     normalized pupil coordinates (x, y)
+        freq: spatial frequencies of the MTF, in cycles per system unit
+        mtf_t: tangential (y) MTF at **freq**
+        mtf_s: sagittal (x) MTF at **freq**
+    """
+
+    def __init__(self, opt_model, f=0, wl=None, foc=None, image_pt_2d=None,
+                 num_rays=32, maxdim=256, polychromatic=False,
+                 apodization=None):
+        self.opt_model = opt_model
+        osp = opt_model.optical_spec
+        self.fld = osp.field_of_view.fields[f] if isinstance(f, int) else f
+        self.wvl = osp.spectral_region.central_wvl if wl is None else wl
+        self.foc = osp.defocus.focus_shift if foc is None else foc
+        self.image_pt_2d = image_pt_2d
+
+        self.num_rays = num_rays
+        self.maxdim = maxdim
+        self.polychromatic = polychromatic
+        self.apodization = apodization
+
+        self.update_data()
+
+    def __json_encode__(self):
+        attrs = dict(vars(self))
+        del attrs['opt_model']
+        del attrs['pupil_grids']
+        return attrs
+
+    @tracestats.timed
+    def update_data(self, **kwargs):
+        build = kwargs.get('build', 'rebuild')
+        wvls = self.opt_model.optical_spec.spectral_region
+        if self.polychromatic:
+            wvl_wts = list(zip(wvls.wavelengths, wvls.spectral_wts))
+            # the central wavelength sets the frequency sampling
+            wvl_wts.sort(key=lambda ww: ww[0] != wvls.central_wvl)
+        else:
+            wvl_wts = [(self.wvl, 1.0)]
+
+        if build == 'rebuild':
+            image_pt_2d = self.image_pt_2d
+            if image_pt_2d is None:
+                # reference all wavelengths to the chief ray image point
+                image_pt_2d = chief_ray_image_pt_2d(self.opt_model, self.fld,
+                                                    wvl_wts[0][0], self.foc)
+            self.pupil_grids = [RayGrid(self.opt_model, f=self.fld, wl=wvl,
+                                        foc=self.foc, image_pt_2d=image_pt_2d,
+                                        num_rays=self.num_rays)
+                                for wvl, wt in wvl_wts]
+        else:
+            for grid in self.pupil_grids:
+                grid.foc = self.foc
+                if self.image_pt_2d is not None:
+                    grid.image_pt_2d = self.image_pt_2d
+                grid.update_data(build=build)
+
+        ndim = self.num_rays
+        maxdim = self.maxdim
+        k = np.arange(maxdim - maxdim//2)
+        c = maxdim//2
+        otf_t = np.zeros(len(k), dtype=complex)
+        otf_s = np.zeros(len(k), dtype=complex)
+        sum_wts = 0.
+        for grid, (wvl, wt) in zip(self.pupil_grids, wvl_wts):
+            # the wavefront grid is in waves at the central wavelength
+            wavefront = grid.grid[2]*(wvls.central_wvl/wvl)
+            otf = calc_otf(wavefront, ndim, maxdim,
+                           apodization=self.apodization)
+            delta_f = calc_mtf_scaling(grid, ndim, maxdim)
+            if sum_wts == 0.:
+                self.freq = k*delta_f
+            f = k*delta_f
+            otf_t += wt*(np.interp(self.freq, f, otf[c, c:].real, right=0.) +
+                         1j*np.interp(self.freq, f, otf[c, c:].imag, right=0.))
+            otf_s += wt*(np.interp(self.freq, f, otf[c:, c].real, right=0.) +
+                         1j*np.interp(self.freq, f, otf[c:, c].imag, right=0.))
+            sum_wts += wt
+
+        self.mtf_t = np.abs(otf_t/sum_wts)
+        self.mtf_s = np.abs(otf_s/sum_wts)
+
+        return self
+
+    def through_focus(self, focus_shifts, freq):
+        """Return the MTF at spatial frequency **freq** for **focus_shifts**.
+
+        The rays are not retraced; the wavefront is refocused for each
+        focus shift.
+
+        Returns:
+            (**mtf_t**, **mtf_s**) arrays with a row for each focus shift
+        """
+        foc = self.foc
+        mtf_t = []
+        mtf_s = []
+        for focus_shift in focus_shifts:
+            self.foc = focus_shift
+            self.update_data(build='refocus')
+            mtf_t.append(np.interp(freq, self.freq, self.mtf_t))
+            mtf_s.append(np.interp(freq, self.freq, self.mtf_s))
+
+        self.foc = foc
+        self.update_data(build='refocus')
+        return np.array(mtf_t), np.array(mtf_s)
+
+
+def eval_field_mtfs(opt_model, **kwargs):
+    """Return a list of :class:`~.MTF` for every field of the model."""
+    num_flds = len(opt_model.optical_spec.field_of_view.fields)
+    return [MTF(opt_model, f=fi, **kwargs) for fi in range(num_flds)]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Run independent analysis jobs in parallel
+
+The analyses for different fields, wavelengths and focus positions don't
+depend on each other. The :class:`AnalysisExecutor` fans a list of jobs out
+across a process or thread pool and returns the results in job order.
+
+A job function is called as ``fct(opt_model, *job)``. Each worker, process
+or thread, receives its own snapshot of the optical model, because the
+analyses store intermediate results, e.g. the chief ray and reference sphere
+of a field, on the model. Changes made to the model by the job function are
+not returned to the caller. When processes are used, the job function must
+be picklable, i.e. defined at module level.
+
+Using the executor as a context manager keeps one pool for all of the
+map() calls inside the block, e.g. for iterative calculations. The workers
+then keep the snapshot taken when the block is entered.
+
+.. codeauthor: Michael J. Hayford
+"""
+
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# the model snapshot used by the jobs in a worker process or thread
+_worker = threading.local()
+
+
+def _init_worker(snapshot):
+    _worker.model = pickle.loads(snapshot)
+
+
+def _run_job(fct, job):
+    return fct(_worker.model, *job)
+
+
+def fld_wvl_jobs(opt_model, wvls=True, fr=0.0):
+    """ returns a list of (fi, wi, fr) jobs for the fields and wavelengths
+
+    Args:
+        opt_model: the optical model
+        wvls: if True, a job for each wavelength, otherwise only a job for
+              the central wavelength (wi is None)
+        fr: focus range parameter, -1.0 to 1.0
+
+    The jobs are suitable arguments for
+    :meth:`~.opticalspec.OpticalSpecs.lookup_fld_wvl_focus`.
+    """
+    osp = opt_model.optical_spec
+    num_flds = len(osp.field_of_view.fields)
+    if wvls:
+        num_wvls = len(osp.spectral_region.wavelengths)
+        return [(fi, wi, fr) for fi in range(num_flds)
+                for wi in range(num_wvls)]
+    else:
+        return [(fi, None, fr) for fi in range(num_flds)]
+
+
+class AnalysisExecutor:
+    """ Evaluate independent analysis jobs on a pool of workers
+
+    Attributes:
+        opt_model: the optical model the jobs are evaluated on
+        max_workers: number of workers, defaults to the number of cpus. If 1,
+                     the jobs are evaluated serially in the calling process
+        use_threads: if True, use a thread pool, otherwise a process pool.
+                     Either way each worker has its own model snapshot.
+    """
+
+    def __init__(self, opt_model, max_workers=None, use_threads=False):
+        self.opt_model = opt_model
+        self.max_workers = (os.cpu_count() if max_workers is None
+                            else max_workers)
+        self.use_threads = use_threads
+        self._pool = None
+
+    def _make_pool(self, num_workers):
+        snapshot = pickle.dumps(self.opt_model)
+        pool_type = (ThreadPoolExecutor if self.use_threads
+                     else ProcessPoolExecutor)
+        return pool_type(max_workers=num_workers, initializer=_init_worker,
+                         initargs=(snapshot,))
+
+    def __enter__(self):
+        if self.max_workers > 1:
+            self._pool = self._make_pool(self.max_workers)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def map(self, fct, jobs):
+        """ evaluate ``fct(opt_model, *job)`` for each job in **jobs**
+
+        Returns:
+            a list of the job results, in the same order as **jobs**
+        """
+        jobs = list(jobs)
+        num_workers = min(self.max_workers, len(jobs))
+        if num_workers <= 1:
+            return [fct(self.opt_model, *job) for job in jobs]
+
+        if self._pool is not None:
+            futures = [self._pool.submit(_run_job, fct, job) for job in jobs]
+            return [f.result() for f in futures]
+        else:
+            # the snapshot is taken for each map() call so that the workers
+            #  see the current state of the model
+            with self._make_pool(num_workers) as pool:
+                futures = [pool.submit(_run_job, fct, job) for job in jobs]
+                return [f.result() for f in futures]
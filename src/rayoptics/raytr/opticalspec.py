@@ -12,7 +12,8 @@ import math
 import numpy as np
 
 from rayoptics.parax.firstorder import compute_first_order, list_parax_trace
-from rayoptics.raytr.trace import aim_chief_ray
+from rayoptics.raytr.trace import aim_chief_rays
+from rayoptics.raytr.raycache import RayCache
 from rayoptics.optical import model_enums
 import rayoptics.optical.model_constants as mc
 from opticalglass.spectral_lines import get_wavelength
@@ -35,9 +36,14 @@ class OpticalSpecs:
         field_of_view: instance of :class:`~.FieldSpec`
         defocus: instance of :class:`~.FocusRange`
         parax_data: tuple of :obj:`~.firstorder.ParaxData`
+        ray_cache: :class:`~.raycache.RayCache` of chief rays, aim points and
+                   reference spheres
+        clip_apertures: if True, the ray bundles of the analyses are
+                        clipped by the clear apertures of the surfaces
     """
 
     do_aiming_default = True
+    clip_apertures_default = False
 
     def __init__(self, opt_model, specsheet=None, **kwargs):
         self.opt_model = opt_model
@@ -47,6 +53,8 @@ class OpticalSpecs:
         self.defocus = FocusRange(0.0)
         self.parax_data = None
         self.do_aiming = OpticalSpecs.do_aiming_default
+        self.clip_apertures = OpticalSpecs.clip_apertures_default
+        self.ray_cache = RayCache()
         if specsheet:
             self.set_from_specsheet(specsheet)
 
@@ -55,6 +63,8 @@ class OpticalSpecs:
         del attrs['opt_model']
         del attrs['parax_data']
         del attrs['do_aiming']
+        del attrs['clip_apertures']
+        del attrs['ray_cache']
         return attrs
 
     def set_from_list(self, dl):
@@ -74,6 +84,9 @@ class OpticalSpecs:
             self.defocus = FocusRange(0.0)
         if not hasattr(self, 'do_aiming'):
             self.do_aiming = OpticalSpecs.do_aiming_default
+        if not hasattr(self, 'clip_apertures'):
+            self.clip_apertures = OpticalSpecs.clip_apertures_default
+        self.ray_cache = RayCache()
 
         self.spectral_region.sync_to_restore(self)
         self.pupil.sync_to_restore(self)
@@ -86,10 +99,12 @@ class OpticalSpecs:
         stop = self.opt_model.seq_model.stop_surface
         wvl = self.spectral_region.central_wvl
 
+        self.ray_cache.invalidate(keep=('aim_pt',))
         self.parax_data = compute_first_order(self.opt_model, stop, wvl)
         if self.do_aiming and self.opt_model.seq_model.get_num_surfaces() > 2:
-            for i, fld in enumerate(self.field_of_view.fields):
-                aim_pt = aim_chief_ray(self.opt_model, fld, wvl)
+            fields = self.field_of_view.fields
+            aim_pts = aim_chief_rays(self.opt_model, fields, wvl)
+            for fld, aim_pt in zip(fields, aim_pts):
                 fld.aim_pt = aim_pt
 
     def lookup_fld_wvl_focus(self, fi, wl=None, fr=0.0):
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Structure-of-arrays container for a traced set of rays
+
+A :class:`RayBundle` holds the results of tracing many rays in a few
+contiguous arrays instead of a list of ray lists. Indexing or iterating
+over a bundle gives the familiar ``[pupil_x, pupil_y, ray_pkg]`` entries,
+where ray_pkg is a :class:`~.trace.RayPkg` whose segments are views into
+the bundle's arrays, or None if the ray wasn't traced successfully.
+
+.. codeauthor: Michael J. Hayford
+"""
+
+import numpy as np
+
+from rayoptics.raytr import trace
+from rayoptics.raytr import traceerror as terr
+
+
+class RayBundle:
+    """ Container for a set of rays traced at a single wavelength
+
+    The ray data arrays have a leading ray dimension of length N. A bundle
+    may have a **shape** other than (N,), e.g. (num_rays, num_rays) for a
+    square grid; indexing a grid bundle with a single integer gives a row.
+
+    Attributes:
+        pupil: (N, 2) array of relative pupil coordinates of the rays
+        pt: (N, num_ifcs, 3) array of intersection points
+        dir: (N, num_ifcs, 3) array of direction cosines after each interface
+        dst: (N, num_ifcs) array of distances to the next interface
+        nrml: (N, num_ifcs, 3) array of surface normals
+        op: (N,) array of optical path lengths
+        wvl: wavelength (in nm) that the rays were traced in
+        status: (N,) array of status codes, see :mod:`~.traceerror`
+        fail_surf: (N,) array of the failing interface index, -1 if the ray
+                   traced successfully
+        shape: logical shape of the bundle
+    """
+
+    def __init__(self, pupil, pt, dir, dst, nrml, op, wvl,
+                 status=None, fail_surf=None, shape=None):
+        self.pupil = pupil
+        self.pt = pt
+        self.dir = dir
+        self.dst = dst
+        self.nrml = nrml
+        self.op = op
+        self.wvl = wvl
+        num_rays = len(pt)
+        self.status = (np.full(num_rays, terr.TRACE_OK) if status is None
+                       else status)
+        self.fail_surf = (np.full(num_rays, -1) if fail_surf is None
+                          else fail_surf)
+        self.shape = (num_rays,) if shape is None else tuple(shape)
+
+    @classmethod
+    def from_batch(cls, ray_pkg, pupil, shape=None):
+        """ create a RayBundle from a :class:`~.raytrace.BatchRayPkg` """
+        return cls(pupil, ray_pkg.pt, ray_pkg.dir, ray_pkg.dst, ray_pkg.nrml,
+                   ray_pkg.op, ray_pkg.wvl, status=ray_pkg.status,
+                   fail_surf=ray_pkg.fail_surf, shape=shape)
+
+    @property
+    def valid(self):
+        """ (N,) boolean mask of the rays that traced successfully """
+        return self.status == terr.TRACE_OK
+
+    @property
+    def num_rays(self):
+        return len(self.pt)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, key):
+        if len(self.shape) > 1:
+            # return a row of the grid as a bundle of views
+            row_len = int(np.prod(self.shape[1:]))
+            rows = slice(key*row_len, (key + 1)*row_len)
+            return RayBundle(self.pupil[rows], self.pt[rows],
+                             self.dir[rows], self.dst[rows],
+                             self.nrml[rows], self.op[rows], self.wvl,
+                             status=self.status[rows],
+                             fail_surf=self.fail_surf[rows],
+                             shape=self.shape[1:])
+        pupil_x, pupil_y = self.pupil[key]
+        return [pupil_x, pupil_y, self.ray_pkg(key)]
+
+    def take(self, indices):
+        """ returns a 1d RayBundle of the rays at **indices** """
+        return RayBundle(self.pupil[indices], self.pt[indices],
+                         self.dir[indices], self.dst[indices],
+                         self.nrml[indices], self.op[indices], self.wvl,
+                         status=self.status[indices],
+                         fail_surf=self.fail_surf[indices])
+
+    def ray_pkg(self, i):
+        """ returns a :class:`~.trace.RayPkg` for ray **i** or None
+
+        The ray segments are :class:`~.trace.RaySeg` tuples of views into
+        the bundle's arrays.
+        """
+        if self.status[i] != terr.TRACE_OK:
+            return None
+        ray = [trace.RaySeg(*seg) for seg in zip(self.pt[i], self.dir[i],
+                                                  self.dst[i], self.nrml[i])]
+        return trace.RayPkg(ray, self.op[i], self.wvl)
+
+    def ray_list(self):
+        """ returns the bundle as a (nested) list of
+        ``[pupil_x, pupil_y, ray_pkg]`` entries """
+        if len(self.shape) > 1:
+            return [row.ray_list() for row in self]
+        return list(self)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Cache of chief rays, aim points and reference spheres
+
+The chief ray, the chief ray aim point and the reference sphere for a field
+and wavelength only change when the optical model changes. The
+:class:`RayCache` keeps them for all fields and wavelengths, tagged with a
+model revision counter. The counter is advanced by
+:meth:`~rayoptics.seq.sequential.SequentialModel.update_model` and
+:meth:`~rayoptics.raytr.opticalspec.OpticalSpecs.update_model`, discarding
+the cached results. Aim points are keyed by the object point and the
+entrance pupil plane, and are kept when a change to the model can't move
+the image of the stop. Each kind of result keeps at most **maxsize**
+entries, discarding the least recently used, so that e.g. a focus scan
+doesn't accumulate reference spheres.
+
+.. codeauthor: Michael J. Hayford
+"""
+
+from collections import OrderedDict
+
+
+def field_key(fld):
+    """ returns a hashable key for the chief ray of **fld** """
+    aim_pt = None if fld.aim_pt is None else tuple(fld.aim_pt)
+    return fld.x, fld.y, aim_pt
+
+
+class RayCache:
+    """ results keyed by field, wavelength and model revision
+
+    Attributes:
+        revision: model revision counter, incremented by :meth:`invalidate`
+        maxsize: maximum number of entries of each kind of result
+    """
+
+    def __init__(self, maxsize=256):
+        self.revision = 0
+        self.maxsize = maxsize
+        self._entries = {}
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def invalidate(self, keep=()):
+        """ advance the model revision and discard the cached results
+
+        Args:
+            keep: kinds of results that remain valid for the new revision
+        """
+        self.revision += 1
+        self._entries = {kind: entries for kind, entries in
+                         self._entries.items() if kind in keep}
+
+    def get(self, kind, key):
+        """ returns the **kind** result for **key**, or None if not cached """
+        entries = self._entries.get(kind)
+        if entries is None or key not in entries:
+            return None
+        entries.move_to_end(key)
+        return entries[key]
+
+    def put(self, kind, key, value):
+        """ save **value** as the **kind** result for **key** """
+        entries = self._entries.setdefault(kind, OrderedDict())
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return value
@@ -8,6 +8,8 @@
 .. codeauthor: Michael J. Hayford
 """
 
+from collections import namedtuple
+
 import numpy as np
 from numpy.linalg import norm
 from math import sqrt, copysign
@@ -16,8 +18,11 @@ import rayoptics.optical.model_constants as mc
 from rayoptics.elem.transform import (transform_before_surface,
                                       transform_after_surface)
 from rayoptics.optical.model_constants import Intfc, Gap, Indx, Tfrm, Zdir
+from rayoptics.raytr import traceerror as terr
+from rayoptics.raytr import tracestats
+from rayoptics.seq import compiledpath as cpath
 from .traceerror import (TraceMissedSurfaceError, TraceTIRError,
-                         TraceEvanescentRayError)
+                         TraceEvanescentRayError, TraceRayBlockedError)
 
 
 def bend(d_in, normal, n_in, n_out):
@@ -60,6 +65,8 @@ def trace(seq_model, pt0, dir0, wvl, **kwargs):
         dir0: starting direction cosines in coords of first interface
         wvl: wavelength in nm
         eps: accuracy tolerance for surface intersection calculation
+        clip_apertures: if True, rays outside the clear apertures of the
+                        interfaces are blocked
 
     Returns:
         (**ray**, **op_delta**, **wvl**)
@@ -95,6 +102,9 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
         dir0: starting direction cosines in coords of first interface
         wvl: wavelength in nm
         eps: accuracy tolerance for surface intersection calculation
+        clip_apertures: if True, a ray outside the clear apertures of an
+                        interface raises a
+                        :exc:`~.traceerror.TraceRayBlockedError`
 
     Returns:
         (**ray**, **op_delta**, **wvl**)
@@ -115,6 +125,7 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
     eic = []
 
     print_details = kwargs.get('print_details', False)
+    clip_apertures = kwargs.get('clip_apertures', False)
 
     first_surf = kwargs.get('first_surf', 0)
     last_surf = kwargs.get('last_surf', None)
@@ -129,6 +140,10 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
         else:
             return s <= last_surf if include_last_surf else s < last_surf
 
+    stats = tracestats.current
+    if stats is not None:
+        stats.add_rays(1)
+
     # trace object surface
     obj = next(path)
     srf_obj = obj[Intfc]
@@ -160,6 +175,8 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
             z_dir_after = after[Zdir]
 
             # intersect ray with profile
+            if stats is not None:
+                tracestats.set_surface(surf+1)
             pp_dst_intrsct, inc_pt = ifc.intersect(pp_pt_before, b4_dir,
                                                    eps=eps, z_dir=z_dir_before)
             dst_b4 = pp_dst + pp_dst_intrsct
@@ -170,6 +187,11 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
 
             normal = ifc.normal(inc_pt)
 
+            if clip_apertures and not ifc.points_inside(inc_pt[0],
+                                                        inc_pt[1]):
+                raise TraceRayBlockedError(ifc, inc_pt, b4_dir,
+                                           before[Indx], after[Indx])
+
             eic_dst_before = eic_distance_from_axis((inc_pt, b4_dir),
                                                     z_dir_before)
 
@@ -227,6 +249,8 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
             ray_miss.ifc = ifc
             ray_miss.prev_tfrm = before[Tfrm]
             ray_miss.ray = ray
+            if stats is not None:
+                stats.add_failure(ray_miss.surf, type(ray_miss).__name__)
             raise ray_miss
 
         except TraceTIRError as ray_tir:
@@ -235,6 +259,8 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
             ray_tir.ifc = ifc
             ray_tir.int_pt = inc_pt
             ray_tir.ray = ray
+            if stats is not None:
+                stats.add_failure(ray_tir.surf, type(ray_tir).__name__)
             raise ray_tir
 
         except TraceEvanescentRayError as ray_evn:
@@ -243,8 +269,18 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
             ray_evn.ifc = ifc
             ray_evn.int_pt = inc_pt
             ray_evn.ray = ray
+            if stats is not None:
+                stats.add_failure(ray_evn.surf, type(ray_evn).__name__)
             raise ray_evn
 
+        except TraceRayBlockedError as ray_blk:
+            ray.append([inc_pt, before_dir, 0.0, normal])
+            ray_blk.surf = surf+1
+            ray_blk.ray = ray
+            if stats is not None:
+                stats.add_failure(ray_blk.surf, type(ray_blk).__name__)
+            raise ray_blk
+
         except StopIteration:
             ray.append([inc_pt, after_dir, 0.0, normal])
             op_delta += opl
@@ -253,6 +289,242 @@ def trace_raw(path, pt0, dir0, wvl, eps=1.0e-12, **kwargs):
     return ray, op_delta, wvl
 
 
+def bend_many(d_in, normal, n_in, n_out):
+    """ refract an (N, 3) array of incoming directions, d_in, about normals
+
+    Returns:
+        (**d_out**, **tir**)
+
+        - **d_out** - refracted directions, NaN for rays that TIR
+        - **tir** - boolean mask of the rays that TIR
+    """
+    normal_len = np.linalg.norm(normal, axis=1)
+    cosI = np.einsum('ij,ij->i', d_in, normal)/normal_len
+    sinI_sqr = 1.0 - cosI*cosI
+    n_cosIp_sqr = n_out*n_out - n_in*n_in*sinI_sqr
+    tir = n_cosIp_sqr < 0.
+    with np.errstate(invalid='ignore'):
+        n_cosIp = np.copysign(np.sqrt(n_cosIp_sqr), cosI)
+    alpha = n_cosIp - n_in*cosI
+    d_out = (n_in*d_in + alpha[:, np.newaxis]*normal)/n_out
+    return d_out, tir
+
+
+def reflect_many(d_in, normal):
+    """ reflect an (N, 3) array of incoming directions, d_in, about normals """
+    normal_len = np.linalg.norm(normal, axis=1)
+    cosI = np.einsum('ij,ij->i', d_in, normal)/normal_len
+    d_out = d_in - 2.0*cosI[:, np.newaxis]*normal
+    return d_out
+
+
+BatchRayPkg = namedtuple('BatchRayPkg', ['pt', 'dir', 'dst', 'nrml', 'op',
+                                         'wvl', 'status', 'fail_surf'])
+BatchRayPkg.__doc__ = """ structure-of-arrays results of a batched ray trace
+
+    Attributes:
+        pt: (N, num_ifcs, 3) array of intersection points
+        dir: (N, num_ifcs, 3) array of direction cosines after each interface
+        dst: (N, num_ifcs) array of distances to the next interface
+        nrml: (N, num_ifcs, 3) array of surface normals
+        op: (N,) array of optical path lengths
+        wvl: wavelength (in nm) that the rays were traced in
+        status: (N,) array of status codes, see :mod:`~.traceerror`
+        fail_surf: (N,) array of the failing interface index, -1 if the ray
+                   traced successfully
+"""
+
+
+def trace_batch(seq_model, pts0, dirs0, wvl, **kwargs):
+    """ trace an array of rays through the sequential model
+
+    Args:
+        seq_model: the sequential model to be traced
+        pts0: (N, 3) array of starting points in coords of first interface
+        dirs0: (N, 3) array of starting direction cosines in coords of first
+               interface
+        wvl: wavelength in nm
+        eps: accuracy tolerance for surface intersection calculation
+
+    Returns:
+        :class:`BatchRayPkg` of the traced rays
+    """
+    path = seq_model.compiled_path(wvl)
+    kwargs['first_surf'] = kwargs.get('first_surf', 1)
+    kwargs['last_surf'] = kwargs.get('last_surf',
+                                     seq_model.get_num_surfaces()-2)
+    return trace_raw_batch(path, pts0, dirs0, wvl, **kwargs)
+
+
+def trace_raw_batch(path, pts0, dirs0, wvl, eps=1.0e-12, **kwargs):
+    """ batched counterpart to :func:`trace_raw`
+
+    All of the rays are advanced together, one interface at a time. Rays that
+    fail are not traced further; instead of raising a
+    :exc:`~.traceerror.TraceError`, the failure type and the interface where
+    it occurred are recorded in the **status** and **fail_surf** arrays.
+
+    Args:
+        path: a :class:`~rayoptics.seq.compiledpath.CompiledPath` or an
+              iterator containing interfaces and gaps to be traced.
+              for each iteration, the sequence or generator should return a
+              list containing: **Intfc, Gap, Trfm, Index, Z_Dir**
+        pts0: (N, 3) array of starting points in coords of first interface
+        dirs0: (N, 3) array of starting direction cosines in coords of first
+               interface
+        wvl: wavelength in nm
+        eps: accuracy tolerance for surface intersection calculation
+        clip_apertures: if True, rays outside the clear apertures of an
+                        interface are given a status of
+                        :data:`~.traceerror.TRACE_BLOCKED`
+
+    Returns:
+        :class:`BatchRayPkg` of the traced rays. Data following the failing
+        interface of a ray is NaN.
+    """
+    if not isinstance(path, cpath.CompiledPath):
+        path = cpath.CompiledPath(*zip(*path), wvl=wvl)
+    pts0, dirs0 = np.broadcast_arrays(np.atleast_2d(pts0),
+                                      np.atleast_2d(dirs0))
+    num_rays = len(dirs0)
+    num_ifcs = len(path)
+
+    first_surf = kwargs.get('first_surf', 0)
+    last_surf = kwargs.get('last_surf', None)
+    clip_apertures = kwargs.get('clip_apertures', False)
+
+    def in_surface_range(s, include_last_surf=False):
+        if first_surf == last_surf:
+            return False
+        if s < first_surf:
+            return False
+        if last_surf is None:
+            return True
+        else:
+            return s <= last_surf if include_last_surf else s < last_surf
+
+    pts = np.full((num_rays, num_ifcs, 3), np.nan)
+    dirs = np.full((num_rays, num_ifcs, 3), np.nan)
+    dsts = np.full((num_rays, num_ifcs), np.nan)
+    nrmls = np.full((num_rays, num_ifcs, 3), np.nan)
+    op_delta = np.zeros(num_rays)
+    status = np.full(num_rays, terr.TRACE_OK)
+    fail_surf = np.full(num_rays, -1)
+
+    stats = tracestats.current
+    if stats is not None:
+        stats.add_rays(num_rays)
+
+    # trace object surface
+    srf_obj = path[0][Intfc]
+    _, before_pt = srf_obj.intersect_many(np.array(pts0, dtype=float),
+                                          np.array(dirs0, dtype=float))
+    before_dir = np.array(dirs0, dtype=float)
+    pts[:, 0] = before_pt
+    dirs[:, 0] = before_dir
+    nrmls[:, 0] = srf_obj.normal_many(before_pt)
+
+    # indices of the rays still being traced
+    live = np.arange(num_rays)
+    for k in range(1, num_ifcs):
+        surf = k - 1
+        rt, t = path.rot[surf], path.trans[surf]
+        b4_pt = (before_pt - t).dot(rt.T)
+        b4_dir = before_dir.dot(rt.T)
+        n_before, n_after = path.rndx[surf], path.rndx[k]
+
+        pp_dst = -np.einsum('ij,ij->i', b4_pt, b4_dir)
+        pp_pt_before = b4_pt + pp_dst[:, np.newaxis]*b4_dir
+
+        ifc = path[k][Intfc]
+
+        # intersect rays with profile, NaN distances flag a miss
+        if stats is not None:
+            tracestats.set_surface(k)
+        pp_dst_intrsct, inc_pt = ifc.intersect_many(pp_pt_before, b4_dir,
+                                                    eps=eps,
+                                                    z_dir=path.z_dir[surf])
+        dst_b4 = pp_dst + pp_dst_intrsct
+
+        missed = np.isnan(dst_b4)
+        dsts[live, k-1] = np.where(missed, pp_dst, dst_b4)
+        if missed.any():
+            status[live[missed]] = terr.TRACE_MISSED
+            fail_surf[live[missed]] = k
+
+        if in_surface_range(surf):
+            op_delta[live] += n_before * np.nan_to_num(dst_b4)
+
+        normal = ifc.normal_many(inc_pt)
+        failed = missed
+
+        if clip_apertures:
+            vignetted = ~ifc.points_inside(inc_pt[:, 0], inc_pt[:, 1])
+            vignetted &= ~failed
+            if vignetted.any():
+                status[live[vignetted]] = terr.TRACE_BLOCKED
+                fail_surf[live[vignetted]] = k
+                failed = failed | vignetted
+
+        # if the interface has a phase element, process that first
+        if hasattr(ifc, 'phase_element'):
+            evanescent = np.zeros(len(live), dtype=bool)
+            for i in np.flatnonzero(~failed):
+                try:
+                    doe_dir, phs = phase(ifc, inc_pt[i], b4_dir[i], normal[i],
+                                         wvl, n_before, n_after)
+                except TraceEvanescentRayError:
+                    evanescent[i] = True
+                else:
+                    b4_dir[i] = doe_dir
+                    op_delta[live[i]] += phs
+            if evanescent.any():
+                status[live[evanescent]] = terr.TRACE_EVANESCENT
+                fail_surf[live[evanescent]] = k
+                failed = failed | evanescent
+
+        # refract or reflect rays at interface
+        if path.interact[k] == cpath.REFLECT:
+            after_dir = reflect_many(b4_dir, normal)
+        elif path.interact[k] == cpath.TRANSMIT:
+            after_dir, tir = bend_many(b4_dir, normal, n_before, n_after)
+            tir &= ~failed
+            if tir.any():
+                status[live[tir]] = terr.TRACE_TIR
+                fail_surf[live[tir]] = k
+                failed = failed | tir
+        else:  # no action, input becomes output
+            after_dir = b4_dir
+
+        # blocked, TIR and evanescent rays retain the interface intersection
+        blocked = failed & ~missed
+        if blocked.any():
+            blk = live[blocked]
+            pts[blk, k] = inc_pt[blocked]
+            dirs[blk, k] = before_dir[blocked]
+            dsts[blk, k] = 0.0
+            nrmls[blk, k] = normal[blocked]
+
+        ok = ~failed
+        live = live[ok]
+        before_pt = inc_pt[ok]
+        before_dir = after_dir[ok]
+        pts[live, k] = before_pt
+        dirs[live, k] = before_dir
+        nrmls[live, k] = normal[ok]
+
+        if len(live) == 0:
+            break
+
+    dsts[live, -1] = 0.0
+    op_delta[status != terr.TRACE_OK] = np.nan
+    if stats is not None:
+        tracestats.record_failures(status, fail_surf)
+
+    return BatchRayPkg(pts, dirs, dsts, nrmls, op_delta, wvl,
+                       status, fail_surf)
+
+
 def calc_path_length(eic, offset=0):
     """ given eic array, compute path length between outer surfaces
 
@@ -296,6 +568,24 @@ def eic_distance(r, r0):
     return e
 
 
+def eic_distance_many(r, r0):
+    """ equally inclined chord distances between an array of rays and r0
+
+    Args:
+        r: (p, d), where p is an (N, 3) array of points on the rays and d is
+           an (N, 3) array of the ray direction cosines
+        r0: (p0, d0), where p0 is a point on the ray r0 and d0 is the direction
+            cosine of r0
+
+    Returns:
+        (N,) array of distances along r from equally inclined chord point to p
+    """
+    # eq 3.9
+    e = (np.einsum('ij,ij->i', r[mc.d] + r0[mc.d], r[mc.p] - r0[mc.p]) /
+         (1. + r[mc.d].dot(r0[mc.d])))
+    return e
+
+
 def eic_distance_from_axis(r, z_dir):
     """ calculate equally inclined chord distance between a ray and the axis
 
@@ -3,6 +3,16 @@
 # Copyright © 2020 Michael J. Hayford
 """Various generators and utilities for producing 2d distributions
 
+The generators produce one 2d sample at a time. The functions ending in
+``_samples`` return all of the samples of a distribution as an (N, 2) array,
+ready for the batched ray traces, e.g.::
+
+    pupil_coords = concentric_sample_disk_many(sobol_samples(256, seed=1))
+
+Samples in the unit square are mapped to the unit disk with
+:func:`concentric_sample_disk_many`; :func:`pupil_weights` returns the
+weight of each sample in a pupil integration.
+
 .. Created on Tue Mar 24 21:14:31 2020
 
 .. codeauthor: Michael J. Hayford
@@ -102,6 +112,152 @@ def R_2_quasi_random_generator(n):
         yield z[i]
 
 
+def R_2_samples(n, seed=0.5):
+    """Returns an (n, 2) array of the R**2 quasi-random sequence.
+
+    The samples are the same as those of :func:`R_2_quasi_random_generator`.
+    """
+    g = phi(2)
+    alpha = np.array([pow(1/g, j+1) % 1 for j in range(2)])
+    return (seed + alpha*np.arange(1, n+1)[:, np.newaxis]) % 1
+
+
+def grid_samples(grid_rng):
+    """Returns a (num*num, 2) array of a 2d square regular grid.
+
+    The samples are the same, and in the same order, as those of
+    :func:`grid_ray_generator`.
+    """
+    start = np.array(grid_rng[0], dtype=float)
+    stop = grid_rng[1]
+    num = grid_rng[2]
+    step = np.array((stop - start)/(num - 1))
+    # accumulate the coordinates the same way as the generator
+    steps = np.tile(step, (num, 1))
+    steps[0] = start
+    xs, ys = np.cumsum(steps, axis=0).T
+    samples = np.empty((num, num, 2))
+    samples[:, :, 0] = xs[:, np.newaxis]
+    samples[:, :, 1] = ys[np.newaxis, :]
+    return samples.reshape(-1, 2)
+
+
+def csd_grid_samples(grid_rng):
+    """Returns a square grid mapped to the unit disk, see
+    :func:`csd_grid_ray_generator`."""
+    return concentric_sample_disk_many(grid_samples(grid_rng), offset=False)
+
+
+def jittered_samples(num, seed=None):
+    """Returns a (num*num, 2) array of stratified samples in the unit square.
+
+    Each cell of a num x num grid over the unit square receives one sample,
+    placed at random within the cell.
+    """
+    rng = np.random.default_rng(seed)
+    i, j = np.meshgrid(np.arange(num), np.arange(num), indexing='ij')
+    cells = np.column_stack([i.ravel(), j.ravel()])
+    return (cells + rng.random(cells.shape))/num
+
+
+def sobol_samples(n, scramble=True, seed=None):
+    """Returns an (n, 2) array of a Sobol' sequence in the unit square.
+
+    n should be a power of 2 to preserve the balance of the sequence.
+    Requires scipy 1.7 or later.
+    """
+    # scipy.stats is slow to import, so only load it when needed
+    from scipy.stats import qmc
+    return qmc.Sobol(d=2, scramble=scramble, seed=seed).random(n)
+
+
+def halton_samples(n, scramble=True, seed=None):
+    """Returns an (n, 2) array of a Halton sequence in the unit square.
+
+    Requires scipy 1.7 or later.
+    """
+    from scipy.stats import qmc
+    return qmc.Halton(d=2, scramble=scramble, seed=seed).random(n)
+
+
+def hexapolar_samples(num_rings):
+    """Returns a hexapolar sampling of the unit disk.
+
+    The center sample is followed by num_rings rings of equally spaced
+    radius; ring k has 6k samples, the first on the +y axis. With
+    num_rings=0 only the center sample is returned.
+    """
+    if num_rings < 0:
+        raise ValueError('num_rings must be non-negative')
+    rings = [np.zeros((1, 2))]
+    for k in range(1, num_rings+1):
+        theta = np.pi/2 + 2*np.pi*np.arange(6*k)/(6*k)
+        rings.append(k/num_rings*np.column_stack([np.cos(theta),
+                                                  np.sin(theta)]))
+    return np.concatenate(rings)
+
+
+def hexapolar_areas(num_rings):
+    """Returns the fraction of the unit disk sampled by each hexapolar sample.
+    """
+    if num_rings < 0:
+        raise ValueError('num_rings must be non-negative')
+    if num_rings == 0:
+        return np.ones(1)
+    radii = np.arange(num_rings+1)/num_rings
+    edges = np.concatenate([[0.], (radii[1:] + radii[:-1])/2, [1.]])
+    counts = np.concatenate([[1], 6*np.arange(1, num_rings+1)])
+    return np.repeat(np.diff(edges**2)/counts, counts)
+
+
+def ring_samples(num_rings, num_spokes, equal_area=True):
+    """Returns a polar sampling of the unit disk, ring by ring.
+
+    If equal_area is True, the rings are centered in annuli of equal area,
+    so that every sample represents the same area of the disk; otherwise
+    the rings are of equally spaced radius, with the last at the edge.
+    """
+    k = np.arange(num_rings)
+    radii = (np.sqrt((k + 0.5)/num_rings) if equal_area
+             else (k + 1)/num_rings)
+    theta = np.pi/2 + 2*np.pi*np.arange(num_spokes)/num_spokes
+    x = radii[:, np.newaxis]*np.cos(theta)
+    y = radii[:, np.newaxis]*np.sin(theta)
+    return np.column_stack([x.ravel(), y.ravel()])
+
+
+def ring_areas(num_rings, num_spokes, equal_area=True):
+    """Returns the fraction of the unit disk sampled by each ring sample."""
+    if equal_area:
+        return np.full(num_rings*num_spokes, 1/(num_rings*num_spokes))
+    radii = np.arange(1, num_rings+1)/num_rings
+    edges = np.concatenate([[0.], (radii[1:] + radii[:-1])/2, [1.]])
+    return np.repeat(np.diff(edges**2)/num_spokes, num_spokes)
+
+
+def pupil_weights(samples, areas=None, apodization=None):
+    """Returns the weights of pupil samples, normalized to a sum of 1.
+
+    Args:
+        samples: (N, 2) array of pupil coordinates
+        areas: (N,) array of the pupil area represented by each sample, e.g.
+               from :func:`hexapolar_areas`. If None, the samples are taken
+               to be uniformly distributed.
+        apodization: a function returning the pupil amplitude at (x, y);
+                     the weights are proportional to the intensity
+
+    Samples outside the unit disk have a weight of 0.
+    """
+    samples = np.asarray(samples, dtype=float)
+    x, y = samples[:, 0], samples[:, 1]
+    wts = np.where(x**2 + y**2 <= 1.0, 1.0, 0.0)
+    if areas is not None:
+        wts *= areas
+    if apodization is not None:
+        wts *= np.abs(apodization(x, y))**2
+    return wts/np.sum(wts)
+
+
 def concentric_sample_disk(u, offset=True):
     """Map a 2d unit square sample to the unit disk."""
     if offset:
@@ -122,6 +278,23 @@ def concentric_sample_disk(u, offset=True):
     return r*np.array([math.cos(theta), math.sin(theta)])
 
 
+def concentric_sample_disk_many(u, offset=True):
+    """Map an (N, 2) array of unit square samples to the unit disk.
+
+    Vectorized counterpart of :func:`concentric_sample_disk`.
+    """
+    u = np.asarray(u, dtype=float)
+    uOffset = 2*u - 1 if offset else u
+    x, y = uOffset[..., 0], uOffset[..., 1]
+    x_major = np.abs(x) > np.abs(y)
+    r = np.where(x_major, x, y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        theta = np.where(x_major, np.pi/4 * (y/x),
+                         np.pi/2 - np.pi/4 * (x/y))
+    theta = np.where(r == 0, 0., theta)
+    return np.stack([r*np.cos(theta), r*np.sin(theta)], axis=-1)
+
+
 def create_generator(sampler, *sampler_args, mapper=None, **kwargs):
     def gen():
         for xy in sampler(*sampler_args):
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Geometric spot statistics: centroid, RMS and GEO radius, encircled energy
+
+The functions operate on (..., N, 2) arrays of transverse aberrations, as
+returned by :func:`~.analyses.transverse_abr_many`, and (N,) arrays of ray
+weights. The leading dimensions, e.g. a set of focus shifts from
+:func:`defocus_abr`, are evaluated together. Rays with NaN aberrations, i.e.
+failed rays, carry no weight.
+
+:class:`SpotStatistics` combines the ray bundles of several wavelengths at
+a field into a pupil and wavelength weighted spot, and refocuses it from the
+traced image space rays without retracing::
+
+    spot = SpotStatistics.from_model(opm, fi=1)
+    spot.stats().rms_radius
+    spot.energy_radius(0.8, foc=np.linspace(-0.1, 0.1, 21))
+
+.. codeauthor: Michael J. Hayford
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+import rayoptics.optical.model_constants as mc
+from rayoptics.raytr import analyses
+from rayoptics.raytr import sampler
+from rayoptics.raytr import trace
+
+SpotStats = namedtuple('SpotStats', ['centroid', 'rms_radius', 'rms_xy',
+                                     'geo_radius', 'weight'])
+SpotStats.centroid.__doc__ = "(..., 2) array of the weighted mean x, y"
+SpotStats.rms_radius.__doc__ = "RMS radius about the centroid"
+SpotStats.rms_xy.__doc__ = "(..., 2) array of the RMS x and y about the " \
+                           "centroid"
+SpotStats.geo_radius.__doc__ = "largest distance of a ray from the centroid"
+SpotStats.weight.__doc__ = "total weight of the rays that traced"
+
+
+def defocus_abr(ray_bundle, focus_shifts, image_pt):
+    """ returns the transverse aberrations of **ray_bundle** through focus
+
+    This is :func:`~.analyses.transverse_abr_many` for an array of focus
+    shifts, using the traced image space rays. **image_pt** is a point or a
+    (num_focus_shifts, 3) array of points, one per focus shift.
+
+    Returns:
+        a (num_focus_shifts, N, 2) array; the rows of failed rays are NaN
+    """
+    foc = np.asarray(focus_shifts, dtype=float)[:, np.newaxis, np.newaxis]
+    pt, dir = ray_bundle.pt[:, -1], ray_bundle.dir[:, -1]
+    defocused_pt = pt - (foc/dir[:, 2:3])*dir
+    image_pt = np.asarray(image_pt)
+    if image_pt.ndim == 2:
+        image_pt = image_pt[:, np.newaxis, :]
+    abr = (defocused_pt - image_pt)[..., :2]
+    abr[:, ~ray_bundle.valid] = np.nan
+    return abr
+
+
+def _valid_weights(abr, weights):
+    """ returns the weights broadcast to abr, zeroed for the failed rays """
+    valid = np.all(np.isfinite(abr), axis=-1)
+    if weights is None:
+        weights = 1.0
+    return np.where(valid, weights, 0.)
+
+
+def spot_stats(abr, weights=None):
+    """ returns the :class:`SpotStats` of a weighted spot
+
+    Args:
+        abr: (..., N, 2) array of transverse aberrations
+        weights: (N,) or (..., N) array of ray weights; if None, the rays
+                 are weighted equally
+    """
+    w = _valid_weights(abr, weights)
+    total = np.sum(w, axis=-1)
+    pts = np.nan_to_num(abr)
+    centroid = np.sum(w[..., np.newaxis]*pts, axis=-2)/total[..., np.newaxis]
+    d = pts - centroid[..., np.newaxis, :]
+    var_xy = np.sum(w[..., np.newaxis]*d**2, axis=-2)/total[..., np.newaxis]
+    r = np.where(w > 0., np.sqrt(np.sum(d**2, axis=-1)), 0.)
+    return SpotStats(centroid, np.sqrt(np.sum(var_xy, axis=-1)),
+                     np.sqrt(var_xy), np.max(r, axis=-1), total)
+
+
+def energy_curve(abr, weights=None, center=None, ensquared=False):
+    """ returns the cumulative energy of a spot as a function of radius
+
+    The distances of the rays from **center** are sorted and their weights
+    accumulated.
+
+    Args:
+        abr: (..., N, 2) array of transverse aberrations
+        weights: (N,) or (..., N) array of ray weights
+        center: (..., 2) center of the circles; the centroid if None
+        ensquared: if True, use the half width of squares rather than the
+                   radius of circles
+
+    Returns:
+        (**radii**, **energy**): (..., N) arrays of the sorted distances and
+        the fraction of the energy within each distance. Failed rays are
+        sorted last, at an infinite distance.
+    """
+    w = _valid_weights(abr, weights)
+    if center is None:
+        center = spot_stats(abr, w).centroid
+    d = np.abs(abr - np.asarray(center)[..., np.newaxis, :])
+    dist = np.max(d, axis=-1) if ensquared else np.hypot(d[..., 0],
+                                                         d[..., 1])
+    dist = np.where(w > 0., dist, np.inf)
+    order = np.argsort(dist, axis=-1)
+    radii = np.take_along_axis(dist, order, axis=-1)
+    energy = np.cumsum(np.take_along_axis(w, order, axis=-1), axis=-1)
+    return radii, energy/energy[..., -1:]
+
+
+def _interp_curve(radii, energy, r):
+    """ fraction of the energy within the distances **r**, per curve """
+    lead = radii.shape[:-1]
+    radii = radii.reshape(-1, radii.shape[-1])
+    energy = energy.reshape(radii.shape)
+    ee = np.empty((len(radii), len(r)))
+    for i, (rad, en) in enumerate(zip(radii, energy)):
+        idx = np.searchsorted(rad, r, side='right')
+        ee[i] = np.where(idx > 0, en[np.maximum(idx - 1, 0)], 0.)
+    return ee.reshape(lead + (len(r),))
+
+
+def encircled_energy(abr, r, weights=None, center=None):
+    """ returns the (..., len(r)) fraction of the energy within radii **r**
+    """
+    radii, energy = energy_curve(abr, weights=weights, center=center)
+    return _interp_curve(radii, energy, np.atleast_1d(r))
+
+
+def ensquared_energy(abr, half_width, weights=None, center=None):
+    """ returns the (..., len(half_width)) fraction of the energy within
+    squares of **half_width** """
+    radii, energy = energy_curve(abr, weights=weights, center=center,
+                                 ensquared=True)
+    return _interp_curve(radii, energy, np.atleast_1d(half_width))
+
+
+def energy_radius(abr, fraction, weights=None, center=None, ensquared=False):
+    """ returns the smallest radius containing **fraction** of the energy,
+    e.g. 0.8 for the EE80 radius """
+    radii, energy = energy_curve(abr, weights=weights, center=center,
+                                 ensquared=ensquared)
+    # the tolerance keeps a fraction of 1 within the largest radius
+    idx = np.argmax(energy >= fraction - 1e-12, axis=-1)
+    return np.take_along_axis(radii, idx[..., np.newaxis], axis=-1)[..., 0]
+
+
+class SpotStatistics:
+    """ Pupil and wavelength weighted spot statistics at a field
+
+    The ray bundles are refocused with :func:`defocus_abr`, so the
+    statistics can be evaluated through focus without retracing. The foc
+    arguments of the methods accept a focus shift or an array of them,
+    relative to **focus**; an array adds a leading focus dimension to the
+    results.
+
+    Attributes:
+        bundles: list of :class:`~.raybundle.RayBundle`, one per wavelength
+        ref_pt: reference image point the aberrations are measured from
+        ref_dir: if not None, the direction of the reference ray through
+                 ref_pt, e.g. the chief ray, that is followed through focus
+        weights: list of (N,) arrays of the ray weights of each bundle,
+                 scaled to the weight of its wavelength
+        focus: the focus shift the statistics are evaluated at by default,
+               e.g. the foc of the source ray lists
+    """
+
+    def __init__(self, bundles, ref_pt, ref_dir=None, pupil_weights=None,
+                 wvl_weights=None, focus=0.):
+        """ combine the ray bundles of several wavelengths
+
+        Args:
+            bundles: list of :class:`~.raybundle.RayBundle`
+            ref_pt: reference image point in the nominal image plane
+            ref_dir: direction cosines of the reference ray, or None for a
+                     fixed reference point
+            pupil_weights: list of (N,) arrays of the pupil weights of the
+                           rays in each bundle; if None, the weights are
+                           from :func:`~.sampler.pupil_weights`
+            wvl_weights: the weight of each bundle; if None, all bundles are
+                         weighted equally
+            focus: the default focus shift
+        """
+        self.bundles = bundles
+        self.ref_pt = np.asarray(ref_pt)
+        self.ref_dir = ref_dir
+        if pupil_weights is None:
+            pupil_weights = [sampler.pupil_weights(b.pupil) for b in bundles]
+        if wvl_weights is None:
+            wvl_weights = np.ones(len(bundles))
+        wvl_weights = np.asarray(wvl_weights, dtype=float)
+        wvl_weights = wvl_weights/np.sum(wvl_weights)
+        self.weights = [ww*pw/np.sum(pw)
+                        for ww, pw in zip(wvl_weights, pupil_weights)]
+        self.focus = focus
+
+    @classmethod
+    def from_ray_lists(cls, ray_lists, wvl_weights=None, pupil_weights=None):
+        """ create from :class:`~.analyses.RayList` instances at one field
+
+        The aberrations are measured from the chief ray of the first ray
+        list, or its image_pt_2d, at its focus shift, as in
+        :attr:`~.analyses.RayList.ray_abr`.
+        """
+        rl = ray_lists[0]
+        return cls([r.ray_list for r in ray_lists],
+                   *_reference(rl.opt_model, rl.fld, rl.wvl, rl.foc,
+                               rl.image_pt_2d),
+                   pupil_weights=pupil_weights, wvl_weights=wvl_weights,
+                   focus=rl.foc)
+
+    @classmethod
+    def from_ray_grids(cls, ray_grids, wvl_weights=None):
+        """ create from :class:`~.analyses.RayGrid` instances at one field
+
+        The rays outside the pupil get a weight of 0. The aberrations are
+        measured from the chief ray of the first ray grid, at its focus
+        shift.
+        """
+        rg = ray_grids[0]
+        bundles = [r.grid_pkg[0] for r in ray_grids]
+        return cls(bundles,
+                   *_reference(rg.opt_model, rg.fld, rg.wvl, rg.foc,
+                               rg.image_pt_2d),
+                   wvl_weights=wvl_weights, focus=rg.foc)
+
+    @classmethod
+    def from_model(cls, opt_model, fi=0, pupil_coords=None,
+                   pupil_weights=None, image_pt_2d=None):
+        """ trace the wavelengths of the spectral region at field **fi**
+
+        Args:
+            opt_model: :class:`~.OpticalModel` instance
+            fi: index into :class:`~.FieldSpec`
+            pupil_coords: (N, 2) array of pupil coordinates, e.g. from
+                          :mod:`~.sampler`; if None, 16 rings of 32 equal
+                          area samples from :func:`~.sampler.ring_samples`
+            pupil_weights: (N,) array of the weights of pupil_coords
+            image_pt_2d: fixed reference point; if None, the aberrations
+                         are measured from the chief ray at the central
+                         wavelength
+
+        The wavelengths are weighted by the spectral weights. The default
+        focus is the focus shift of the optical spec.
+        """
+        osp = opt_model.optical_spec
+        fld = osp.field_of_view.fields[fi]
+        spectral_region = osp.spectral_region
+        foc = osp.defocus.focus_shift
+        if pupil_coords is None:
+            pupil_coords = sampler.ring_samples(16, 32)
+        bundles = [trace.trace_bundle(opt_model, pupil_coords, fld, wvl)
+                   for wvl in spectral_region.wavelengths]
+        if pupil_weights is not None:
+            pupil_weights = [pupil_weights]*len(bundles)
+        return cls(bundles,
+                   *_reference(opt_model, fld, spectral_region.central_wvl,
+                               foc, image_pt_2d),
+                   pupil_weights=pupil_weights,
+                   wvl_weights=spectral_region.spectral_wts, focus=foc)
+
+    def abr(self, foc=0.):
+        """ returns the (..., N, 2) aberrations and (N,) weights of all rays
+        """
+        foc_shifts = self.focus + np.atleast_1d(foc)
+        abr = np.concatenate([defocus_abr(b, foc_shifts,
+                                          self.image_pt(foc_shifts))
+                              for b in self.bundles], axis=-2)
+        if np.ndim(foc) == 0:
+            abr = abr[0]
+        return abr, np.concatenate(self.weights)
+
+    def image_pt(self, foc):
+        """ returns the (num_focus_shifts, 3) reference points at the
+        absolute focus shifts **foc** """
+        foc = np.atleast_1d(foc)[:, np.newaxis]
+        if self.ref_dir is None:
+            return np.broadcast_to(self.ref_pt, (len(foc), 3))
+        return self.ref_pt - (foc/self.ref_dir[2])*self.ref_dir
+
+    def stats(self, foc=0.):
+        """ returns the :class:`SpotStats` at focus shift **foc** """
+        return spot_stats(*self.abr(foc))
+
+    def encircled_energy(self, r, foc=0., center=None):
+        abr, wts = self.abr(foc)
+        return encircled_energy(abr, r, weights=wts, center=center)
+
+    def ensquared_energy(self, half_width, foc=0., center=None):
+        abr, wts = self.abr(foc)
+        return ensquared_energy(abr, half_width, weights=wts, center=center)
+
+    def energy_radius(self, fraction, foc=0., center=None, ensquared=False):
+        abr, wts = self.abr(foc)
+        return energy_radius(abr, fraction, weights=wts, center=center,
+                             ensquared=ensquared)
+
+
+def _reference(opt_model, fld, wvl, foc, image_pt_2d):
+    """ returns the reference point and direction at a field, see
+    :func:`~.analyses.setup_exit_pupil_coords` """
+    if image_pt_2d is not None:
+        return np.array([image_pt_2d[0], image_pt_2d[1], 0.]), None
+    cr, cr_exp_seg = analyses.get_chief_ray_pkg(opt_model, fld, wvl, foc)
+    return cr.ray[-1][mc.p], cr.ray[-1][mc.d]
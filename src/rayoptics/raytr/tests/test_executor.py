@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check that the analysis executor reproduces the serial results
+
+"""
+
+
+import unittest
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.mpl.axisarrayfigure import eval_ray_fan
+from rayoptics.raytr.executor import AnalysisExecutor, fld_wvl_jobs
+from rayoptics.raytr import raytrace as rt
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+def trace_marginal_ray(opt_model, fi, wi, fr):
+    osp = opt_model.optical_spec
+    fld, wvl, foc = osp.lookup_fld_wvl_focus(fi, wl=wi, fr=fr)
+    fod = osp.parax_data.fod
+    pt0 = osp.obj_coords(fld)
+    pt1 = np.array([0., fod.enp_radius, fod.obj_dist+fod.enp_dist])
+    dir0 = (pt1 - pt0)/np.linalg.norm(pt1 - pt0)
+    ray, op, wvl = rt.trace(opt_model.seq_model, pt0, dir0, wvl)
+    return ray[-1][0]
+
+
+class AnalysisExecutorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        self.jobs = fld_wvl_jobs(self.opm)
+
+    def test_jobs(self):
+        osp = self.opm.optical_spec
+        num_flds = len(osp.field_of_view.fields)
+        num_wvls = len(osp.spectral_region.wavelengths)
+        self.assertEqual(len(self.jobs), num_flds*num_wvls)
+        self.assertEqual(len(fld_wvl_jobs(self.opm, wvls=False)), num_flds)
+
+    def test_map(self):
+        serial = AnalysisExecutor(self.opm, max_workers=1)
+        results = serial.map(trace_marginal_ray, self.jobs)
+        for use_threads in (True, False):
+            executor = AnalysisExecutor(self.opm, max_workers=2,
+                                        use_threads=use_threads)
+            for r, r_par in zip(results,
+                                executor.map(trace_marginal_ray, self.jobs)):
+                npt.assert_allclose(r_par, r, rtol=1e-14)
+
+            # a persistent pool, reused by each map() call
+            with executor:
+                for i in range(2):
+                    for r, r_par in zip(results,
+                                        executor.map(trace_marginal_ray,
+                                                     self.jobs)):
+                        npt.assert_allclose(r_par, r, rtol=1e-14)
+            self.assertIsNone(executor._pool)
+
+    def test_threaded_fans(self):
+        # the fans of a field store the chief ray and reference sphere of
+        #  each wavelength on the field; the threads mustn't share them
+        jobs = [(fi, xy, 'OPD') for fi in range(3) for xy in range(2)]*2
+        results = AnalysisExecutor(self.opm, max_workers=1).map(eval_ray_fan,
+                                                                jobs)
+        executor = AnalysisExecutor(self.opm, max_workers=6,
+                                    use_threads=True)
+        for i in range(3):
+            for fan, fan_par in zip(results, executor.map(eval_ray_fan, jobs)):
+                fans_x, fans_y, max_y_val, rc = fan
+                npt.assert_allclose(fan_par[0], fans_x, rtol=1e-12)
+                npt.assert_allclose(fan_par[1], fans_y, rtol=1e-12,
+                                    atol=1e-12)
+                self.assertAlmostEqual(fan_par[2], max_y_val, places=12)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the FFT PSF and MTF calculations
+
+"""
+
+
+import unittest
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+from numpy.fft import fftshift, fft2
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.raytr import analyses
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+def circular_wavefront(ndim, opd=0.0):
+    x, y = np.meshgrid(np.linspace(-1., 1., ndim), np.linspace(-1., 1., ndim),
+                       indexing='ij')
+    wavefront = np.full((ndim, ndim), opd)
+    wavefront[x*x + y*y >= 1.] = np.nan
+    return wavefront
+
+
+class PSFTestCase(unittest.TestCase):
+    def test_perfect_wavefront(self):
+        ndim, maxdim = 32, 128
+        wavefront = circular_wavefront(ndim)
+        AP = analyses.calc_psf(wavefront, ndim, maxdim)
+        self.assertEqual(AP.shape, (maxdim, maxdim))
+        self.assertEqual(np.unravel_index(AP.argmax(), AP.shape),
+                         (maxdim//2, maxdim//2))
+        self.assertAlmostEqual(AP.max(), 1.0)
+        # the aperture mask, not the phase, determines the pupil
+        npt.assert_allclose(AP, analyses.calc_psf(wavefront + 1.0,
+                                                  ndim, maxdim), atol=1e-12)
+
+    def test_direct_fft(self):
+        ndim, maxdim = 16, 64
+        wavefront = circular_wavefront(ndim, opd=0.1)
+        wavefront[4:8, 3:9] = 0.25
+        pupil = np.zeros((maxdim, maxdim), dtype=complex)
+        start = maxdim//2 - (ndim - 1)//2
+        aperture = np.isfinite(wavefront)
+        pupil[start:start+ndim, start:start+ndim][aperture] = \
+            np.exp(1j*2*np.pi*wavefront[aperture])
+        AP_truth = abs(fftshift(fft2(pupil)))**2
+        AP_truth /= AP_truth.max()
+        npt.assert_allclose(analyses.calc_psf(wavefront, ndim, maxdim),
+                            AP_truth, atol=1e-12)
+
+    def test_apodization(self):
+        ndim, maxdim = 21, 64
+        wavefront = circular_wavefront(ndim)
+        AP = analyses.calc_psf(wavefront, ndim, maxdim)
+        AP_gauss = analyses.calc_psf(wavefront, ndim, maxdim,
+                                     apodization=lambda x, y:
+                                     np.exp(-2*(x*x + y*y)))
+        # apodization broadens the central peak
+        c = maxdim//2
+        self.assertGreater(AP_gauss[c, c+3], AP[c, c+3])
+
+
+class MTFTestCase(unittest.TestCase):
+    def test_diffraction_limited_otf(self):
+        ndim, maxdim = 64, 256
+        otf = analyses.calc_otf(circular_wavefront(ndim), ndim, maxdim)
+        c = maxdim//2
+        mtf = np.abs(otf[c, c:c+ndim])
+        v = np.minimum(np.arange(ndim)/(ndim - 1), 1.)
+        mtf_truth = 2/np.pi*(np.arccos(v) - v*np.sqrt(1 - v*v))
+        npt.assert_allclose(mtf, mtf_truth, atol=0.03)
+
+    def test_through_focus(self):
+        opm = open_model(root_pth/'codev/tests/paraboloid_f8.seq')
+        mtf = analyses.MTF(opm, num_rays=32, maxdim=128)
+        npt.assert_allclose(mtf.mtf_t, mtf.mtf_s, atol=1e-6)
+        self.assertAlmostEqual(mtf.mtf_t[0], 1.0)
+
+        foci = np.linspace(-0.1, 0.1, 5)
+        mtf_t, mtf_s = mtf.through_focus(foci, 50.)
+        self.assertEqual(mtf_t.argmax(), 2)
+        npt.assert_allclose(mtf_t, mtf_t[::-1], atol=1e-3)
+
+        # refocusing the traced grid matches a retrace at that focus
+        refocused = analyses.MTF(opm, foc=foci[1], num_rays=32, maxdim=128)
+        npt.assert_allclose(np.interp(50., refocused.freq, refocused.mtf_t),
+                            mtf_t[1], atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check the chief ray, reference sphere and refractive index caches
+
+"""
+
+
+import unittest
+from unittest import mock
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.raytr import analyses
+from rayoptics.raytr import trace
+from rayoptics.seq import medium
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+class RayCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        self.osp = self.opm.optical_spec
+
+    def test_alternating_wavelengths(self):
+        fld, wvl, foc = self.osp.lookup_fld_wvl_focus(1)
+        wvls = self.osp.spectral_region.wavelengths
+        pkgs = [analyses.get_chief_ray_pkg(self.opm, fld, w, foc)
+                for w in wvls]
+        for w, pkg in zip(wvls, pkgs):
+            self.assertIs(analyses.get_chief_ray_pkg(self.opm, fld, w, foc),
+                          pkg)
+            self.assertEqual(pkg[0].wvl, w)
+
+        ref_sphere = analyses.setup_exit_pupil_coords(self.opm, fld, wvl, foc,
+                                                      pkgs[1])
+        self.assertIs(analyses.setup_exit_pupil_coords(self.opm, fld, wvl,
+                                                       foc, pkgs[1]),
+                      ref_sphere)
+
+    def test_focus_scan(self):
+        fld, wvl, foc = self.osp.lookup_fld_wvl_focus(1)
+        ray_cache = self.osp.ray_cache
+        pkg = analyses.get_chief_ray_pkg(self.opm, fld, wvl, foc)
+        num_entries = len(ray_cache)
+        for foc in np.linspace(-0.1, 0.1, 2*ray_cache.maxsize):
+            ref_sphere = analyses.setup_exit_pupil_coords(self.opm, fld, wvl,
+                                                          foc, pkg)
+        # the reference spheres are limited to the most recent ones
+        self.assertEqual(len(ray_cache), num_entries + ray_cache.maxsize)
+        self.assertIs(analyses.setup_exit_pupil_coords(self.opm, fld, wvl,
+                                                       foc, pkg),
+                      ref_sphere)
+        self.assertIs(analyses.get_chief_ray_pkg(self.opm, fld, wvl, foc),
+                      pkg)
+
+    def test_invalidation(self):
+        fld, wvl, foc = self.osp.lookup_fld_wvl_focus(2)
+        aim_pt = trace.aim_chief_ray(self.opm, fld, wvl)
+        pkg = analyses.get_chief_ray_pkg(self.opm, fld, wvl, foc)
+        revision = self.osp.ray_cache.revision
+
+        self.opm.seq_model.gaps[3].thi += 1.0
+        self.opm.update_model()
+        self.assertGreater(self.osp.ray_cache.revision, revision)
+        self.assertIsNot(analyses.get_chief_ray_pkg(self.opm, fld, wvl, foc),
+                         pkg)
+
+        self.opm.seq_model.gaps[3].thi -= 1.0
+        self.opm.update_model()
+        # the aim point is re-aimed from the shifted one; with the object at
+        # 1e12 the stop intercept only changes in ~1.7e-5 steps of the aim
+        npt.assert_allclose(trace.aim_chief_ray(self.opm, fld, wvl), aim_pt,
+                            atol=2e-5)
+
+
+class IncrementalUpdateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        self.sm = self.opm.seq_model
+
+    def update_and_compare(self):
+        """ returns the number of fields aimed by an incremental update """
+        with mock.patch.object(trace, 'iterate_rays',
+                               wraps=trace.iterate_rays) as iterate_rays:
+            self.opm.update_model()
+        fields = self.opm.optical_spec.field_of_view.fields
+        tfrms = self.sm.gbl_tfrms, self.sm.lcl_tfrms
+        aim_pts = [fld.aim_pt for fld in fields]
+        rndx = self.sm.rndx
+
+        self.sm.update_model(incremental=False)
+        for tfrm_inc, tfrm_full in zip(tfrms, (self.sm.gbl_tfrms,
+                                               self.sm.lcl_tfrms)):
+            for (r_inc, t_inc), (r, t) in zip(tfrm_inc, tfrm_full):
+                npt.assert_allclose(r_inc, r, atol=1e-14)
+                npt.assert_allclose(t_inc, t, atol=1e-12)
+        for aim_pt, fld in zip(aim_pts, fields):
+            npt.assert_allclose(aim_pt, fld.aim_pt, atol=1e-12)
+        self.assertEqual(rndx, self.sm.rndx)
+        return sum(len(call.args[3]) for call in iterate_rays.call_args_list)
+
+    def test_change_after_stop(self):
+        self.sm.gaps[self.sm.stop_surface].thi += 0.5
+        self.sm.ifcs[-2].profile.cv += 1e-3
+        self.assertEqual(self.update_and_compare(), 0)
+
+    def test_change_before_stop(self):
+        self.sm.gaps[2].thi += 0.3
+        num_flds = len(self.opm.optical_spec.field_of_view.fields)
+        self.assertEqual(self.update_and_compare(), num_flds)
+
+
+class DispersionCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        self.sm = self.opm.seq_model
+        self.cache = self.sm._dispersion_cache
+
+    def test_rindex_table(self):
+        wvls = np.linspace(450., 700., 201)
+        table = self.sm.rindex_table(wvls)
+        self.assertEqual(table.shape, (len(self.sm.ifcs), len(wvls)))
+        for g, rndx in zip(self.sm.gaps, table):
+            npt.assert_array_equal(rndx, [g.medium.rindex(w) for w in wvls])
+        media = {medium.dispersion_key(g.medium) for g in self.sm.gaps}
+        self.assertLess(len(media), len(self.sm.gaps))
+        # all of the gaps are found the second time
+        misses = self.cache.misses
+        npt.assert_array_equal(self.sm.rindex_table(wvls), table)
+        self.assertEqual(self.cache.misses, misses)
+
+    def test_model_edits(self):
+        self.sm.gaps[2].thi += 0.5
+        misses = self.cache.misses
+        self.sm.update_model(incremental=False)
+        self.assertEqual(self.cache.misses, misses)
+
+        glass = medium.Glass(1.62, 36.4, 'F2')
+        self.sm.gaps[3].medium = glass
+        self.opm.update_model()
+        self.assertEqual(self.cache.misses, misses + 1)
+        glass.update(1.63, 36.4)
+        self.opm.update_model()
+        self.assertEqual(self.cache.misses, misses + 2)
+        self.assertEqual(self.sm.rndx[3],
+                         [glass.rindex(w) for w in self.sm.wvlns])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare the array samplers against the sample generators
+
+"""
+
+
+import unittest
+import numpy as np
+import numpy.testing as npt
+
+from rayoptics.raytr import sampler
+
+
+class SamplerTestCase(unittest.TestCase):
+    def test_matches_generators(self):
+        grid_def = [np.array([-1., -1.]), np.array([1., 1.]), 21]
+        npt.assert_array_equal(
+            sampler.grid_samples(grid_def),
+            np.array(list(sampler.grid_ray_generator(grid_def))))
+        npt.assert_allclose(
+            sampler.csd_grid_samples(grid_def),
+            np.array(list(sampler.csd_grid_ray_generator(grid_def))),
+            atol=1e-15)
+        npt.assert_array_equal(
+            sampler.R_2_samples(50),
+            np.array(list(sampler.R_2_quasi_random_generator(50))))
+        u = sampler.halton_samples(100, seed=1)
+        npt.assert_allclose(
+            sampler.concentric_sample_disk_many(u),
+            [sampler.concentric_sample_disk(ui) for ui in u], atol=1e-15)
+
+    def test_sequences(self):
+        for samples in (sampler.sobol_samples(256, seed=1),
+                        sampler.halton_samples(256, seed=1),
+                        sampler.R_2_samples(256),
+                        sampler.jittered_samples(16, seed=1)):
+            self.assertEqual(samples.shape, (256, 2))
+            self.assertTrue(np.all((samples >= 0) & (samples < 1)))
+            # every cell of an 8x8 grid is sampled
+            cells = np.floor(8*samples).astype(int)
+            self.assertEqual(len(np.unique(8*cells[:, 0] + cells[:, 1])),
+                             64)
+        npt.assert_array_equal(sampler.sobol_samples(64, seed=3),
+                               sampler.sobol_samples(64, seed=3))
+
+    def test_pupil_weights(self):
+        # the mean of r**2 over the unit disk is 1/2; the outer ring at the
+        #  edge of the pupil limits the accuracy to O(1/num_rings)
+        for samples, areas in (
+                (sampler.hexapolar_samples(32), sampler.hexapolar_areas(32)),
+                (sampler.ring_samples(32, 24), sampler.ring_areas(32, 24)),
+                (sampler.ring_samples(32, 24, equal_area=False),
+                 sampler.ring_areas(32, 24, equal_area=False))):
+            self.assertEqual(len(samples), len(areas))
+            self.assertAlmostEqual(np.sum(areas), 1.0)
+            wts = sampler.pupil_weights(samples, areas)
+            r2 = np.sum(samples**2, axis=1)
+            self.assertLess(abs(np.dot(wts, r2) - 0.5), 0.01)
+
+        self.assertEqual(len(sampler.hexapolar_samples(3)), 37)
+        # a single central sample covers the whole pupil
+        npt.assert_array_equal(sampler.hexapolar_samples(0), [[0., 0.]])
+        npt.assert_array_equal(sampler.hexapolar_areas(0), [1.])
+        with self.assertRaises(ValueError):
+            sampler.hexapolar_samples(-1)
+        grid = sampler.grid_samples([np.array([-1., -1.]),
+                                     np.array([1., 1.]), 5])
+        wts = sampler.pupil_weights(grid, apodization=lambda x, y: 2.)
+        self.assertEqual(np.count_nonzero(wts), 13)
+        self.assertAlmostEqual(np.sum(wts), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
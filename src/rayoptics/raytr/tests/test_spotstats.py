@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare the spot statistics against direct evaluation of the ray aberrations
+
+"""
+
+
+import unittest
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.raytr import analyses
+from rayoptics.raytr import spotstats as ss
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+class SpotStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+
+    def test_weighted_stats(self):
+        rng = np.random.default_rng(1)
+        abr = rng.normal(0., 0.01, (500, 2)) + [0.1, -0.2]
+        wts = rng.random(500)
+        abr[:10] = np.nan
+        stats = ss.spot_stats(abr, wts)
+        ok = slice(10, None)
+        c = np.average(abr[ok], axis=0, weights=wts[ok])
+        r = np.hypot(*(abr[ok] - c).T)
+        npt.assert_allclose(stats.centroid, c)
+        self.assertAlmostEqual(stats.rms_radius,
+                               np.sqrt(np.average(r**2, weights=wts[ok])))
+        self.assertAlmostEqual(stats.geo_radius, r.max())
+
+        radii = np.linspace(0., 0.03, 7)
+        ee_truth = [np.sum(wts[ok][r <= ri])/np.sum(wts[ok]) for ri in radii]
+        npt.assert_allclose(ss.encircled_energy(abr, radii, wts), ee_truth)
+        hw = np.max(np.abs(abr[ok] - c), axis=1)
+        npt.assert_allclose(ss.ensquared_energy(abr, radii, wts),
+                            [np.sum(wts[ok][hw <= ri])/np.sum(wts[ok])
+                             for ri in radii])
+        r80 = ss.energy_radius(abr, 0.8, wts)
+        self.assertGreaterEqual(ss.encircled_energy(abr, r80, wts)[0], 0.8)
+        self.assertAlmostEqual(ss.energy_radius(abr, 1.0, wts), r.max())
+
+    def test_through_focus(self):
+        focs = [0., 0.05]
+        spot = ss.SpotStatistics.from_ray_lists(
+            [analyses.RayList(self.opm, f=1)])
+        stats = spot.stats(focs)
+        for i, foc in enumerate(focs):
+            rl = analyses.RayList(self.opm, f=1, foc=foc)
+            npt.assert_allclose(spot.abr(foc)[0], rl.ray_abr.T, atol=1e-12)
+            abr = rl.ray_abr.T
+            stats_truth = ss.spot_stats(abr)
+            npt.assert_allclose(stats.centroid[i], stats_truth.centroid,
+                                atol=1e-12)
+            self.assertAlmostEqual(stats.rms_radius[i],
+                                   stats_truth.rms_radius)
+
+        spot = ss.SpotStatistics.from_model(self.opm, fi=1)
+        self.assertEqual(len(spot.bundles), 3)
+        focs = np.linspace(-0.1, 0.1, 5)
+        ee = spot.encircled_energy([0.01, 0.02], foc=focs)
+        self.assertEqual(ee.shape, (5, 2))
+        self.assertTrue(np.all(ee[:, 0] <= ee[:, 1]))
+        r80 = spot.energy_radius(0.8, foc=focs)
+        for foc, r in zip(focs, r80):
+            self.assertAlmostEqual(spot.energy_radius(0.8, foc=foc), r)
+
+    def test_source_focus(self):
+        # the statistics default to the focus shift of the source
+        rl = analyses.RayList(self.opm, f=1, foc=0.05)
+        spot = ss.SpotStatistics.from_ray_lists([rl])
+        self.assertEqual(spot.focus, 0.05)
+        npt.assert_allclose(spot.abr()[0], rl.ray_abr.T, atol=1e-12)
+        self.assertAlmostEqual(spot.stats().rms_radius,
+                               ss.spot_stats(rl.ray_abr.T).rms_radius)
+        # foc is relative to the source focus
+        rl_0 = analyses.RayList(self.opm, f=1, foc=0.)
+        npt.assert_allclose(spot.abr(-0.05)[0], rl_0.ray_abr.T, atol=1e-12)
+
+        self.opm.optical_spec.defocus.focus_shift = 0.05
+        spot = ss.SpotStatistics.from_model(self.opm, fi=1)
+        self.opm.optical_spec.defocus.focus_shift = 0.
+        spot_0 = ss.SpotStatistics.from_model(self.opm, fi=1)
+        self.assertAlmostEqual(spot.stats().rms_radius,
+                               spot_0.stats(0.05).rms_radius)
+        self.assertNotAlmostEqual(spot.stats().rms_radius,
+                                  spot_0.stats().rms_radius)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
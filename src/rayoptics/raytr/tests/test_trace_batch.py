@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare the batched ray trace against the single ray trace
+
+"""
+
+
+import unittest
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.raytr import raytrace as rt
+from rayoptics.raytr import trace
+from rayoptics.raytr import analyses
+from rayoptics.raytr.opticalspec import Field
+from rayoptics.raytr import traceerror as terr
+from rayoptics.raytr.traceerror import (TraceError, TraceMissedSurfaceError,
+                                        TraceTIRError, TraceRayBlockedError)
+from rayoptics.elem.surface import Circular, Rectangular
+from rayoptics.mpl.axisarrayfigure import eval_spot_grid
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+def grid_rays(opm, fi, num_rays, pupil_max=1.0):
+    osp = opm.optical_spec
+    fld, wvl, foc = osp.lookup_fld_wvl_focus(fi)
+    fod = osp.parax_data.fod
+    pt0 = osp.obj_coords(fld)
+    xs = np.linspace(-pupil_max, pupil_max, num_rays)
+    x, y = np.meshgrid(xs, xs)
+    pt1 = np.column_stack([fod.enp_radius*x.ravel(), fod.enp_radius*y.ravel(),
+                           np.full(x.size, fod.obj_dist+fod.enp_dist)])
+    dirs = pt1 - pt0
+    dirs /= np.linalg.norm(dirs, axis=1)[:, np.newaxis]
+    return pt0, dirs, wvl
+
+
+class TraceBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        self.sm = self.opm.seq_model
+
+    def test_matches_single_ray_trace(self):
+        num_flds = len(self.opm.optical_spec.field_of_view.fields)
+        for fi in range(num_flds):
+            pt0, dirs, wvl = grid_rays(self.opm, fi, 11)
+            rays = rt.trace_batch(self.sm, pt0, dirs, wvl)
+            self.assertEqual(rays.pt.shape,
+                             (len(dirs), len(self.sm.ifcs), 3))
+            for i, d in enumerate(dirs):
+                try:
+                    ray, op, wvl = rt.trace(self.sm, pt0, d, wvl)
+                except TraceError:
+                    self.assertNotEqual(rays.status[i], terr.TRACE_OK)
+                    continue
+                self.assertEqual(rays.status[i], terr.TRACE_OK)
+                # the object at infinity limits the agreement of the two
+                #  traces to a few parts in 1e16 of the object distance
+                npt.assert_allclose(rays.pt[i], [r[0] for r in ray],
+                                    rtol=1e-6, atol=1e-4)
+                npt.assert_allclose(rays.dir[i], [r[1] for r in ray],
+                                    atol=1e-6)
+                npt.assert_allclose(rays.dst[i], [r[2] for r in ray],
+                                    rtol=1e-9, atol=1e-4)
+                self.assertAlmostEqual(rays.op[i], op, places=4)
+
+    def test_failure_status(self):
+        pt0, dirs, wvl = grid_rays(self.opm, 0, 9, pupil_max=3.0)
+        rays = rt.trace_batch(self.sm, pt0, dirs, wvl)
+        codes = {TraceMissedSurfaceError: terr.TRACE_MISSED,
+                 TraceTIRError: terr.TRACE_TIR}
+        num_failed = 0
+        for i, d in enumerate(dirs):
+            try:
+                rt.trace(self.sm, pt0, d, wvl)
+            except TraceError as ray_error:
+                num_failed += 1
+                self.assertEqual(rays.status[i], codes[type(ray_error)])
+                self.assertEqual(rays.fail_surf[i], ray_error.surf)
+                self.assertTrue(np.isnan(rays.op[i]))
+            else:
+                self.assertEqual(rays.fail_surf[i], -1)
+        self.assertGreater(num_failed, 0)
+
+    def test_ray_stream(self):
+        pt0, dirs, wvl = grid_rays(self.opm, 2, 11, pupil_max=1.2)
+        pts0 = np.broadcast_to(pt0, dirs.shape)
+        wvls = np.array(self.sm.wvlns)[np.arange(len(dirs)) % 3]
+        chunks = list(analyses.trace_ray_stream(self.opm, (pts0, dirs, wvls),
+                                                chunk_size=50))
+        self.assertEqual([len(c.pt) for c in chunks], [50, 50, 21])
+        last = rt.BatchRayPkg(*(np.concatenate(a) for a in zip(*chunks)))
+        for w in self.sm.wvlns:
+            rays = rt.trace_batch(self.sm, pts0[wvls == w], dirs[wvls == w],
+                                  w)
+            npt.assert_array_equal(last.status[wvls == w], rays.status)
+            npt.assert_array_equal(last.pt[wvls == w], rays.pt[:, -1])
+            npt.assert_array_equal(last.op[wvls == w], rays.op)
+
+        ray_list = analyses.trace_list_of_rays(self.opm,
+                                               zip(pts0, dirs, wvls), 'last')
+        hist = np.zeros(5)
+
+        def histogram(chunk):
+            ok = chunk.status == terr.TRACE_OK
+            hist[:] += np.histogram(chunk.pt[ok, -1, 1], bins=5,
+                                    range=(-30., 30.))[0]
+
+        results = analyses.trace_ray_stream(self.opm, zip(pts0, dirs, wvls),
+                                            chunk_size=32,
+                                            output_filter=histogram)
+        self.assertEqual(list(results), [])
+        ys = [r[0][0][1] for r in ray_list if r is not None]
+        npt.assert_array_equal(hist, np.histogram(ys, bins=5,
+                                                  range=(-30., 30.))[0])
+
+    def test_aperture_clipping(self):
+        self.sm.ifcs[1].clear_apertures.append(Circular(radius=22.))
+        self.sm.ifcs[11].clear_apertures.append(
+            Rectangular(x_half_width=18., y_half_width=16., y_offset=1.,
+                        rotation=10.))
+        osp = self.opm.optical_spec
+        fld, wvl, foc = osp.lookup_fld_wvl_focus(2)
+        pupil = analyses.grid_pupil_coords(
+            [np.array([-1., -1.]), np.array([1., 1.]), 21]).reshape(-1, 2)
+        inside = (pupil[:, 0]**2 + pupil[:, 1]**2) < 1.0
+        unclipped = trace.trace_bundle(self.opm, pupil, fld, wvl)
+        osp.clip_apertures = True
+        rays = trace.trace_bundle(self.opm, pupil, fld, wvl)
+        self.assertEqual(set(rays.fail_surf[inside]), {-1, 1, 11})
+        self.assertGreater(np.count_nonzero(unclipped.valid),
+                           np.count_nonzero(rays.valid))
+        for i in np.flatnonzero(inside):
+            try:
+                trace.trace_base(self.opm, pupil[i], fld, wvl,
+                                 clip_apertures=True)
+            except TraceRayBlockedError as ray_error:
+                self.assertEqual(rays.status[i], terr.TRACE_BLOCKED)
+                self.assertEqual(rays.fail_surf[i], ray_error.surf)
+                ifc = self.sm.ifcs[ray_error.surf]
+                self.assertFalse(ifc.points_inside(*unclipped.pt[i,
+                                                   ray_error.surf, :2]))
+            else:
+                self.assertEqual(rays.status[i], terr.TRACE_OK)
+                npt.assert_allclose(rays.pt[i], unclipped.pt[i])
+
+    def test_compiled_path_cache(self):
+        wvl = self.sm.central_wavelength()
+        path = self.sm.compiled_path(wvl)
+        self.assertIs(self.sm.compiled_path(wvl), path)
+        self.assertEqual(len(path), len(self.sm.ifcs))
+        pt0, d0 = np.array([0., 10., 0.]), np.array([0., 0., 1.])
+        ray, op, wvl = rt.trace(self.sm, pt0, d0, wvl)
+
+        self.sm.gaps[3].thi += 1.0
+        self.opm.update_model()
+        self.assertIsNot(self.sm.compiled_path(wvl), path)
+        ray_new, op, wvl = rt.trace(self.sm, pt0, d0, wvl)
+        self.assertNotAlmostEqual(ray_new[-1][0][1], ray[-1][0][1])
+
+
+class IterateRaysTestCase(unittest.TestCase):
+    def test_matches_iterate_ray(self):
+        opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        sm = opm.seq_model
+        wvl = sm.central_wavelength()
+        stop = sm.stop_surface
+        flds = [Field(x=x, y=y) for x, y in
+                [(0., 0.), (0., 14.), (5., 5.), (-10., 3.)]]
+        r = 0.9*sm.ifcs[stop].surface_od()
+        targets = np.array([[0., 0.], [0., r], [r, 0.], [0., -r]])
+        flds = [f for f in flds for _ in targets]
+        targets = np.tile(targets, (4, 1))
+
+        aim_pts = trace.iterate_rays(opm, stop, targets, flds, wvl)
+        for aim_pt, target, fld in zip(aim_pts, targets, flds):
+            aim_pt_truth = trace.iterate_ray(opm, stop, target, fld, wvl)
+            # the object at infinity limits the precision of the aim points
+            npt.assert_allclose(aim_pt, aim_pt_truth, atol=1e-4)
+
+    def test_aim_chief_rays(self):
+        opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        fields = opm.optical_spec.field_of_view.fields
+        aim_pts = [fld.aim_pt for fld in fields]
+        opm.optical_spec.ray_cache.invalidate()
+        for aim_pt, aim_pt_new in zip(aim_pts,
+                                      trace.aim_chief_rays(opm, fields)):
+            npt.assert_allclose(aim_pt_new, aim_pt, atol=1e-4)
+
+
+class RayBundleTestCase(unittest.TestCase):
+    def test_ray_grid(self):
+        opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        osp = opm.optical_spec
+        fld, wvl, foc = osp.lookup_fld_wvl_focus(1)
+        num = 11
+        grid_def = [np.array([-1., -1.]), np.array([1., 1.]), num]
+        grid = analyses.trace_ray_grid(opm, grid_def, fld, wvl, foc)
+        num_ifcs = len(opm.seq_model.ifcs)
+        self.assertEqual(grid.shape, (num, num))
+        self.assertEqual(grid.pt.shape, (num*num, num_ifcs, 3))
+        self.assertEqual(len(grid), num)
+
+        num_valid = 0
+        for row in grid:
+            self.assertEqual(len(row), num)
+            for pupil_x, pupil_y, ray_pkg in row:
+                if pupil_x**2 + pupil_y**2 >= 1.0:
+                    self.assertIsNone(ray_pkg)
+                    continue
+                num_valid += 1
+                ray, op, wvl = trace.trace_base(opm, [pupil_x, pupil_y],
+                                                fld, wvl)
+                self.assertEqual(len(ray_pkg.ray), num_ifcs)
+                npt.assert_allclose(ray_pkg.ray[-1].p, ray[-1][0],
+                                    atol=1e-6)
+                npt.assert_allclose(ray_pkg.ray[-1].d, ray[-1][1],
+                                    atol=1e-6)
+        self.assertEqual(np.count_nonzero(grid.valid), num_valid)
+
+        rows = analyses.trace_ray_grid(opm, grid_def, fld, wvl, foc,
+                                       append_if_none=False)
+        self.assertEqual(sum(len(row) for row in rows), num_valid)
+
+    def test_spot_grid_failed_rays(self):
+        # without vignetting, rays of the 35 deg field fail inside the pupil
+        opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        fld = opm.optical_spec.field_of_view.fields[2]
+        fld.y = 35.
+        fld.vux = fld.vuy = fld.vlx = fld.vly = 0.
+        opm.update_model()
+        grid_def = [np.array([-1., -1.]), np.array([1., 1.]), 21]
+        pupil = analyses.grid_pupil_coords(grid_def)
+        num_inside = np.count_nonzero(np.sum(pupil**2, axis=-1) < 1.0)
+        grids, rc = eval_spot_grid(opm, 2, None)
+        for spots in grids:
+            self.assertEqual(spots.dtype, np.float64)
+            self.assertEqual(spots.ndim, 2)
+            self.assertEqual(spots.shape[1], 2)
+            self.assertLess(len(spots), num_inside)
+            self.assertTrue(np.all(np.isfinite(spots)))
+
+        # the row bundles of trace_ray_grid leave out the failed rays too
+        fld, wvl, foc = opm.optical_spec.lookup_fld_wvl_focus(2)
+        grid = analyses.trace_ray_grid(opm, grid_def, fld, wvl, foc)
+        failed = np.count_nonzero((grid.status != terr.TRACE_OK) &
+                                  (grid.status != terr.TRACE_BLOCKED))
+        self.assertGreater(failed, 0)
+        rows = analyses.trace_ray_grid(opm, grid_def, fld, wvl, foc,
+                                       append_if_none=False)
+        self.assertEqual(sum(len(row) for row in rows),
+                         np.count_nonzero(grid.valid))
+        for row in rows:
+            self.assertTrue(np.all(row.valid))
+
+
+class RefocusTestCase(unittest.TestCase):
+    def test_focus_wavefront(self):
+        opm = open_model(root_pth/'codev/tests/paraboloid_f8.seq')
+        osp = opm.optical_spec
+        fod = osp.parax_data.fod
+        fld, wvl, foc = osp.lookup_fld_wvl_focus(1)
+        grid_pkg = analyses.trace_wavefront(opm, fld, wvl, foc, num_rays=9)
+        grid, upd_grid = grid_pkg
+        convert_to_opd = 1/opm.nm_to_sys_units(wvl)
+        for foc in [0., 0.05]:
+            opd = analyses.focus_wavefront(opm, grid_pkg, fld, wvl, foc)
+            self.assertEqual(opd.shape, (9, 9, 3))
+            cr_pkg = analyses.get_chief_ray_pkg(opm, fld, wvl, foc)
+            ref_sphere = analyses.setup_exit_pupil_coords(opm, fld, wvl, foc,
+                                                          cr_pkg)
+            for i, row in enumerate(grid):
+                for j, (pupil_x, pupil_y, ray_pkg) in enumerate(row):
+                    if ray_pkg is None:
+                        self.assertTrue(np.isnan(opd[i, j, 2]))
+                        continue
+                    opd_truth = analyses.wave_abr_full_calc(
+                        fod, fld, wvl, foc, ray_pkg, cr_pkg, ref_sphere)
+                    self.assertAlmostEqual(opd[i, j, 2],
+                                           convert_to_opd*opd_truth)
+
+        fan = analyses.RayFan(opm, f=1, foc=0.05)
+        fan_truth = analyses.eval_fan(opm, fld, wvl, 0.05, 1)
+        for (p, val), (p_truth, val_truth) in zip(fan.fan, fan_truth):
+            npt.assert_allclose(p, p_truth)
+            npt.assert_allclose(val, val_truth, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the ray trace instrumentation
+
+"""
+
+
+import unittest
+from pathlib import Path
+import numpy as np
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.raytr import trace
+from rayoptics.raytr import tracestats
+from rayoptics.raytr import traceerror as terr
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+class TraceStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.opm = open_model(root_pth/'optical/tests/cell_phone_camera.roa')
+        osp = self.opm.optical_spec
+        self.fld, self.wvl, foc = osp.lookup_fld_wvl_focus(1)
+        x, y = np.meshgrid(np.linspace(-1., 1., 9), np.linspace(-1., 1., 9))
+        self.pupil = np.column_stack([x.ravel(), y.ravel()])
+
+    def test_collect(self):
+        with tracestats.collect() as stats:
+            bundle = trace.trace_bundle(self.opm, self.pupil,
+                                        self.fld, self.wvl)
+        self.assertIsNone(tracestats.current)
+        num_traced = np.count_nonzero(bundle.status != terr.TRACE_BLOCKED)
+        self.assertEqual(stats.rays, num_traced)
+
+        # the aspheres are intersected iteratively
+        self.assertGreater(len(stats.iterations), 0)
+        for surf, mean_iter in stats.mean_iterations().items():
+            self.assertGreater(mean_iter, 1.)
+
+        tir = bundle.status == terr.TRACE_TIR
+        self.assertTrue(tir.any())
+        failures = sum(c[terr.TraceTIRError.__name__]
+                       for c in stats.failures.values())
+        self.assertEqual(failures, np.count_nonzero(tir))
+        self.assertEqual(stats.timings['trace.trace_bundle'][0], 1)
+        self.assertIn('TraceTIRError', stats.summary())
+
+        # statistics accumulate in an existing collector
+        with tracestats.collect(stats):
+            with self.assertRaises(terr.TraceTIRError) as cm:
+                trace.trace_base(self.opm, [0., 0.5], self.fld, self.wvl)
+        self.assertEqual(stats.rays, num_traced + 1)
+        self.assertEqual(stats.failures[cm.exception.surf]['TraceTIRError'],
+                         np.count_nonzero(bundle.fail_surf[tir] ==
+                                          cm.exception.surf) + 1)
+
+        # nothing is recorded without an active collector
+        trace.trace_bundle(self.opm, self.pupil, self.fld, self.wvl)
+        self.assertEqual(stats.rays, num_traced + 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
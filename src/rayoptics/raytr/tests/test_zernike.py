@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test the Zernike orderings and the least squares wavefront fits
+
+"""
+
+
+import unittest
+from pathlib import Path
+import numpy as np
+import numpy.testing as npt
+
+import rayoptics
+from rayoptics.gui.appcmds import open_model
+from rayoptics.raytr import analyses
+from rayoptics.raytr import zernike as zk
+
+root_pth = Path(rayoptics.__file__).resolve().parent
+
+
+def synthetic_wavefront(basis, coefs, num_rays):
+    xs = np.linspace(-1., 1., num_rays)
+    x, y = np.meshgrid(xs, xs, indexing='ij')
+    opd = basis.evaluate(coefs, x, y)
+    opd[x**2 + y**2 >= 1.] = np.nan
+    return np.stack([x, y, opd], axis=-1)
+
+
+class ZernikeTestCase(unittest.TestCase):
+    def test_orderings(self):
+        fringe = zk.fringe_indices(37)
+        self.assertEqual(fringe[:9], [(0, 0), (1, 1), (1, -1), (2, 0),
+                                      (2, 2), (2, -2), (3, 1), (3, -1),
+                                      (4, 0)])
+        self.assertEqual(fringe[15], (6, 0))
+        self.assertEqual(fringe[36], (12, 0))
+        noll = zk.noll_indices(22)
+        self.assertEqual(noll[3:11], [(2, 0), (2, -2), (2, 2), (3, -1),
+                                      (3, 1), (3, -3), (3, 3), (4, 0)])
+        self.assertEqual(noll[21], (6, 0))
+
+        # the Noll terms are orthonormal over the unit disk
+        xs = np.linspace(-1., 1., 401)
+        x, y = np.meshgrid(xs, xs)
+        inside = x**2 + y**2 <= 1.
+        a = zk.basis_matrix(x[inside], y[inside], noll, normalize=True)
+        npt.assert_allclose(a.T.dot(a)/len(a), np.eye(len(noll)), atol=0.01)
+
+    def test_fit(self):
+        rng = np.random.default_rng(0)
+        for ordering in zk.orderings:
+            basis = zk.ZernikeBasis(37, ordering)
+            coefs = rng.normal(size=(3, 37))
+            wavefronts = [synthetic_wavefront(basis, c, 32) for c in coefs]
+            npt.assert_allclose(basis.fit(wavefronts[0]), coefs[0],
+                                atol=1e-9)
+            npt.assert_allclose(basis.fit_many(wavefronts), coefs, atol=1e-9)
+            self.assertEqual(len(basis._cache), 1)
+
+    def test_fit_wavefront(self):
+        opm = open_model(root_pth/'codev/tests/ag_dblgauss.seq')
+        osp = opm.optical_spec
+        fld, wvl, foc = osp.lookup_fld_wvl_focus(1)
+        basis = zk.get_zernike_basis(37)
+        grid_pkg = analyses.trace_wavefront(opm, fld, wvl, 0., num_rays=32)
+        wavefronts = [analyses.focus_wavefront(opm, grid_pkg, fld, wvl, foc)
+                      for foc in (0., 0.01, 0.02)]
+        coefs = basis.fit(wavefronts[0])
+        npt.assert_allclose(coefs, zk.fit_wavefront(opm, fld, wvl, 0.,
+                                                    num_rays=32))
+        self.assertLess(basis.residual_rms(wavefronts[0], coefs),
+                        0.01*np.nanstd(wavefronts[0][..., 2]))
+
+        # refocusing changes the defocus term, using the same basis matrix
+        coefs = basis.fit_many(wavefronts)
+        self.assertEqual(len(basis._cache), 1)
+        npt.assert_allclose(coefs[2, 3] - coefs[1, 3],
+                            coefs[1, 3] - coefs[0, 3], rtol=0.01)
+        self.assertGreater(abs(coefs[1, 3] - coefs[0, 3]), 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -15,13 +15,13 @@ import numpy as np
 from numpy.linalg import norm
 from scipy.optimize import newton, fsolve
 from collections import namedtuple
-import pandas as pd
 import attr
 
 from . import raytrace as rt
-from .analyses import (wave_abr_full_calc,
-                       get_chief_ray_pkg,
-                       setup_exit_pupil_coords)
+from . import traceerror as terr
+from . import tracestats
+from .raybundle import RayBundle
+from . import analyses
 from rayoptics.optical import model_constants as mc
 from .traceerror import TraceError, TraceMissedSurfaceError, TraceTIRError
 from rayoptics.util.misc_math import normalize
@@ -33,11 +33,13 @@ RaySeg = namedtuple('RaySeg', ['p', 'd', 'dst', 'nrml'])
 
 def ray_pkg(ray_pkg):
     """ return a |Series| containing a ray package (RayPkg) """
+    import pandas as pd
     return pd.Series(ray_pkg, index=['ray', 'op', 'wvl'])
 
 
 def ray_df(ray):
     """ return a |DataFrame| containing ray data """
+    import pandas as pd
     r = pd.DataFrame(ray, columns=['inc_pt', 'after_dir',
                                    'after_dst', 'normal'])
     r.index.names = ['intrfc']
@@ -152,6 +154,77 @@ def trace_base(opt_model, pupil, fld, wvl, **kwargs):
     return rt.trace(opt_model.seq_model, pt0, dir0, wvl, **kwargs)
 
 
+@tracestats.timed
+def trace_bundle(opt_model, pupil_coords, fld, wvl, pupil_filter=True,
+                 shape=None, **kwargs):
+    """Trace an array of rays specified by relative aperture at a field point.
+
+    This is the batched counterpart to :func:`trace_base`.
+
+    Args:
+        opt_model: instance of :class:`~.OpticalModel` to trace
+        pupil_coords: (N, 2) array of relative pupil coordinates of the rays
+        fld: instance of :class:`~.Field`
+        wvl: ray trace wavelength in nm
+        pupil_filter: if True, rays outside the unit circle are not traced
+                      and are given a status of
+                      :data:`~.traceerror.TRACE_BLOCKED` at interface 0
+        shape: logical shape of the bundle, see :class:`~.RayBundle`
+        **kwargs: keyword arguments passed to
+                  :func:`~.raytrace.trace_batch`
+
+    Returns:
+        a :class:`~.raybundle.RayBundle` of the traced rays
+
+    Unless the clip_apertures keyword argument is given, the rays are
+    clipped by the clear apertures if :attr:`~.OpticalSpecs.clip_apertures`
+    is True; the **fail_surf** of a clipped ray is the blocking interface.
+    """
+    if not isinstance(pupil_coords, np.ndarray):
+        pupil_coords = list(pupil_coords)
+    pupil = np.array(pupil_coords, dtype=float).reshape(-1, 2)
+    osp = opt_model.optical_spec
+    fod = osp.parax_data.fod
+    eprad = fod.enp_radius
+    aim_pt = np.array([0., 0.])
+    if hasattr(fld, 'aim_pt') and fld.aim_pt is not None:
+        aim_pt = fld.aim_pt
+
+    # vectorized Field.apply_vignetting()
+    vig_pupil = pupil.copy()
+    vig_pupil[:, 0] *= np.where(pupil[:, 0] < 0.0, 1.0 - fld.vlx,
+                                1.0 - fld.vux)
+    vig_pupil[:, 1] *= np.where(pupil[:, 1] < 0.0, 1.0 - fld.vly,
+                                1.0 - fld.vuy)
+
+    inside = np.ones(len(pupil), dtype=bool)
+    if pupil_filter:
+        inside = (pupil[:, 0]**2 + pupil[:, 1]**2) < 1.0
+    pt1 = np.column_stack([eprad*vig_pupil[inside] + aim_pt,
+                           np.full(np.count_nonzero(inside),
+                                   fod.obj_dist+fod.enp_dist)])
+    pt0 = osp.obj_coords(fld)
+    dir0 = pt1 - pt0
+    dir0 /= norm(dir0, axis=1)[:, np.newaxis]
+    kwargs.setdefault('clip_apertures', osp.clip_apertures)
+    rays = rt.trace_batch(opt_model.seq_model, pt0, dir0, wvl, **kwargs)
+
+    if inside.all():
+        return RayBundle.from_batch(rays, pupil, shape=shape)
+
+    def expand(a):
+        full = np.full((len(pupil),) + a.shape[1:], np.nan, dtype=a.dtype)
+        full[inside] = a
+        return full
+    status = np.full(len(pupil), terr.TRACE_BLOCKED)
+    status[inside] = rays.status
+    fail_surf = np.zeros(len(pupil), dtype=int)
+    fail_surf[inside] = rays.fail_surf
+    return RayBundle(pupil, expand(rays.pt), expand(rays.dir),
+                     expand(rays.dst), expand(rays.nrml), expand(rays.op),
+                     wvl, status=status, fail_surf=fail_surf, shape=shape)
+
+
 def iterate_ray(opt_model, ifcx, xy_target, fld, wvl, **kwargs):
     """ iterates a ray to xy_target on interface ifcx, returns aim points on
     the paraxial entrance pupil plane
@@ -231,13 +304,115 @@ def iterate_ray(opt_model, ifcx, xy_target, fld, wvl, **kwargs):
     return start_coords
 
 
+@tracestats.timed
+def iterate_rays(opt_model, ifcx, xy_targets, flds, wvl, start_coords=None,
+                 tol=1e-12, max_iter=20):
+    """ iterates a batch of rays to xy_targets on interface ifcx, returns aim
+    points on the paraxial entrance pupil plane
+
+    All of the rays are iterated together using Newton's method. The
+    Jacobian is found by finite differences, tracing the perturbed rays in
+    the same batch as the current estimates. Rays that fail to trace or
+    converge are handed to :func:`iterate_ray`.
+
+    Args:
+        opt_model: :class:`~.OpticalModel` instance
+        ifcx: index of the target interface, None for a floating stop
+        xy_targets: (N, 2) array of target coordinates on interface ifcx
+        flds: list of N :class:`~.Field` instances, one per ray
+        wvl: wavelength in nm
+        start_coords: (N, 2) array of initial aim points, e.g. the previous
+                      results
+        tol: convergence tolerance, relative to the entrance pupil radius
+        max_iter: maximum number of Newton iterations
+
+    Returns:
+        (N, 2) array of aim points
+    """
+    xy_targets = np.array(xy_targets, dtype=float).reshape(-1, 2)
+    num_rays = len(xy_targets)
+    if ifcx is None:  # floating stop surface - use entrance pupil for aiming
+        return xy_targets.copy()
+
+    osp = opt_model.optical_spec
+    fod = osp.parax_data.fod
+    dist = fod.obj_dist + fod.enp_dist
+    pt0s = np.array([osp.obj_coords(fld) for fld in flds], dtype=float)
+    coords = (np.zeros((num_rays, 2)) if start_coords is None
+              else np.array(start_coords, dtype=float).reshape(-1, 2))
+    # iterate in y only if field and target points are zero in x
+    y_only = (pt0s[:, 0] == 0.0) & (xy_targets[:, 0] == 0.0)
+    coords[y_only, 0] = 0.0
+
+    path = opt_model.seq_model.compiled_path(wvl, stop=ifcx+1)
+    step = 1e-3*fod.enp_radius
+    offsets = np.array([[0., 0.], [step, 0.], [0., step]])
+
+    active = np.arange(num_rays)
+    failed = np.zeros(num_rays, dtype=bool)
+    best_coords = coords.copy()
+    best_resid = np.full(num_rays, np.inf)
+    for i in range(max_iter):
+        if len(active) == 0:
+            break
+        # trace the current estimates and the x and y perturbed rays
+        pt1 = coords[active, np.newaxis, :] + offsets
+        pt1 = np.concatenate([pt1, np.full(pt1.shape[:2] + (1,), dist)],
+                             axis=2).reshape(-1, 3)
+        pt0 = np.repeat(pt0s[active], 3, axis=0)
+        dir0 = pt1 - pt0
+        dir0 /= norm(dir0, axis=1)[:, np.newaxis]
+        rays = rt.trace_raw_batch(path, pt0, dir0, wvl)
+        xy = rays.pt[:, ifcx, :2].reshape(-1, 3, 2)
+
+        resid = xy[:, 0] - xy_targets[active]
+        jac = np.stack([xy[:, 1] - xy[:, 0], xy[:, 2] - xy[:, 0]],
+                       axis=2)/step
+        det = jac[:, 0, 0]*jac[:, 1, 1] - jac[:, 0, 1]*jac[:, 1, 0]
+        y1d = y_only[active]
+        bad = ~np.isfinite(resid).all(axis=1)
+        bad |= np.where(y1d, jac[:, 1, 1] == 0.0, det == 0.0)
+        bad |= ~np.isfinite(jac).all(axis=(1, 2))
+
+        # the precision of a trace from a distant object point limits the
+        #  residual; an iteration that doesn't improve on the best residual
+        #  has reached that limit, unless it is far from the target
+        resid_norm = norm(resid, axis=1)
+        improved = resid_norm < best_resid[active]
+        best_coords[active[improved]] = coords[active[improved]]
+        best_resid[active[improved]] = resid_norm[improved]
+        stalled = ~bad & ~improved
+        bad |= stalled & (best_resid[active] > 1e-6*fod.enp_radius)
+        failed[active[bad]] = True
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = np.stack([(jac[:, 1, 1]*resid[:, 0] -
+                               jac[:, 0, 1]*resid[:, 1])/det,
+                              (jac[:, 0, 0]*resid[:, 1] -
+                               jac[:, 1, 0]*resid[:, 0])/det], axis=1)
+            delta[y1d] = np.column_stack([np.zeros(np.count_nonzero(y1d)),
+                                          resid[y1d, 1]/jac[y1d, 1, 1]])
+        update = ~bad & improved
+        coords[active[update]] -= delta[update]
+        converged = norm(delta, axis=1) <= tol*fod.enp_radius
+        best_coords[active[update & converged]] = \
+            coords[active[update & converged]]
+        active = active[~bad & ~stalled & ~converged]
+
+    coords = best_coords
+    failed[active] = True
+    for j in np.flatnonzero(failed):
+        coords[j] = iterate_ray(opt_model, ifcx, xy_targets[j], flds[j], wvl)
+    return coords
+
+
 def trace_with_opd(opt_model, pupil, fld, wvl, foc, **kwargs):
     """ returns (ray, ray_opl, wvl, opd) """
-    chief_ray_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
+    chief_ray_pkg = analyses.get_chief_ray_pkg(opt_model, fld, wvl, foc)
     image_pt_2d = None if 'image_pt' not in kwargs else kwargs['image_pt'][:2]
-    ref_sphere = setup_exit_pupil_coords(opt_model, fld, wvl, foc,
-                                         chief_ray_pkg,
-                                         image_pt_2d=image_pt_2d)
+    ref_sphere = analyses.setup_exit_pupil_coords(opt_model, fld, wvl, foc,
+                                                  chief_ray_pkg,
+                                                  image_pt_2d=image_pt_2d)
 
     ray, op, wvl = trace_base(opt_model, pupil, fld, wvl, **kwargs)
     # opl = rt.calc_optical_path(ray, opt_model.seq_model.path())
@@ -247,8 +422,8 @@ def trace_with_opd(opt_model, pupil, fld, wvl, foc, **kwargs):
     fld.ref_sphere = ref_sphere
 
     fod = opt_model.optical_spec.parax_data.fod
-    opd = wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg,
-                             chief_ray_pkg, ref_sphere)
+    opd = analyses.wave_abr_full_calc(fod, fld, wvl, foc, ray_pkg,
+                                      chief_ray_pkg, ref_sphere)
     ray, ray_op, wvl = ray_pkg
     return ray, ray_op, wvl, opd
 
@@ -301,6 +476,7 @@ def trace_ray_list_at_field(opt_model, ray_list, fld, wvl, foc):
 
 def trace_field(opt_model, fld, wvl, foc):
     """ returns a |DataFrame| with the boundary rays for field fld """
+    import pandas as pd
     osp = opt_model.optical_spec
     pupil_rays = osp.pupil.pupil_rays
     rdf_list = trace_ray_list_at_field(opt_model, pupil_rays, fld, wvl, foc)
@@ -311,6 +487,7 @@ def trace_field(opt_model, fld, wvl, foc):
 
 def trace_all_fields(opt_model):
     """ returns a |DataFrame| with the boundary rays for all fields """
+    import pandas as pd
     osp = opt_model.optical_spec
     fld, wvl, foc = osp.lookup_fld_wvl_focus(0)
     fset = []
@@ -365,10 +542,10 @@ def trace_fan(opt_model, fan_rng, fld, wvl, foc, img_filter=None,
 
 def trace_grid(opt_model, grid_rng, fld, wvl, foc, img_filter=None,
                form='grid', append_if_none=True, **kwargs):
-    start = np.array(grid_rng[0])
-    stop = grid_rng[1]
     num = grid_rng[2]
-    step = np.array((stop - start)/(num - 1))
+    coords = analyses.grid_pupil_coords(grid_rng)
+    bundle = trace_bundle(opt_model, coords.reshape(-1, 2), fld, wvl,
+                          **kwargs)
     grid = []
     for i in range(num):
         if form == 'list':
@@ -378,15 +555,17 @@ def trace_grid(opt_model, grid_rng, fld, wvl, foc, img_filter=None,
             working_grid = grid_row
 
         for j in range(num):
-            pupil = np.array(start)
-            if (pupil[0]**2 + pupil[1]**2) < 1.0:
-                ray_pkg = trace_base(opt_model, pupil, fld, wvl, **kwargs)
+            k = i*num + j
+            pupil = coords[i, j]
+            # rays outside the pupil and failed rays have no ray_pkg
+            ray_pkg = bundle.ray_pkg(k)
+            if ray_pkg is not None:
                 if img_filter:
                     result = img_filter(pupil, ray_pkg)
                     working_grid.append(result)
                 else:
                     working_grid.append([pupil[0], pupil[1], ray_pkg])
-            else:  # ray outside pupil
+            else:
                 if img_filter:
                     result = img_filter(pupil, None)
                     if result is not None or append_if_none:
@@ -395,22 +574,55 @@ def trace_grid(opt_model, grid_rng, fld, wvl, foc, img_filter=None,
                     if append_if_none:
                         working_grid.append([pupil[0], pupil[1], None])
 
-            start[1] += step[1]
         if form == 'grid':
             grid.append(grid_row)
-        start[0] += step[0]
-        start[1] = grid_rng[0][1]
     return np.array(grid)
 
 
 def aim_chief_ray(opt_model, fld, wvl=None):
-    """ aim chief ray at center of stop surface and save results on **fld** """
+    """ aim chief ray at center of stop surface and return the aim point
+
+    The aim point is cached for the object point, entrance pupil plane and
+    wavelength until a model update changes the image of the stop.
+    """
+    seq_model = opt_model.seq_model
+    if wvl is None:
+        wvl = seq_model.central_wavelength()
+    return aim_chief_rays(opt_model, [fld], wvl)[0]
+
+
+@tracestats.timed
+def aim_chief_rays(opt_model, flds, wvl=None):
+    """ aim the chief rays of **flds** at the center of the stop surface
+
+    The chief rays that aren't in the ray cache are aimed together by
+    :func:`iterate_rays`, starting from the current aim points of the
+    fields. The aim points are cached for the object point, entrance pupil
+    plane and wavelength until a model update changes the image of the stop.
+
+    Returns:
+        list of aim points, one per field
+    """
     seq_model = opt_model.seq_model
     if wvl is None:
         wvl = seq_model.central_wavelength()
+    osp = opt_model.optical_spec
+    fod = osp.parax_data.fod
     stop = seq_model.stop_surface
-    aim_pt = iterate_ray(opt_model, stop, np.array([0., 0.]), fld, wvl)
-    return aim_pt
+    keys = [(tuple(osp.obj_coords(fld)), fod.obj_dist + fod.enp_dist,
+             stop, wvl) for fld in flds]
+    aim_pts = [osp.ray_cache.get('aim_pt', key) for key in keys]
+
+    misses = [i for i, aim_pt in enumerate(aim_pts) if aim_pt is None]
+    if len(misses) > 0:
+        start_coords = [[0., 0.] if flds[i].aim_pt is None
+                        else flds[i].aim_pt for i in misses]
+        coords = iterate_rays(opt_model, stop, np.zeros((len(misses), 2)),
+                              [flds[i] for i in misses], wvl,
+                              start_coords=start_coords)
+        for i, aim_pt in zip(misses, coords):
+            aim_pts[i] = osp.ray_cache.put('aim_pt', keys[i], aim_pt)
+    return [np.array(aim_pt) for aim_pt in aim_pts]
 
 
 def apply_paraxial_vignetting(opt_model):
@@ -429,11 +641,11 @@ def apply_paraxial_vignetting(opt_model):
 
 
 def setup_pupil_coords(opt_model, fld, wvl, foc, image_pt=None):
-    chief_ray_pkg = get_chief_ray_pkg(opt_model, fld, wvl, foc)
+    chief_ray_pkg = analyses.get_chief_ray_pkg(opt_model, fld, wvl, foc)
     image_pt_2d = None if image_pt is None else image_pt[:2]
-    ref_sphere = setup_exit_pupil_coords(opt_model, fld, wvl, foc,
-                                         chief_ray_pkg,
-                                         image_pt_2d=image_pt_2d)
+    ref_sphere = analyses.setup_exit_pupil_coords(opt_model, fld, wvl, foc,
+                                                  chief_ray_pkg,
+                                                  image_pt_2d=image_pt_2d)
     return ref_sphere, chief_ray_pkg
 
 
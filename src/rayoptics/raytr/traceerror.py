@@ -8,6 +8,10 @@
 .. codeauthor: Michael J. Hayford
 """
 
+# per-ray status codes reported by the batched ray trace in place of the
+#  exceptions raised by the single ray trace
+TRACE_OK, TRACE_MISSED, TRACE_TIR, TRACE_EVANESCENT, TRACE_BLOCKED = range(5)
+
 
 class TraceError(Exception):
     """ Exception raised when ray tracing a model """
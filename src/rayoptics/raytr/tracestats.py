@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Opt-in instrumentation of the ray trace and analyses
+
+Statistics are gathered only while a :class:`TraceStats` collector is
+active, for example::
+
+    with tracestats.collect() as stats:
+        analyses.RayGrid(opm, num_rays=64)
+    print(stats.summary())
+
+The collector aggregates, per interface, a histogram of the iteration
+counts of the surface intersection solvers, the number of rays that
+reached the iteration limit and the trace failures by exception type. It
+also accumulates the number of rays traced and the call counts and wall
+times of the analysis functions decorated with :func:`timed`. When no
+collector is active the instrumentation costs a single global lookup per
+call.
+
+The collector is shared by all threads; the interface being intersected
+is tracked per thread.
+
+.. codeauthor: Michael J. Hayford
+"""
+from collections import Counter
+from contextlib import contextmanager
+import functools
+import threading
+import time
+
+import numpy as np
+
+from rayoptics.raytr import traceerror as terr
+
+failure_names = {
+    terr.TRACE_MISSED: terr.TraceMissedSurfaceError.__name__,
+    terr.TRACE_TIR: terr.TraceTIRError.__name__,
+    terr.TRACE_EVANESCENT: terr.TraceEvanescentRayError.__name__,
+    terr.TRACE_BLOCKED: terr.TraceRayBlockedError.__name__,
+    }
+""" exception type names of the batch trace status codes """
+
+current = None
+""" the active :class:`TraceStats` collector, or None """
+
+_local = threading.local()
+
+
+class TraceStats:
+    """ Aggregated ray trace statistics
+
+    Attributes:
+        rays: number of rays traced
+        iterations: dict of interface index to a Counter of the number of
+                    intersection iterations per ray
+        unconverged: Counter of the rays per interface that reached the
+                     intersection iteration limit
+        failures: dict of interface index to a Counter of trace failures by
+                  exception type name
+        timings: dict of function name to [number of calls, total seconds]
+    """
+
+    def __init__(self):
+        self.rays = 0
+        self.iterations = {}
+        self.unconverged = Counter()
+        self.failures = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_rays(self, num_rays):
+        with self._lock:
+            self.rays += num_rays
+
+    def add_iterations(self, surf, num_iter, max_iter):
+        """ add the iteration count(s) **num_iter** of interface **surf** """
+        if np.isscalar(num_iter):
+            counts = {int(num_iter): 1}
+            num_unconverged = int(num_iter >= max_iter)
+        else:
+            counts = Counter(np.asarray(num_iter).tolist())
+            num_unconverged = int(np.count_nonzero(num_iter >= max_iter))
+        with self._lock:
+            self.iterations.setdefault(surf, Counter()).update(counts)
+            if num_unconverged:
+                self.unconverged[surf] += num_unconverged
+
+    def add_failure(self, surf, kind, count=1):
+        """ add **count** failures of type name **kind** at **surf** """
+        with self._lock:
+            self.failures.setdefault(surf, Counter())[kind] += count
+
+    def add_time(self, name, dt):
+        with self._lock:
+            timing = self.timings.setdefault(name, [0, 0.])
+            timing[0] += 1
+            timing[1] += dt
+
+    def mean_iterations(self):
+        """ returns a dict of interface index to mean intersection iterations """
+        means = {}
+        for surf, hist in self.iterations.items():
+            num_rays = sum(hist.values())
+            means[surf] = sum(n*c for n, c in hist.items())/num_rays
+        return means
+
+    def summary(self):
+        """ returns a printable summary of the statistics """
+        lines = ['rays traced: {}'.format(self.rays)]
+        if self.iterations:
+            lines.append('{:>6s} {:>9s} {:>9s} {:>6s} {:>11s}'.format(
+                'surf', 'rays', 'mean iter', 'max', 'unconverged'))
+            means = self.mean_iterations()
+            for surf in sorted(self.iterations, key=str):
+                hist = self.iterations[surf]
+                lines.append('{:>6s} {:9d} {:9.2f} {:6d} {:11d}'.format(
+                    str(surf), sum(hist.values()), means[surf], max(hist),
+                    self.unconverged[surf]))
+        for surf in sorted(self.failures, key=str):
+            for kind, count in sorted(self.failures[surf].items()):
+                lines.append('surf {}: {} {}'.format(surf, count, kind))
+        for name, (calls, secs) in sorted(self.timings.items()):
+            lines.append('{}: {} calls, {:.4g} s'.format(name, calls, secs))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def collect(stats=None):
+    """ gather statistics into **stats**, or a new TraceStats, in a with block
+
+    Collectors may be nested; statistics go to the innermost one.
+    """
+    global current
+    stats = TraceStats() if stats is None else stats
+    prev = current
+    current = stats
+    try:
+        yield stats
+    finally:
+        current = prev
+
+
+def set_surface(surf):
+    """ set the interface index that this thread is intersecting """
+    _local.surface = surf
+
+
+def record_iterations(num_iter, max_iter):
+    """ record intersection iteration count(s) for the current interface """
+    stats = current
+    if stats is not None:
+        stats.add_iterations(getattr(_local, 'surface', None),
+                             num_iter, max_iter)
+
+
+def record_failures(status, fail_surf):
+    """ record the failures in the status arrays of a batch trace """
+    stats = current
+    if stats is not None:
+        failed = status != terr.TRACE_OK
+        for (code, surf), count in Counter(zip(status[failed].tolist(),
+                                               fail_surf[failed].tolist())
+                                           ).items():
+            stats.add_failure(surf, failure_names[code], count)
+
+
+def timed(fct):
+    """ decorator accumulating the calls and wall time of **fct** """
+    name = fct.__module__.rsplit('.', 1)[-1] + '.' + fct.__qualname__
+
+    @functools.wraps(fct)
+    def wrapper(*args, **kwargs):
+        stats = current
+        if stats is None:
+            return fct(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return fct(*args, **kwargs)
+        finally:
+            stats.add_time(name, time.perf_counter() - t0)
+    return wrapper
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Zernike polynomial decomposition of wavefronts
+
+A :class:`ZernikeBasis` fits the OPD grids of
+:func:`~.analyses.focus_wavefront` by least squares. The basis matrix and its
+pseudo-inverse are cached per grid size and pupil mask, so that repeated fits,
+e.g. across fields, wavelengths and focus positions, are a single matrix
+product::
+
+    basis = get_zernike_basis(37, 'fringe')
+    grid_pkg = trace_wavefront(opm, fld, wvl, 0., num_rays=32)
+    coefs = basis.fit_many([focus_wavefront(opm, grid_pkg, fld, wvl, foc)
+                            for foc in np.linspace(-0.1, 0.1, 11)])
+
+The polynomials are evaluated over the relative pupil coordinates of the
+rays; the coefficients are in the units of the OPD, i.e. waves.
+
+.. codeauthor: Michael J. Hayford
+"""
+
+from collections import OrderedDict
+from math import factorial, sqrt
+import threading
+
+import numpy as np
+from scipy.linalg import solve_triangular
+
+from rayoptics.raytr import analyses
+
+orderings = ('fringe', 'noll')
+
+
+def noll_indices(num_terms):
+    """ returns a list of the (n, m) of the first **num_terms** Noll terms """
+    indices = []
+    n = 0
+    while len(indices) < num_terms:
+        j = n*(n + 1)//2 + 1
+        for am in range(n % 2, n+1, 2):
+            if am == 0:
+                indices.append((n, 0))
+                j += 1
+            else:
+                # even j are the cosine terms, odd j the sine terms
+                for jj in (j, j+1):
+                    indices.append((n, am if jj % 2 == 0 else -am))
+                j += 2
+        n += 1
+    return indices[:num_terms]
+
+
+def fringe_indices(num_terms):
+    r""" returns a list of the (n, m) of the first **num_terms** Fringe terms
+
+    The terms are grouped by (n + \|m\|)/2; the standard set of 37 terms is
+    complete through group 5, followed by (12, 0). Larger sets continue with
+    the remaining terms of group 6 and beyond.
+    """
+    indices = []
+    d = 0
+    while len(indices) < max(num_terms, 37) + 1:
+        for am in range(d, -1, -1):
+            n = 2*d - am
+            if am == 0:
+                indices.append((n, 0))
+            else:
+                indices.extend([(n, am), (n, -am)])
+        d += 1
+    indices.remove((12, 0))
+    indices.insert(36, (12, 0))
+    return indices[:num_terms]
+
+
+def zernike_indices(num_terms, ordering='fringe'):
+    """ returns a list of the (n, m) of the first **num_terms** terms """
+    if ordering == 'fringe':
+        return fringe_indices(num_terms)
+    elif ordering == 'noll':
+        return noll_indices(num_terms)
+    raise ValueError('unknown Zernike ordering {}'.format(ordering))
+
+
+def radial_poly(n, m, rho):
+    """ returns the Zernike radial polynomial R_n^m at **rho** """
+    m = abs(m)
+    r = np.zeros_like(rho)
+    for k in range((n - m)//2 + 1):
+        c = ((-1)**k * factorial(n - k) /
+             (factorial(k) * factorial((n + m)//2 - k) *
+              factorial((n - m)//2 - k)))
+        r += c*rho**(n - 2*k)
+    return r
+
+
+def zernike_poly(n, m, rho, theta, normalize=False):
+    """ returns the Zernike polynomial Z_n^m at (**rho**, **theta**)
+
+    Positive m are cosine terms, negative m sine terms. If **normalize** is
+    True, the polynomial has unit RMS over the unit disk.
+    """
+    z = radial_poly(n, m, rho)
+    if m > 0:
+        z *= np.cos(m*theta)
+    elif m < 0:
+        z *= np.sin(-m*theta)
+    if normalize:
+        z *= sqrt(n + 1) if m == 0 else sqrt(2*(n + 1))
+    return z
+
+
+def basis_matrix(x, y, indices, normalize=False):
+    """ returns the (K, len(indices)) matrix of the Zernike terms at the
+    pupil points (**x**, **y**) """
+    rho = np.hypot(x, y)
+    theta = np.arctan2(y, x)
+    return np.column_stack([zernike_poly(n, m, rho, theta,
+                                         normalize=normalize)
+                            for n, m in indices])
+
+
+class ZernikeBasis():
+    """ Least squares Zernike fits of wavefront grids
+
+    The basis matrix and its pseudo-inverse are cached for each grid size
+    and pupil mask; the least recently used are dropped beyond
+    **max_cached** entries.
+
+    Attributes:
+        num_terms: the number of Zernike terms
+        ordering: 'fringe' or 'noll'
+        normalize: if True, the terms have unit RMS over the unit disk. The
+                   default is False for Fringe and True for Noll ordering.
+        indices: list of the (n, m) of the terms
+    """
+
+    def __init__(self, num_terms=37, ordering='fringe', normalize=None,
+                 max_cached=32):
+        self.num_terms = num_terms
+        self.ordering = ordering
+        self.indices = zernike_indices(num_terms, ordering)
+        self.normalize = (ordering == 'noll') if normalize is None \
+            else normalize
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+
+    def __repr__(self):
+        return '{}({}, {!r})'.format(type(self).__name__, self.num_terms,
+                                     self.ordering)
+
+    def matrices(self, wavefront):
+        """ returns the pupil mask, basis matrix and its pseudo-inverse
+
+        Args:
+            wavefront: (num_rays, num_rays, 3) array of pupil_x, pupil_y and
+                       OPD; the pupil mask is where the OPD is finite
+        """
+        mask = np.isfinite(wavefront[..., 2])
+        key = (wavefront.shape[:2], mask.tobytes())
+        try:
+            entry = self._cache[key]
+        except KeyError:
+            pupil = wavefront[mask][:, :2]
+            a = basis_matrix(pupil[:, 0], pupil[:, 1], self.indices,
+                             normalize=self.normalize)
+            if len(a) < self.num_terms:
+                raise ValueError('{} pupil samples can\'t be fit with {} '
+                                 'Zernike terms'.format(len(a),
+                                                        self.num_terms))
+            # pseudo-inverse of the full rank basis, R^-1 Q^T
+            q, r = np.linalg.qr(a)
+            entry = self._cache[key] = (mask, a, solve_triangular(r, q.T))
+            if len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return entry
+
+    def fit(self, wavefront):
+        """ returns the Zernike coefficients of a wavefront grid
+
+        Args:
+            wavefront: (num_rays, num_rays, 3) array of pupil_x, pupil_y and
+                       OPD, as returned by :func:`~.analyses.focus_wavefront`
+        """
+        mask, a, pinv = self.matrices(wavefront)
+        return pinv.dot(wavefront[..., 2][mask])
+
+    def fit_many(self, wavefronts):
+        """ returns the (M, num_terms) coefficients of M wavefront grids
+
+        The wavefronts sharing a pupil mask are fit with one matrix product.
+        """
+        wavefronts = np.asarray(wavefronts)
+        masks = np.isfinite(wavefronts[..., 2])
+        coefs = np.empty((len(wavefronts), self.num_terms))
+        groups = {}
+        for i, mask in enumerate(masks):
+            groups.setdefault(mask.tobytes(), []).append(i)
+        for idx in groups.values():
+            mask, a, pinv = self.matrices(wavefronts[idx[0]])
+            coefs[idx] = pinv.dot(wavefronts[idx][:, mask, 2].T).T
+        return coefs
+
+    def residual_rms(self, wavefront, coefs):
+        """ returns the RMS difference of a wavefront grid and its fit """
+        mask, a, pinv = self.matrices(wavefront)
+        resid = wavefront[..., 2][mask] - a.dot(coefs)
+        return sqrt(np.mean(resid**2))
+
+    def evaluate(self, coefs, x, y):
+        """ returns the wavefront of **coefs** at the pupil points (x, y) """
+        x = np.asarray(x, dtype=float)
+        a = basis_matrix(x.ravel(), np.asarray(y, dtype=float).ravel(),
+                         self.indices, normalize=self.normalize)
+        return a.dot(coefs).reshape(x.shape)
+
+
+_zernike_bases = threading.local()
+
+
+def get_zernike_basis(num_terms=37, ordering='fringe', normalize=None):
+    """Return the calling thread's :class:`ZernikeBasis` for the arguments."""
+    bases = _zernike_bases.__dict__.setdefault('bases', {})
+    key = num_terms, ordering, normalize
+    try:
+        return bases[key]
+    except KeyError:
+        basis = bases[key] = ZernikeBasis(num_terms, ordering, normalize)
+        return basis
+
+
+def fit_wavefront(opt_model, fld, wvl, foc, num_rays=21, num_terms=37,
+                  ordering='fringe', image_pt_2d=None):
+    """Trace a grid of rays and return the Zernike coefficients of the OPD.
+    """
+    wavefront = analyses.eval_wavefront(opt_model, fld, wvl, foc,
+                                        image_pt_2d=image_pt_2d,
+                                        num_rays=num_rays)
+    return get_zernike_basis(num_terms, ordering).fit(wavefront)
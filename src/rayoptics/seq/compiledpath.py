@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright © 2020 Michael J. Hayford
+""" Precomputed path through a sequential model
+
+.. codeauthor: Michael J. Hayford
+"""
+
+import itertools
+
+import numpy as np
+
+# interaction mode codes for the **interact** array
+DUMMY, TRANSMIT, REFLECT = range(3)
+
+interact_mode_codes = {'dummy': DUMMY,
+                       'transmit': TRANSMIT,
+                       'reflect': REFLECT}
+
+
+class CompiledPath:
+    """ path data for a range of a sequential model at a single wavelength
+
+    A CompiledPath is built once by
+    :meth:`~rayoptics.seq.sequential.SequentialModel.compiled_path` and
+    reused until the model is updated. Iterating over it yields the same
+    **Intfc, Gap, Tfrm, Indx, Zdir** tuples as
+    :meth:`~rayoptics.seq.sequential.SequentialModel.path`. The transforms,
+    indices, z directions and interaction modes are also available as arrays
+    for batched ray tracing.
+
+    Attributes:
+        wvl: wavelength in nm of the path
+        seq: list of path tuples
+        rot: (n, 3, 3) array of the rotation matrices of the local transforms
+        trans: (n, 3) array of the translations of the local transforms
+        rndx: (n,) array of refractive indices following each interface
+        z_dir: (n,) array of z directions following each interface
+        interact: (n,) array of interaction mode codes
+    """
+
+    def __init__(self, ifcs, gaps, lcl_tfrms, rndx, z_dir, wvl=None):
+        self.wvl = wvl
+        self.seq = list(itertools.zip_longest(ifcs, gaps, lcl_tfrms,
+                                              rndx, z_dir))
+        num_ifcs = len(self.seq)
+        self.rot = np.array([t[0] for t in lcl_tfrms],
+                            dtype=float).reshape(num_ifcs, 3, 3)
+        self.trans = np.array([t[1] for t in lcl_tfrms],
+                              dtype=float).reshape(num_ifcs, 3)
+        self.rndx = np.array(rndx, dtype=float)
+        self.z_dir = np.array(z_dir, dtype=float)
+        self.interact = np.array([interact_mode_codes.get(ifc.interact_mode,
+                                                          DUMMY)
+                                  for ifc in ifcs], dtype=int)
+
+    def __len__(self):
+        return len(self.seq)
+
+    def __iter__(self):
+        return iter(self.seq)
+
+    def __getitem__(self, key):
+        return self.seq[key]
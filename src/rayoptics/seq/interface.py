@@ -11,6 +11,10 @@
 
 from enum import Enum, auto
 
+import numpy as np
+
+from rayoptics.raytr.traceerror import TraceMissedSurfaceError
+
 
 class InteractionMode(Enum):
     """ enum for different interact_mode specifications
@@ -99,9 +103,33 @@ class Interface:
     def intersect(self, p0, d, eps=1.0e-12):
         pass
 
+    def intersect_many(self, p0s, ds, eps=1.0e-12, z_dir=1.0):
+        """ intersect an (N, 3) array of rays, one at a time by default
+
+        Returns:
+            (**s**, **p**) with NaN distances for rays that miss the interface
+        """
+        s = np.full(len(p0s), np.nan)
+        p = np.full((len(p0s), 3), np.nan)
+        for i, (p0, d) in enumerate(zip(p0s, ds)):
+            try:
+                s[i], p[i] = self.intersect(p0, d, eps=eps)
+            except TraceMissedSurfaceError:
+                pass
+        return s, p
+
     def normal(self, p):
         pass
 
+    def normal_many(self, ps):
+        """ returns the normals at an (N, 3) array of points *ps* """
+        return np.array([self.normal(p) for p in ps]).reshape(-1, 3)
+
+    def points_inside(self, x, y):
+        """ returns True where (x, y) is within the clear aperture; an
+        interface without apertures passes every point """
+        return np.ones(np.shape(x), dtype=bool)
+
     def phase(self, pt, d_in, normal, wl):
         if hasattr(self, 'phase_element'):
             return self.phase_element.phase(pt, d_in, normal, wl=wl)
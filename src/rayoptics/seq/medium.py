@@ -7,14 +7,14 @@
 
 .. codeauthor: Michael J. Hayford
 """
+from collections import OrderedDict
 import json
 
+import numpy as np
 from scipy.interpolate import interp1d
 
 from rayoptics.util.misc_math import isanumber
 
-from opticalglass import glass as cat_glass
-from opticalglass import glassfactory as gfact
 from opticalglass import glasserror
 from opticalglass import util
 from opticalglass.spectral_lines import get_wavelength
@@ -58,6 +58,11 @@ class Medium:
         """
         return self.n
 
+    def rindex_many(self, wv_nm):
+        """ returns an array of the refractive indices at the wavelengths
+        in the array **wv_nm** """
+        return np.full(np.shape(wv_nm), self.n, dtype=float)
+
 
 class Air(Medium):
     """ Optical definition for air (low fidelity definition) """
@@ -111,6 +116,9 @@ class Glass(Medium):
     def rindex(self, wv_nm):
         return self.bdhl_model.rindex(wv_nm)
 
+    def rindex_many(self, wv_nm):
+        return self.bdhl_model.calc_rindex(np.asarray(wv_nm, dtype=float))
+
     def update(self, nd, vd):
         self.n = nd
         self.v = vd
@@ -192,6 +200,139 @@ class InterpolatedGlass():
         """
         return float(self.rindex_interp(get_wavelength(wv_nm)))
 
+    def rindex_many(self, wv_nm):
+        """ returns an array of the refractive indices at the wavelengths
+        in the array **wv_nm** """
+        return self.rindex_interp(np.asarray(wv_nm, dtype=float))
+
+
+class OffsetMedium():
+    """ A medium with the refractive indices of **base** shifted by **offset**
+
+    Used to model an index error of a medium, e.g. for tolerancing.
+
+    Attributes:
+        base: the nominal medium
+        offset: the index offset, the same at all wavelengths
+    """
+
+    def __init__(self, base, offset=0.):
+        self.base = base
+        self.offset = offset
+
+    def __repr__(self):
+        return ('OffsetMedium(' + repr(self.base) +
+                ', offset=' + repr(self.offset) + ')')
+
+    def name(self):
+        return self.base.name()
+
+    def catalog_name(self):
+        return self.base.catalog_name()
+
+    def rindex(self, wv_nm):
+        """ returns the refractive index at wv_nm """
+        return self.base.rindex(wv_nm) + self.offset
+
+    def rindex_many(self, wv_nm):
+        """ returns an array of the refractive indices at the wavelengths
+        in the array **wv_nm** """
+        return rindex_many(self.base, wv_nm) + self.offset
+
+
+# --- dispersion evaluation and caching
+def rindex_many(medium, wvls):
+    """ returns an array of the refractive indices of medium at **wvls**
+
+    The media defined here and the :mod:`opticalglass` catalog glasses are
+    evaluated for all of the wavelengths at once; other media are
+    evaluated one wavelength at a time.
+
+    Args:
+        medium: the medium to evaluate
+        wvls: a sequence of wavelengths in nm or spectral line identifiers
+    """
+    wv_nm = np.asarray(wvls)
+    if wv_nm.dtype.kind not in 'fiu':
+        wv_nm = np.array([get_wavelength(w) for w in wvls], dtype=float)
+    if hasattr(medium, 'rindex_many'):
+        rndx = medium.rindex_many(wv_nm)
+    elif hasattr(medium, 'calc_rindex'):
+        rndx = medium.calc_rindex(wv_nm)
+    else:
+        rndx = [medium.rindex(w) for w in wv_nm]
+    return np.broadcast_to(np.asarray(rndx, dtype=float), wv_nm.shape)
+
+
+def dispersion_key(medium):
+    """ returns a hashable key for the dispersion data of **medium**
+
+    Media with equal keys have the same refractive indices. Catalog glasses
+    are identified by name and catalog, media of unknown types by identity.
+    """
+    if isinstance(medium, Glass):
+        return type(medium), medium.n, medium.v
+    elif isinstance(medium, Medium):
+        return type(medium), medium.n
+    elif isinstance(medium, InterpolatedGlass):
+        return type(medium), tuple(medium.wvls), tuple(medium.rndx)
+    elif isinstance(medium, OffsetMedium):
+        return type(medium), dispersion_key(medium.base), medium.offset
+    elif hasattr(medium, 'gname') and hasattr(medium, 'calc_rindex'):
+        return type(medium), medium.name(), medium.catalog_name()
+    return type(medium), id(medium)
+
+
+class DispersionCache:
+    """ Cache of the refractive indices of media over sets of wavelengths
+
+    Each distinct medium is evaluated once per wavelength set. Entries are
+    keyed by :func:`dispersion_key`, so gaps filled with the same glass
+    share an entry and media whose data doesn't change are not evaluated
+    again. The least recently used entries are discarded beyond
+    **maxsize** entries.
+
+    Attributes:
+        maxsize: maximum number of (medium, wavelengths) entries
+        hits: number of lookups found in the cache
+        misses: number of lookups that evaluated a medium
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def rindex(self, medium, wvls):
+        """ returns a read-only array of the indices of medium at **wvls** """
+        if isinstance(wvls, np.ndarray):
+            wvls_key = wvls.dtype.str, wvls.shape, wvls.tobytes()
+        else:
+            wvls_key = tuple(wvls)
+        key = dispersion_key(medium), wvls_key
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            rndx = np.array(rindex_many(medium, wvls))
+            rndx.flags.writeable = False
+            # hold on to the medium, so that an id() key isn't reused
+            self._entries[key] = medium, rndx
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return rndx
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
 
 # --- glass finder base class
 class GlassHandlerBase():
@@ -243,6 +384,7 @@ class GlassHandlerBase():
 
     def find_glass(self, name, catalog):
         """ find ``name`` glass or a substitute or, if none found, n=1.5 """
+        from opticalglass import glassfactory as gfact
 
         try:
             if catalog is None or len(catalog) == 0:
@@ -282,6 +424,8 @@ class GlassHandlerBase():
 
     def find_substitute_glass(self, name):
         """Try to find a similar glass to ``name``."""
+        from opticalglass import glass as cat_glass
+        from opticalglass import glassfactory as gfact
 
         # create a list of catalogs
         if len(self.glass_catalogs) > 0:
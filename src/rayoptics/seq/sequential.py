@@ -8,16 +8,17 @@
 
 import itertools
 import logging
+from collections import namedtuple
 
 from rayoptics.elem import surface
 from . import gap
 from . import medium as m
+from .compiledpath import CompiledPath
 from rayoptics.raytr import raytrace as rt
 from rayoptics.raytr import trace as trace
 from rayoptics.raytr import analyses
 from rayoptics.elem import transform as trns
 from rayoptics.optical.model_constants import Intfc, Gap, Indx, Tfrm, Zdir
-from opticalglass import glassfactory as gfact
 from opticalglass import glasserror as ge
 import numpy as np
 from math import copysign, sqrt
@@ -76,6 +77,9 @@ class SequentialModel:
         self.cur_surface = None
         self.wvlns = []
         self.rndx = []
+        self._compiled_paths = {}
+        self._dispersion_cache = m.DispersionCache()
+        self._update_state = None
         if do_init:
             self._initialize_arrays()
 
@@ -87,6 +91,9 @@ class SequentialModel:
         del attrs['z_dir']
         del attrs['wvlns']
         del attrs['rndx']
+        del attrs['_compiled_paths']
+        del attrs['_dispersion_cache']
+        del attrs['_update_state']
         return attrs
 
     def _initialize_arrays(self):
@@ -131,9 +138,29 @@ class SequentialModel:
         Returns:
             (**ifcs, gaps, lcl_tfrms, rndx, z_dir**)
         """
+        return iter(self.compiled_path(wl, start, stop, step))
+
+    def compiled_path(self, wl=None, start=None, stop=None, step=1):
+        """ returns a :class:`~.compiledpath.CompiledPath` for a range
+
+        Compiled paths are cached by wavelength and range until the model is
+        changed by :meth:`update_model`, :meth:`insert` or :meth:`remove`.
+
+        Args:
+            wl: wavelength in nm for path, defaults to central wavelength
+            start: start of range
+            stop: first value beyond the end of the range
+            step: increment or stride of range
+        """
         if wl is None:
             wl = self.central_wavelength()
 
+        key = wl, start, stop, step
+        try:
+            return self._compiled_paths[key]
+        except KeyError:
+            pass
+
         if step < 0:
             gap_start = start - 1
         else:
@@ -141,31 +168,53 @@ class SequentialModel:
 
         wl_idx = self.index_for_wavelength(wl)
         rndx = [n[wl_idx] for n in self.rndx[start:stop:step]]
-        path = itertools.zip_longest(self.ifcs[start:stop:step],
-                                     self.gaps[gap_start:stop:step],
-                                     self.lcl_tfrms[start:stop:step],
-                                     rndx,
-                                     self.z_dir[start:stop:step])
+        path = CompiledPath(self.ifcs[start:stop:step],
+                            self.gaps[gap_start:stop:step],
+                            self.lcl_tfrms[start:stop:step],
+                            rndx,
+                            self.z_dir[start:stop:step],
+                            wvl=wl)
+        self._compiled_paths[key] = path
         return path
 
+    def invalidate_paths(self):
+        """ discard the cached compiled paths """
+        self._compiled_paths = {}
+
     def calc_ref_indices_for_spectrum(self, wvls):
         """ returns a list with refractive indices for all **wvls**
 
         Args:
             wvls: list of wavelengths in nm
         """
-        indices = []
-        for g in self.gaps:
-            ri = []
-            mat = g.medium
-            for w in wvls:
-                rndx = mat.rindex(w)
-                ri.append(rndx)
-            indices.append(ri)
+        indices = [self.gap_rindex(g, wvls) for g in self.gaps]
         indices.append(indices[-1])
 
         return indices
 
+    def gap_rindex(self, g, wvls):
+        """ returns a list of the refractive indices of gap g at **wvls** """
+        return self._dispersion_cache.rindex(g.medium, wvls).tolist()
+
+    def rindex_table(self, wvls):
+        """ returns an array of the refractive indices of the gaps at wvls
+
+        Each distinct medium is evaluated once for all of the wavelengths and
+        the results are cached, so dense spectral samplings may be
+        evaluated repeatedly, e.g. for chromatic analyses.
+
+        Args:
+            wvls: sequence of wavelengths in nm
+
+        Returns:
+            array of shape (number of interfaces, len(wvls)); as with
+            :attr:`rndx`, the last row repeats the indices of the last gap
+        """
+        rndx = [self._dispersion_cache.rindex(g.medium, wvls)
+                for g in self.gaps]
+        rndx.append(rndx[-1])
+        return np.array(rndx)
+
     def central_wavelength(self):
         """ returns the central wavelength in nm of the model's ``WvlSpec`` """
         return self.opt_model.optical_spec.spectral_region.central_wvl
@@ -206,6 +255,7 @@ class SequentialModel:
             self.gaps.append(node)
         else:
             self.ifcs.insert(len(self.ifcs)-1, node)
+        self.invalidate_paths()
         return self
 
     def insert(self, ifc, gap):
@@ -233,8 +283,9 @@ class SequentialModel:
         self.z_dir.insert(surf, new_z_dir)
 
         wvls = self.opt_model.optical_spec.spectral_region.wavelengths
-        rindex = [gap.medium.rindex(w) for w in wvls]
-        self.rndx.insert(surf, rindex)
+        self.rndx.insert(surf, self.gap_rindex(gap, wvls))
+
+        self.invalidate_paths()
 
         if ifc.interact_mode == 'reflect':
             self.update_reflections(start=surf)
@@ -279,6 +330,8 @@ class SequentialModel:
         del self.z_dir[idx]
         del self.rndx[idx]
 
+        self.invalidate_paths()
+
     def add_surface(self, surf_data, **kwargs):
         """ add a surface where surf is a list that contains:
             [curvature, thickness, refractive_index, v-number] """
@@ -295,6 +348,9 @@ class SequentialModel:
 
     def sync_to_restore(self, opt_model):
         self.opt_model = opt_model
+        self._compiled_paths = {}
+        self._dispersion_cache = m.DispersionCache()
+        self._update_state = None
         if hasattr(self, 'optical_spec'):
             opt_model.optical_spec = self.optical_spec
             delattr(self, 'optical_spec')
@@ -305,14 +361,33 @@ class SequentialModel:
                 if hasattr(sg[Gap], 'sync_to_restore'):
                     sg[Gap].sync_to_restore(self)
 
-    def update_model(self):
+    def update_model(self, incremental=True):
+        """ update the derived data of the model following a change
+
+        The model is compared with its state at the previous update. Only
+        the transforms from the first changed interface on and the
+        refractive indices of gaps with a changed medium are recomputed.
+        Chief ray aim points are kept if the change can't move the image of
+        the stop surface.
+
+        Args:
+            incremental: if False, recompute all of the derived data
+        """
         # delta n across each surface interface must be set to some
         #  reasonable default value. use the index at the central wavelength
         osp = self.opt_model.optical_spec
         ref_wl = osp.spectral_region.reference_wvl
 
         self.wvlns = osp.spectral_region.wavelengths
-        self.rndx = self.calc_ref_indices_for_spectrum(self.wvlns)
+        state = self._model_state()
+        changes = self._find_changes(state) if incremental else None
+
+        if changes is None:
+            self.rndx = self.calc_ref_indices_for_spectrum(self.wvlns)
+        else:
+            for i in changes.media:
+                self.rndx[i] = self.gap_rindex(self.gaps[i], self.wvlns)
+            self.rndx[-1] = self.rndx[-2]
         n_before = self.rndx[0]
 
         self.z_dir = []
@@ -335,14 +410,69 @@ class SequentialModel:
             # call update() on the surface interface
             s.update()
 
-        self.gbl_tfrms = self.compute_global_coords()
-        self.lcl_tfrms = self.compute_local_transforms()
+        if changes is None:
+            self.gbl_tfrms = self.compute_global_coords()
+            self.lcl_tfrms = self.compute_local_transforms()
+        elif changes.tfrms:
+            self.update_transforms(changes.tfrms)
+        self._update_state = state
+        self.invalidate_paths()
+        if changes is None or changes.stop_image:
+            osp.ray_cache.invalidate()
+        else:
+            osp.ray_cache.invalidate(keep=('aim_pt',))
 
         if len(self.ifcs) > 2:
             osp.update_model()
 
             self.set_clear_apertures()
 
+    def _model_state(self):
+        """ returns the model data the derived data is computed from """
+        ifc_state = []
+        gap_state = []
+        media = []
+        profiles = []
+        for ifc, g in itertools.zip_longest(self.ifcs, self.gaps):
+            ifc_state.append((id(ifc), ifc.interact_mode,
+                              _freeze(ifc.decenter)))
+            profiles.append(_freeze(getattr(ifc, 'profile', ifc)))
+            if g is not None:
+                gap_state.append((id(g), g.thi))
+                media.append(_freeze(g.medium))
+        return ModelState(tuple(self.wvlns), self.stop_surface,
+                          ifc_state, gap_state, media, profiles)
+
+    def _find_changes(self, state):
+        """ compare **state** with the state at the last update
+
+        Returns:
+            a :class:`ModelChanges` tuple, or None if the derived data must
+            be recomputed for the whole model
+        """
+        prev = self._update_state
+        if (prev is None or prev.wvlns != state.wvlns or
+                prev.stop != state.stop or
+                len(prev.ifcs) != len(state.ifcs) or
+                len(prev.gaps) != len(state.gaps) or
+                len(self.rndx) != len(self.ifcs)):
+            return None
+
+        def changed(before, after):
+            return [i for i, (b, a) in enumerate(zip(before, after))
+                    if b != a]
+
+        ifcs = changed(prev.ifcs, state.ifcs)
+        gaps = changed(prev.gaps, state.gaps)
+        media = changed(prev.media, state.media)
+        profiles = changed(prev.profiles, state.profiles)
+
+        stop = -1 if state.stop is None else state.stop
+        stop_image = (any(i <= stop for i in ifcs + profiles) or
+                      any(i < stop for i in gaps + media))
+        tfrms = sorted(set(ifcs + gaps))
+        return ModelChanges(tfrms, media, stop_image)
+
     def apply_scale_factor(self, scale_factor):
         for i, sg in enumerate(self.path()):
             sg[Intfc].apply_scale_factor(scale_factor)
@@ -351,6 +481,7 @@ class SequentialModel:
 
         self.gbl_tfrms = self.compute_global_coords()
         self.lcl_tfrms = self.compute_local_transforms()
+        self.invalidate_paths()
 
     def set_from_specsheet(self, specsheet):
         if self.opt_model.optical_spec.parax_data is None:
@@ -735,6 +866,34 @@ class SequentialModel:
                 break
         return tfrms
 
+    def update_transforms(self, changed):
+        """ update the transforms following a change to interfaces or gaps
+
+        Args:
+            changed: sorted list of indices of the interfaces and gaps whose
+                     position or thickness changed
+        """
+        # the transform between interfaces i and i+1 depends on both
+        #  interfaces and the gap between them
+        lcl = sorted({j for i in changed for j in (i-1, i)
+                      if 0 <= j < len(self.gaps)})
+        for i in lcl:
+            r, t = trns.forward_transform(self.ifcs[i], self.gaps[i].thi,
+                                          self.ifcs[i+1])
+            self.lcl_tfrms[i] = r.transpose(), t
+
+        # the global reference is interface 1; the object transform
+        #  is computed in reverse
+        start = lcl[0] if lcl else len(self.gaps)
+        if start < 1:
+            self.gbl_tfrms = self.compute_global_coords()
+            return
+        for i in range(start, len(self.gaps)):
+            prev_r, prev_t = self.gbl_tfrms[i]
+            r = self.lcl_tfrms[i][0].transpose()
+            t = self.lcl_tfrms[i][1]
+            self.gbl_tfrms[i+1] = prev_r.dot(r), prev_r.dot(t) + prev_t
+
     def compute_local_transforms(self):
         """ Return forward surface coordinates (r.T, t) for each interface. """
         tfrms = []
@@ -757,6 +916,47 @@ class SequentialModel:
         return tfrms
 
 
+ModelState = namedtuple('ModelState', ['wvlns', 'stop', 'ifcs', 'gaps',
+                                       'media', 'profiles'])
+ModelState.__doc__ = "model data used to detect changes between updates"
+
+ModelChanges = namedtuple('ModelChanges', ['tfrms', 'media', 'stop_image'])
+ModelChanges.__doc__ = "changes to a model since the last update"
+ModelChanges.tfrms.__doc__ = "indices of interfaces and gaps that moved"
+ModelChanges.media.__doc__ = "indices of gaps with a changed medium"
+ModelChanges.stop_image.__doc__ = "True if the stop image may have changed"
+
+
+def _freeze(obj, nested=False):
+    """ returns a comparable snapshot of the data of **obj**
+
+    The attributes of **obj** are included in the snapshot; objects held in
+    those attributes are compared by identity.
+    """
+    if isinstance(obj, (int, float, complex, str, bool, type(None))):
+        return obj
+    if isinstance(obj, np.ndarray):
+        return obj.shape, tuple(obj.ravel().tolist())
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(o, nested) for o in obj)
+    if isinstance(obj, dict):
+        return tuple((k, _freeze(v, nested)) for k, v in obj.items())
+    if not nested and hasattr(obj, '__dict__'):
+        attrs = vars(obj)
+        if len(attrs) > 16:
+            # large objects, e.g. catalog glasses, are compared by identity
+            return type(obj), id(obj)
+        return type(obj), id(obj), _freeze({k: v for k, v in attrs.items()
+                                            if k not in _freeze_skip},
+                                           nested=True)
+    return type(obj), id(obj)
+
+
+# derived data that isn't part of the model state
+_freeze_skip = {'rot_mat', 'max_aperture', 'delta_n', 'clear_apertures',
+                'edge_apertures', 'label', 'bdhl_model', 'rindex_interp'}
+
+
 def gen_sequence(surf_data_list, **kwargs):
     """ create a sequence iterator from the surf_data_list
 
@@ -835,6 +1035,7 @@ def create_surface_and_gap(surf_data, radius_mode=False, prev_medium=None,
                 else:
                     name, cat = surf_data[2].split(',')
 
+                from opticalglass import glassfactory as gfact
                 try:
                     mat = gfact.create_glass(name, cat)
                 except ge.GlassNotFoundError as gerr:
@@ -9,7 +9,6 @@
 """
 import logging
 import math
-import requests
 
 import rayoptics.optical.opticalmodel as opticalmodel
 from rayoptics.optical.model_enums import DimensionType as dt
@@ -23,7 +22,6 @@ from rayoptics.util.misc_math import isanumber
 import rayoptics.zemax.zmx2ro as zmx2ro
 import rayoptics.oprops.thinlens as thinlens
 
-from opticalglass import glassfactory as gfact
 from opticalglass import glasserror
 from opticalglass import util
 
@@ -64,6 +62,7 @@ def read_lens_file(filename, **kwargs):
 
 def read_lens_url(url, **kwargs):
     ''' given a url to a Zemax file, return an OpticalModel  '''
+    import requests
     global _track_contents
     r = requests.get(url, allow_redirects=True)
 
@@ -469,6 +468,7 @@ class ZmxGlassHandler(GlassHandlerBase):
         """ process GLAS command for fictitious, catalog glass or mirror"""
 
         if cmd == "GCAT":
+            from opticalglass import glassfactory as gfact
             inputs = inputs.split()
             # Check catalog names, only add those we recognize
             for gc in inputs: